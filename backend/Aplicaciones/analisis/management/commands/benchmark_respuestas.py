@@ -0,0 +1,149 @@
+# ============================================
+# Aplicaciones/analisis/management/commands/benchmark_respuestas.py
+# ============================================
+# Simula muchos estudiantes respondiendo AL MISMO TIEMPO:
+# cada hilo usa su propia conexión y todos arrancan juntos (Barrier).
+# Crea datos temporales y los elimina al terminar.
+#
+#   python manage.py benchmark_respuestas --estudiantes 300 --preguntas 20 --hilos 32
+# ============================================
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from Aplicaciones.analisis.models import IntentoExamen
+from Aplicaciones.analisis.services import guardar_y_evaluar_respuesta
+from Aplicaciones.examenes.models import Materia, Examen, Pregunta, OpcionRespuesta
+
+
+class Command(BaseCommand):
+    help = "Benchmark de concurrencia: muchos estudiantes guardando respuestas a la vez."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--estudiantes", type=int, default=200)
+        parser.add_argument("--preguntas", type=int, default=10)
+        parser.add_argument("--hilos", type=int, default=32)
+
+    def handle(self, *args, **opts):
+        n_est = opts["estudiantes"]
+        n_preg = opts["preguntas"]
+        n_hilos = opts["hilos"]
+
+        materia, examen, preguntas = self._crear_examen(n_preg)
+        try:
+            intentos = self._crear_intentos(examen, n_est)
+
+            # Tareas: (intento, pregunta, opcion) para cada estudiante y pregunta
+            tareas = [
+                (intento, p.id_pregunta, opciones[i % len(opciones)])
+                for i, intento in enumerate(intentos)
+                for p, opciones in preguntas
+            ]
+
+            barrera = threading.Barrier(min(n_hilos, len(tareas)))
+            latencias = []
+            errores = []
+            lock = threading.Lock()
+
+            def worker(lote):
+                try:
+                    barrera.wait()
+                    for intento, pregunta_id, opcion_id in lote:
+                        t0 = time.perf_counter()
+                        try:
+                            guardar_y_evaluar_respuesta(intento, {"pregunta_id": pregunta_id, "opcion_id": opcion_id})
+                            ms = (time.perf_counter() - t0) * 1000
+                            with lock:
+                                latencias.append(ms)
+                        except Exception as e:
+                            with lock:
+                                errores.append(str(e))
+                finally:
+                    connection.close()
+
+            lotes = [tareas[i::n_hilos] for i in range(n_hilos) if tareas[i::n_hilos]]
+            t_inicio = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=len(lotes)) as pool:
+                list(pool.map(worker, lotes))
+            total_s = time.perf_counter() - t_inicio
+
+            inconsistentes = sum(
+                1
+                for it in IntentoExamen.objects.filter(examen_id=examen.id_examen)
+                if it.preguntas_respondidas != it.respuestas.count()
+            )
+
+            self._reportar(latencias, errores, total_s, inconsistentes)
+        finally:
+            IntentoExamen.objects.filter(examen_id=examen.id_examen).delete()
+            examen.delete()
+            materia.delete()
+
+    def _crear_examen(self, n_preg):
+        materia = Materia.objects.create(nombre=f"__benchmark__{uuid.uuid4().hex[:8]}")
+        examen = Examen.objects.create(
+            materia=materia,
+            titulo="Benchmark respuestas",
+            docente_id=0,
+            docente_nombre="benchmark",
+            estado="ACTIVO",
+        )
+        pregs = Pregunta.objects.bulk_create(
+            [
+                Pregunta(examen=examen, enunciado=f"Pregunta {i}", orden=i, ponderacion=Decimal("1.00"))
+                for i in range(n_preg)
+            ]
+        )
+        OpcionRespuesta.objects.bulk_create(
+            [
+                OpcionRespuesta(pregunta=p, clave=c, texto=c, es_correcta=(c == "A"), orden=idx)
+                for p in pregs
+                for idx, c in enumerate("ABCD")
+            ]
+        )
+        examen.calcular_puntaje_total(save=True)
+
+        preguntas = [
+            (p, list(p.opciones.order_by("orden").values_list("id_opcion", flat=True)))
+            for p in pregs
+        ]
+        return materia, examen, preguntas
+
+    def _crear_intentos(self, examen, n_est):
+        limite = timezone.now() + timedelta(hours=2)
+        return IntentoExamen.objects.bulk_create(
+            [
+                IntentoExamen(
+                    estudiante_id=i + 1,
+                    estudiante_nombre=f"Estudiante {i + 1}",
+                    estudiante_cedula=str(i + 1).zfill(10),
+                    examen_id=examen.id_examen,
+                    examen_titulo=examen.titulo,
+                    fecha_limite=limite,
+                    puntaje_total=examen.puntaje_total,
+                    estado="INICIADO",
+                )
+                for i in range(n_est)
+            ]
+        )
+
+    def _reportar(self, latencias, errores, total_s, inconsistentes):
+        n = len(latencias)
+        if n:
+            ordenadas = sorted(latencias)
+            p95 = ordenadas[min(n - 1, int(n * 0.95))]
+            self.stdout.write(
+                f"respuestas={n} total={total_s:.2f}s throughput={n / total_s:.1f}/s "
+                f"p50={statistics.median(ordenadas):.1f}ms p95={p95:.1f}ms max={ordenadas[-1]:.1f}ms"
+            )
+        self.stdout.write(f"errores={len(errores)} intentos_inconsistentes={inconsistentes}")
+        for e in sorted(set(errores))[:5]:
+            self.stdout.write(self.style.WARNING(f"  {e}"))
@@ -0,0 +1,38 @@
+# ============================================
+# Aplicaciones/analisis/management/commands/cerrar_intentos_expirados.py
+# ============================================
+# Barrido de intentos abandonados: cierra como TIEMPO_AGOTADO los intentos
+# INICIADO/EN_PROGRESO cuya fecha_limite ya pasó.
+#
+#   Cron (cada minuto):   python manage.py cerrar_intentos_expirados
+#   Worker permanente:    python manage.py cerrar_intentos_expirados --intervalo 60
+#
+# Puede correr en varios procesos a la vez (FOR UPDATE SKIP LOCKED).
+# ============================================
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from Aplicaciones.analisis.services import cerrar_intentos_expirados
+
+
+class Command(BaseCommand):
+    help = "Cierra como TIEMPO_AGOTADO los intentos abiertos cuyo tiempo ya venció."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Intentos por lote/transacción.")
+        parser.add_argument("--examen", type=int, action="append", dest="examenes", help="Limitar a un examen (repetible).")
+        parser.add_argument("--intervalo", type=int, default=0, help="Segundos entre barridos (0 = una sola vez).")
+
+    def handle(self, *args, **opts):
+        while True:
+            close_old_connections()
+            resumen = cerrar_intentos_expirados(batch_size=opts["batch_size"], examen_ids=opts["examenes"])
+            self.stdout.write(
+                f"intentos_cerrados={resumen['intentos_cerrados']} "
+                f"lotes={resumen['lotes']} examenes={resumen['examenes']}"
+            )
+            if opts["intervalo"] <= 0:
+                break
+            time.sleep(opts["intervalo"])
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analisis', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='intentoexamen',
+            name='variante_id',
+            field=models.IntegerField(blank=True, help_text='ID de la variante del examen (si el examen tiene variantes)', null=True),
+        ),
+    ]
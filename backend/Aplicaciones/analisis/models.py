@@ -37,6 +37,11 @@ class IntentoExamen(models.Model):
         blank=True,
         help_text='ID del horario asignado'
     )
+    variante_id = models.IntegerField(
+        null=True,
+        blank=True,
+        help_text='ID de la variante del examen (si el examen tiene variantes)'
+    )
     numero_intento = models.IntegerField(
         default=1,
         validators=[MinValueValidator(1)]
@@ -230,31 +235,34 @@ class RespuestaEstudiante(models.Model):
         correcta = "✓" if self.es_correcta else "✗"
         return f"{correcta} {self.intento.estudiante_nombre} - Pregunta {self.pregunta_id}"
     
-    def evaluar_respuesta(self, opciones_correctas):
+    @staticmethod
+    def es_seleccion_correcta(opcion_id, opciones_ids, opciones_correctas):
+        """
+        Compara la selección del estudiante con las opciones correctas.
+        Selección múltiple: los conjuntos deben coincidir exactamente.
+        """
+        if opciones_ids:
+            return set(opciones_ids) == set(opciones_correctas)
+        return opcion_id in opciones_correctas
+
+    def evaluar_respuesta(self, opciones_correctas, save=True):
         """
         Evalúa la respuesta del estudiante
         opciones_correctas: lista de IDs de opciones correctas
+
+        Solo escribe su propia fila: los contadores del intento se actualizan
+        aparte con una sola UPDATE (ver services.actualizar_contadores_intento).
         """
-        if self.opciones_ids:
-            # Selección múltiple
-            respondidas = set(self.opciones_ids)
-            correctas = set(opciones_correctas)
-            self.es_correcta = respondidas == correctas
-        else:
-            # Opción única
-            self.es_correcta = self.opcion_id in opciones_correctas
-        
+        self.es_correcta = self.es_seleccion_correcta(
+            self.opcion_id, self.opciones_ids, opciones_correctas
+        )
+
         # Asignar puntaje
         if self.es_correcta:
             self.puntaje_obtenido = self.pregunta_ponderacion
         else:
             self.puntaje_obtenido = 0
-        
-        self.save()
+
+        if save:
+            self.save(update_fields=["es_correcta", "puntaje_obtenido", "fecha_actualizacion"])
         return self.es_correcta
-    
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Actualizar estadísticas del intento
-        if hasattr(self, 'intento'):
-            self.intento.save()
\ No newline at end of file
@@ -1,13 +1,28 @@
 # ============================================
 # Aplicaciones/analisis/services.py
 # ============================================
+from collections import defaultdict
 from decimal import Decimal
 from django.db import transaction
-from django.db.models import Sum
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 from .models import IntentoExamen, RespuestaEstudiante
-from Aplicaciones.examenes.models import Pregunta, OpcionRespuesta, Examen
+from Aplicaciones.examenes.models import Pregunta, OpcionRespuesta, Examen, VarianteExamen
+from Aplicaciones.examenes.services import clave_respuestas
+from Aplicaciones.examenes.variantes import escalar_variante, ponderaciones_variante
+
+
+ESTADOS_ABIERTOS = ["INICIADO", "EN_PROGRESO"]
+
+CAMPOS_CIERRE = [
+    "estado", "fecha_fin", "tiempo_total",
+    "preguntas_totales", "preguntas_respondidas",
+    "preguntas_correctas", "preguntas_incorrectas",
+    "puntaje_obtenido", "puntaje_total", "calificacion_final",
+    "fecha_actualizacion",
+]
 
 
 def _get_pregunta_info(pregunta_id: int):
@@ -37,28 +52,6 @@ def _opcion_pk_value(o: OpcionRespuesta) -> int:
     return int(val)
 
 
-def _get_opciones_correctas_ids(pregunta_id: int):
-    """
-    Devuelve [id_opcion, ...] correctas.
-    Hace fallback por si tu modelo usa pk 'id' y no 'id_opcion'.
-    También soporta FK pregunta con distintas rutas.
-    """
-    qs = None
-
-    # Caso común: FK 'pregunta' => columna pregunta_id
-    try:
-        qs = OpcionRespuesta.objects.filter(pregunta_id=pregunta_id, es_correcta=True)
-        list(qs[:1])  # fuerza evaluación temprana
-    except Exception:
-        qs = None
-
-    # Fallback
-    if qs is None:
-        qs = OpcionRespuesta.objects.filter(pregunta__id_pregunta=pregunta_id, es_correcta=True)
-
-    return [_opcion_pk_value(o) for o in qs]
-
-
 def _get_opcion_texto(pregunta_id: int, opcion_id: int) -> str:
     """
     Intenta traer el texto real de la opción (soporta texto / opcion_texto).
@@ -80,6 +73,21 @@ def _get_opcion_texto(pregunta_id: int, opcion_id: int) -> str:
     return getattr(op, "texto", None) or getattr(op, "opcion_texto", None) or ""
 
 
+def _pregunta_en_variante(variante_id: int, pregunta_id: int) -> bool:
+    preguntas = VarianteExamen.objects.filter(id_variante=variante_id).values_list("preguntas", flat=True).first()
+    # variante borrada: no se bloquea al estudiante a mitad del examen
+    return preguntas is None or pregunta_id in preguntas
+
+
+def _totales_variantes(variante_ids) -> dict:
+    """{id_variante: (preguntas, puntaje_total)} en una sola consulta."""
+    return {
+        vid: (len(preguntas or []), puntaje)
+        for vid, preguntas, puntaje in VarianteExamen.objects.filter(id_variante__in=set(variante_ids))
+        .values_list("id_variante", "preguntas", "puntaje_total")
+    }
+
+
 @transaction.atomic
 def guardar_y_evaluar_respuesta(intento: IntentoExamen, payload: dict) -> RespuestaEstudiante:
     """
@@ -104,6 +112,13 @@ def guardar_y_evaluar_respuesta(intento: IntentoExamen, payload: dict) -> Respue
     # ✅ seguridad: el intento debe corresponder al examen de esa pregunta
     if int(intento.examen_id) != int(info["examen_id"]):
         raise ValueError("La pregunta no pertenece al examen de este intento.")
+    if intento.variante_id and not _pregunta_en_variante(intento.variante_id, pregunta_id):
+        raise ValueError("La pregunta no pertenece a la variante de este intento.")
+
+    # con variante, la pregunta vale su ponderación reescalada al total de la variante
+    ponderacion = info["ponderacion"]
+    if intento.variante_id:
+        ponderacion = ponderaciones_variante(intento.examen_id, intento.variante_id).get(pregunta_id, ponderacion)
 
     # Si es single, asegúrate de que opciones_ids sea []
     if opcion_id is not None:
@@ -111,34 +126,71 @@ def guardar_y_evaluar_respuesta(intento: IntentoExamen, payload: dict) -> Respue
 
     opcion_texto = _get_opcion_texto(pregunta_id, opcion_id) if opcion_id else ""
 
+    # ✅ Evaluar con ids correctos ANTES de escribir: una sola escritura por respuesta
+    correctas_ids = clave_respuestas(info["examen_id"]).get(pregunta_id, [])
+    es_correcta = RespuestaEstudiante.es_seleccion_correcta(opcion_id, opciones_ids, correctas_ids)
+
     # Upsert: una respuesta por intento + pregunta
-    respuesta, _created = RespuestaEstudiante.objects.update_or_create(
+    respuesta, _ = RespuestaEstudiante.objects.update_or_create(
         intento=intento,
         pregunta_id=pregunta_id,
         defaults={
             "pregunta_enunciado": info["enunciado"],
-            "pregunta_ponderacion": info["ponderacion"],
+            "pregunta_ponderacion": ponderacion,
             "opcion_id": opcion_id,
             "opciones_ids": opciones_ids,
             "opcion_texto": opcion_texto,
             "tiempo_respuesta": tiempo_respuesta,
             "numero_orden": numero_orden,
+            "es_correcta": es_correcta,
+            "puntaje_obtenido": ponderacion if es_correcta else Decimal("0.00"),
         },
     )
 
-    # ✅ Evaluar con ids correctos
-    correctas_ids = _get_opciones_correctas_ids(pregunta_id)
-    respuesta.evaluar_respuesta(correctas_ids)  # setea es_correcta y puntaje_obtenido
-
     # Actualiza metadata del intento (sin finalizar)
-    intento.estado = "EN_PROGRESO"
-    intento.preguntas_totales = int(Pregunta.objects.filter(examen_id=intento.examen_id).count())
-    intento.preguntas_respondidas = intento.respuestas.count()
-    intento.save(update_fields=["estado", "preguntas_totales", "preguntas_respondidas", "fecha_actualizacion"])
+    actualizar_contadores_intento(intento)
 
     return respuesta
 
 
+def actualizar_contadores_intento(intento: IntentoExamen) -> int:
+    """
+    Actualiza los contadores del intento con UNA sola UPDATE (sin leer la fila):
+    - preguntas_respondidas se recuenta con una subconsulta sobre las
+      respuestas del intento (un reintento o una carrera no lo desvía).
+    - preguntas_totales se calcula en la misma sentencia con una subconsulta
+      (salvo intentos con variante: su total se fija al crearlos).
+    Evita el UPDATE completo de intentos_examen por cada respuesta guardada.
+    """
+    total_preguntas = (
+        Pregunta.objects.filter(examen_id=OuterRef("examen_id"))
+        .order_by()
+        .values("examen_id")
+        .annotate(c=Count("id_pregunta"))
+        .values("c")
+    )
+
+    total_respondidas = (
+        RespuestaEstudiante.objects.filter(intento_id=OuterRef("pk"))
+        .order_by()
+        .values("intento_id")
+        .annotate(c=Count("id_respuesta"))
+        .values("c")
+    )
+
+    campos = {
+        "estado": "EN_PROGRESO",
+        "preguntas_respondidas": Coalesce(Subquery(total_respondidas, output_field=IntegerField()), Value(0)),
+        "preguntas_totales": Case(
+            When(variante_id__isnull=False, then=F("preguntas_totales")),
+            default=Coalesce(Subquery(total_preguntas, output_field=IntegerField()), Value(0)),
+        ),
+        "fecha_actualizacion": timezone.now(),
+    }
+
+    return IntentoExamen.objects.filter(pk=intento.pk).update(**campos)
+
+
 @transaction.atomic
 def finalizar_intento(intento: IntentoExamen, estado: str = "COMPLETADO") -> IntentoExamen:
     """
@@ -153,7 +205,11 @@ def finalizar_intento(intento: IntentoExamen, estado: str = "COMPLETADO") -> Int
 
     respuestas = intento.respuestas.all()
 
-    intento.preguntas_totales = int(Pregunta.objects.filter(examen_id=intento.examen_id).count())
+    variante = _totales_variantes([intento.variante_id]).get(intento.variante_id) if intento.variante_id else None
+    if variante:
+        intento.preguntas_totales = variante[0]
+    else:
+        intento.preguntas_totales = int(Pregunta.objects.filter(examen_id=intento.examen_id).count())
     intento.preguntas_respondidas = respuestas.count()
     intento.preguntas_correctas = respuestas.filter(es_correcta=True).count()
     intento.preguntas_incorrectas = respuestas.filter(es_correcta=False).count()
@@ -162,7 +218,9 @@ def finalizar_intento(intento: IntentoExamen, estado: str = "COMPLETADO") -> Int
     intento.puntaje_obtenido = total_obtenido
 
     ex = Examen.objects.filter(id_examen=intento.examen_id).first()
-    if ex:
+    if variante:
+        intento.puntaje_total = variante[1]
+    elif ex:
         if ex.puntaje_total is None or ex.puntaje_total == 0:
             ex.calcular_puntaje_total()
         intento.puntaje_total = ex.puntaje_total
@@ -180,12 +238,265 @@ def finalizar_intento(intento: IntentoExamen, estado: str = "COMPLETADO") -> Int
     intento.puntaje_obtenido = Decimal(intento.puntaje_obtenido).quantize(Decimal("0.01"))
     intento.puntaje_total = Decimal(intento.puntaje_total or 0).quantize(Decimal("0.01"))
 
-    intento.save(update_fields=[
-        "estado", "fecha_fin", "tiempo_total",
-        "preguntas_totales", "preguntas_respondidas",
-        "preguntas_correctas", "preguntas_incorrectas",
-        "puntaje_obtenido", "puntaje_total", "calificacion_final",
-        "fecha_actualizacion"
-    ])
+    intento.save(update_fields=CAMPOS_CIERRE)
 
     return intento
+
+
+# =========================================================
+# CIERRE MASIVO DE INTENTOS EXPIRADOS (TIEMPO_AGOTADO)
+# =========================================================
+def cerrar_intentos_expirados(batch_size: int = 500, examen_ids=None) -> dict:
+    """
+    Cierra como TIEMPO_AGOTADO los intentos abiertos cuya fecha_limite ya pasó.
+
+    - Busca por (examen_id, estado) para usar el índice compuesto.
+    - Procesa en lotes acotados (batch_size), cada lote en su propia transacción.
+    - Es seguro en paralelo: cada lote bloquea sus filas con
+      SELECT ... FOR UPDATE SKIP LOCKED, así dos ejecuciones nunca cierran
+      el mismo intento.
+    """
+    batch_size = max(1, int(batch_size))
+    ahora = timezone.now()
+
+    if examen_ids is None:
+        examen_ids = list(Examen.objects.order_by("id_examen").values_list("id_examen", flat=True))
+
+    resumen = {"intentos_cerrados": 0, "lotes": 0, "examenes": 0}
+    afectados = set()
+
+    for i in range(0, len(examen_ids), 200):
+        grupo = examen_ids[i:i + 200]
+        while True:
+            cerrados, examenes = _cerrar_lote_expirados(grupo, ahora, batch_size)
+            if cerrados:
+                resumen["lotes"] += 1
+                resumen["intentos_cerrados"] += cerrados
+                afectados |= examenes
+            if cerrados < batch_size:
+                break
+
+    resumen["examenes"] = len(afectados)
+    return resumen
+
+
+@transaction.atomic
+def _cerrar_lote_expirados(examen_ids, ahora, batch_size: int):
+    intentos = list(
+        IntentoExamen.objects.select_for_update(skip_locked=True)
+        .filter(examen_id__in=examen_ids, estado__in=ESTADOS_ABIERTOS, fecha_limite__lt=ahora)
+        .order_by("id_intento")[:batch_size]
+    )
+    if not intentos:
+        return 0, set()
+
+    ids = [it.id_intento for it in intentos]
+    ex_ids = {it.examen_id for it in intentos}
+
+    # Estadísticas de respuestas de TODO el lote en una sola consulta
+    stats = {
+        row["intento_id"]: row
+        for row in RespuestaEstudiante.objects.filter(intento_id__in=ids)
+        .values("intento_id")
+        .annotate(
+            respondidas=Count("id_respuesta"),
+            correctas=Count("id_respuesta", filter=Q(es_correcta=True)),
+            obtenido=Sum("puntaje_obtenido"),
+        )
+    }
+
+    # Totales por examen (preguntas y ponderación) en una sola consulta
+    totales = {
+        row["examen_id"]: row
+        for row in Pregunta.objects.filter(examen_id__in=ex_ids)
+        .values("examen_id")
+        .annotate(n=Count("id_pregunta"), suma=Sum("ponderacion"))
+    }
+    puntajes = dict(
+        Examen.objects.filter(id_examen__in=ex_ids).values_list("id_examen", "puntaje_total")
+    )
+    variantes = _totales_variantes(it.variante_id for it in intentos if it.variante_id)
+
+    dos = Decimal("0.01")
+    for it in intentos:
+        s = stats.get(it.id_intento, {})
+        t = totales.get(it.examen_id, {})
+
+        # El intento termina cuando venció el tiempo, no cuando pasa el barrido
+        it.estado = "TIEMPO_AGOTADO"
+        it.fecha_fin = it.fecha_limite
+        if it.fecha_inicio:
+            it.tiempo_total = max(0, int((it.fecha_fin - it.fecha_inicio).total_seconds()))
+
+        v = variantes.get(it.variante_id)
+        it.preguntas_totales = v[0] if v else int(t.get("n") or 0)
+        it.preguntas_respondidas = int(s.get("respondidas") or 0)
+        it.preguntas_correctas = int(s.get("correctas") or 0)
+        it.preguntas_incorrectas = it.preguntas_respondidas - it.preguntas_correctas
+
+        puntaje_total = v[1] if v else puntajes.get(it.examen_id) or t.get("suma") or it.puntaje_total or 0
+        it.puntaje_obtenido = Decimal(s.get("obtenido") or 0).quantize(dos)
+        it.puntaje_total = Decimal(puntaje_total).quantize(dos)
+        it.calificacion_final = it.puntaje_obtenido
+        it.fecha_actualizacion = ahora
+
+    IntentoExamen.objects.bulk_update(intentos, CAMPOS_CIERRE, batch_size=batch_size)
+    return len(intentos), ex_ids
+
+
+
+# =========================================================
+# RECALIFICACIÓN MASIVA (cambio de clave de respuestas)
+# =========================================================
+@transaction.atomic
+def recalificar_examen(examen_id: int, aplicar: bool = True, batch_size: int = 2000) -> dict:
+    """
+    Recalcula es_correcta/puntaje de TODAS las respuestas de un examen con la
+    clave vigente, y los totales de cada intento. Un solo trabajo:
+    - la clave del examen se carga en memoria con 2 consultas,
+    - las respuestas se recorren en streaming (iterator) y solo se escriben
+      las que cambian (bulk_update por lotes),
+    - los totales de intentos salen de un único GROUP BY.
+    Con aplicar=False solo reporta el diff, sin escribir.
+    """
+    ponderaciones = dict(
+        Pregunta.objects.filter(examen_id=examen_id).values_list("id_pregunta", "ponderacion")
+    )
+    correctas = defaultdict(list)
+    for pregunta_id, opcion_id in OpcionRespuesta.objects.filter(
+        pregunta__examen_id=examen_id, es_correcta=True
+    ).values_list("pregunta_id", "id_opcion"):
+        correctas[pregunta_id].append(opcion_id)
+
+    # con variantes, cada intento se califica con las ponderaciones reescaladas de la suya
+    pesos_variante = {
+        vid: escalar_variante(preguntas, ponderaciones, total)
+        for vid, preguntas, total in VarianteExamen.objects.filter(examen_id=examen_id)
+        .values_list("id_variante", "preguntas", "puntaje_total")
+    }
+    variante_de = dict(
+        IntentoExamen.objects.filter(examen_id=examen_id, variante_id__in=list(pesos_variante))
+        .values_list("id_intento", "variante_id")
+    )
+
+    # --- 1) Respuestas ---
+    revisadas = 0
+    cambiadas = []
+    # suma de puntajes por intento antes/después (el total guardado en el
+    # intento vale 0 mientras no se finaliza: no sirve como "antes")
+    suma_antes = defaultdict(lambda: Decimal("0.00"))
+    suma_despues = defaultdict(lambda: Decimal("0.00"))
+
+    respuestas = RespuestaEstudiante.objects.filter(intento__examen_id=examen_id).only(
+        "id_respuesta", "intento_id", "pregunta_id", "opcion_id", "opciones_ids",
+        "es_correcta", "puntaje_obtenido", "pregunta_ponderacion",
+    )
+    for r in respuestas.iterator(chunk_size=batch_size):
+        revisadas += 1
+        ponderacion = ponderaciones.get(r.pregunta_id)
+        if r.intento_id in variante_de and ponderacion is not None:
+            ponderacion = pesos_variante[variante_de[r.intento_id]].get(r.pregunta_id, ponderacion)
+
+        if ponderacion is None:
+            # La pregunta ya no existe en el examen: no suma puntos
+            es_correcta, puntaje, ponderacion = False, Decimal("0.00"), r.pregunta_ponderacion
+        else:
+            es_correcta = RespuestaEstudiante.es_seleccion_correcta(
+                r.opcion_id, r.opciones_ids, correctas.get(r.pregunta_id, [])
+            )
+            puntaje = ponderacion if es_correcta else Decimal("0.00")
+
+        suma_antes[r.intento_id] += Decimal(r.puntaje_obtenido or 0)
+        suma_despues[r.intento_id] += Decimal(puntaje)
+
+        if (
+            es_correcta != r.es_correcta
+            or Decimal(puntaje) != Decimal(r.puntaje_obtenido)
+            or Decimal(ponderacion) != Decimal(r.pregunta_ponderacion)
+        ):
+            r.es_correcta = es_correcta
+            r.puntaje_obtenido = puntaje
+            r.pregunta_ponderacion = ponderacion
+            cambiadas.append(r)
+
+    # --- 2) Diff por intento ---
+    dos = Decimal("0.01")
+    puntaje_total = Decimal(sum(ponderaciones.values(), Decimal("0.00"))).quantize(dos)
+
+    puntaje_variante = {
+        vid: Decimal(sum(pesos.values(), Decimal("0.00"))).quantize(dos)
+        for vid, pesos in pesos_variante.items()
+    }
+
+    intentos = list(
+        IntentoExamen.objects.filter(examen_id=examen_id).only(
+            "id_intento", "estudiante_id", "estudiante_nombre", "estado", "variante_id",
+            "puntaje_obtenido", "puntaje_total", "calificacion_final",
+            "preguntas_correctas", "preguntas_incorrectas", "preguntas_respondidas",
+        )
+    )
+    diff = []
+    for it in intentos:
+        antes = suma_antes[it.id_intento].quantize(dos)
+        despues = suma_despues[it.id_intento].quantize(dos)
+        if despues != antes:
+            diff.append({
+                "id_intento": it.id_intento,
+                "estudiante_id": it.estudiante_id,
+                "estudiante_nombre": it.estudiante_nombre,
+                "antes": str(antes),
+                "despues": str(despues),
+                "delta": str(despues - antes),
+            })
+
+    resumen = {
+        "examen_id": examen_id,
+        "aplicado": bool(aplicar),
+        "respuestas_revisadas": revisadas,
+        "respuestas_cambiadas": len(cambiadas),
+        "intentos_total": len(intentos),
+        "intentos_cambiados": len(diff),
+        "puntaje_total": str(puntaje_total),
+        "diff": diff,
+    }
+    if not aplicar:
+        return resumen
+
+    # --- 3) Escritura en bloque ---
+    if cambiadas:
+        RespuestaEstudiante.objects.bulk_update(
+            cambiadas, ["es_correcta", "puntaje_obtenido", "pregunta_ponderacion"], batch_size=batch_size
+        )
+
+    stats = {
+        row["intento_id"]: row
+        for row in RespuestaEstudiante.objects.filter(intento__examen_id=examen_id)
+        .values("intento_id")
+        .annotate(
+            respondidas=Count("id_respuesta"),
+            correctas=Count("id_respuesta", filter=Q(es_correcta=True)),
+            obtenido=Sum("puntaje_obtenido"),
+        )
+    }
+    ahora = timezone.now()
+    for it in intentos:
+        st = stats.get(it.id_intento, {})
+        respondidas = int(st.get("respondidas") or 0)
+        it.preguntas_correctas = int(st.get("correctas") or 0)
+        it.preguntas_incorrectas = respondidas - it.preguntas_correctas
+        it.puntaje_obtenido = Decimal(st.get("obtenido") or 0).quantize(dos)
+        it.puntaje_total = puntaje_variante.get(it.variante_id, puntaje_total)
+        # solo intentos ya cerrados tienen calificación final
+        if it.estado not in ESTADOS_ABIERTOS:
+            it.calificacion_final = it.puntaje_obtenido
+        it.fecha_actualizacion = ahora
+
+    IntentoExamen.objects.bulk_update(
+        intentos,
+        [
+            "preguntas_correctas", "preguntas_incorrectas", "puntaje_obtenido",
+            "puntaje_total", "calificacion_final", "fecha_actualizacion",
+        ],
+        batch_size=batch_size,
+    )
+    return resumen
@@ -1,3 +1,62 @@
+from datetime import timedelta
+from decimal import Decimal
+
 from django.test import TestCase
+from django.utils import timezone
+
+from Aplicaciones.examenes.models import Examen, OpcionRespuesta, Pregunta
+
+from .models import IntentoExamen
+from .services import actualizar_contadores_intento, guardar_y_evaluar_respuesta
+
+
+def crear_examen(n=3, ponderacion="2.00"):
+    examen = Examen.objects.create(
+        titulo="Examen", docente_id=1, docente_nombre="Doc", estado="PUBLICADO",
+        puntaje_total=Decimal(ponderacion) * n,
+    )
+    for i in range(n):
+        p = Pregunta.objects.create(examen=examen, enunciado=f"Pregunta {i}", orden=i, ponderacion=Decimal(ponderacion))
+        OpcionRespuesta.objects.create(pregunta=p, clave="A", texto="Sí", es_correcta=True, orden=0)
+        OpcionRespuesta.objects.create(pregunta=p, clave="B", texto="No", orden=1)
+    return examen
+
+
+def crear_intento(examen, estudiante_id=10, **extra):
+    campos = dict(
+        estudiante_id=estudiante_id, estudiante_nombre="Est", estudiante_cedula="0900000001",
+        examen_id=examen.id_examen, examen_titulo=examen.titulo,
+        fecha_limite=timezone.now() + timedelta(hours=1), puntaje_total=examen.puntaje_total,
+    )
+    campos.update(extra)
+    return IntentoExamen.objects.create(**campos)
+
+
+class ContadoresIntentoTests(TestCase):
+    def setUp(self):
+        self.examen = crear_examen()
+        self.intento = crear_intento(self.examen)
+        self.preguntas = list(self.examen.preguntas.order_by("orden"))
+
+    def _responder(self, pregunta, correcta=True):
+        opcion = pregunta.opciones.get(es_correcta=correcta)
+        return guardar_y_evaluar_respuesta(self.intento, {"pregunta_id": pregunta.pk, "opcion_id": opcion.pk})
+
+    def test_reenviar_una_respuesta_no_la_cuenta_dos_veces(self):
+        self._responder(self.preguntas[0])
+        self._responder(self.preguntas[0], correcta=False)
+        self._responder(self.preguntas[1])
+
+        self.intento.refresh_from_db()
+        self.assertEqual(self.intento.estado, "EN_PROGRESO")
+        self.assertEqual(self.intento.preguntas_respondidas, 2)
+        self.assertEqual(self.intento.preguntas_totales, 3)
+
+    def test_recuenta_un_contador_desviado(self):
+        self._responder(self.preguntas[0])
+        IntentoExamen.objects.filter(pk=self.intento.pk).update(preguntas_respondidas=7)
+
+        actualizar_contadores_intento(self.intento)
 
-# Create your tests here.
+        self.intento.refresh_from_db()
+        self.assertEqual(self.intento.preguntas_respondidas, 1)
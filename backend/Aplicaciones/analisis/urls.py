@@ -2,7 +2,13 @@
 # Aplicaciones/analisis/urls.py
 # ============================================
 from django.urls import path
-from .views import ListaCrearIntentosView, DetalleIntentoView, GuardarRespuestaView, FinalizarIntentoView
+from .views import (
+    ListaCrearIntentosView,
+    DetalleIntentoView,
+    GuardarRespuestaView,
+    FinalizarIntentoView,
+    RecalificarExamenView,
+)
 
 app_name = "analisis"
 
@@ -11,4 +17,5 @@ urlpatterns = [
     path("intentos/<int:id>/", DetalleIntentoView.as_view(), name="intento_detail"),
     path("intentos/<int:id>/respuestas/", GuardarRespuestaView.as_view(), name="guardar_respuesta"),
     path("intentos/<int:id>/finalizar/", FinalizarIntentoView.as_view(), name="intento_finalizar"),
+    path("examenes/<int:examen_id>/recalificar/", RecalificarExamenView.as_view(), name="recalificar_examen"),
 ]
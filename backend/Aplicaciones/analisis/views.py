@@ -16,7 +16,11 @@ from .serializers import (
     RespuestaEstudianteSerializer,
     FinalizarIntentoSerializer,
 )
-from .services import guardar_y_evaluar_respuesta, finalizar_intento
+from .services import guardar_y_evaluar_respuesta, finalizar_intento, recalificar_examen
+from Aplicaciones.examenes.models import Examen
+from Aplicaciones.examenes.views import can_manage_exam
+from Aplicaciones.examenes.variantes import variante_asignada
+from backend.paginacion import PaginacionCursor
 
 
 def _get_user_id(request):
@@ -43,17 +47,27 @@ class ListaCrearIntentosView(APIView):
         if estado:
             qs = qs.filter(estado=estado)
 
-        return Response({
-            "total": qs.count(),
-            "intentos": IntentoExamenSerializer(qs, many=True).data
-        })
+        return PaginacionCursor(("-fecha_inicio", "-id_intento")).responder(
+            request, qs, IntentoExamenSerializer, "intentos"
+        )
 
     def post(self, request):
         serializer = CrearIntentoExamenSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-        intento = serializer.save(estado="INICIADO")
+        # si el examen tiene variantes, el intento queda fijado a la del estudiante
+        datos = serializer.validated_data
+        variante = variante_asignada(datos["examen_id"], datos["estudiante_id"], datos.get("horario_id"))
+        extra = {}
+        if variante is not None:
+            extra = {
+                "variante_id": variante.id_variante,
+                "preguntas_totales": len(variante.preguntas),
+                "puntaje_total": variante.puntaje_total,
+            }
+
+        intento = serializer.save(estado="INICIADO", **extra)
         return Response(IntentoExamenSerializer(intento).data, status=status.HTTP_201_CREATED)
 
 
@@ -141,3 +155,21 @@ class FinalizarIntentoView(APIView):
                 {"detail": "Error finalizando intento", "error": str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+
+
+class RecalificarExamenView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, examen_id):
+        """
+        Recalcula las notas de todo el examen con la clave de respuestas actual.
+        ?simular=true devuelve el diff sin escribir.
+        """
+        examen = get_object_or_404(Examen, id_examen=examen_id)
+
+        if not can_manage_exam(request.user, examen):
+            raise PermissionDenied("No tienes permiso para recalificar este examen.")
+
+        simular = str(request.query_params.get("simular", "")).lower() in ("1", "true")
+        resumen = recalificar_examen(examen.id_examen, aplicar=not simular)
+        return Response(resumen, status=status.HTTP_200_OK)
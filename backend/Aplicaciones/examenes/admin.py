@@ -1,7 +1,10 @@
 from django.contrib import admin
-from .models import Examen, Pregunta, OpcionRespuesta, Horario
+from .models import Examen, Pregunta, OpcionRespuesta, Horario, RespuestaLLMCache, VarianteExamen, MetricaLLM
 # Register your models here.
 admin.site.register(Examen)
 admin.site.register(Pregunta)
 admin.site.register(OpcionRespuesta)
-admin.site.register(Horario)
\ No newline at end of file
+admin.site.register(Horario)
+admin.site.register(RespuestaLLMCache)
+admin.site.register(VarianteExamen)
+admin.site.register(MetricaLLM)
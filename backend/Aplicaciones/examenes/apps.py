@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ExamenesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Aplicaciones.examenes'
+
+    def ready(self):
+        # versiones de cache de materias, exámenes y preguntas
+        from . import signals  # noqa: F401
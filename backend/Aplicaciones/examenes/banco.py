@@ -0,0 +1,223 @@
+# ============================================
+# Aplicaciones/examenes/banco.py
+# ============================================
+# Banco de preguntas por materia con detección de casi-duplicados.
+#
+# Cada Pregunta guarda una firma MinHash (64 x uint32) de los 5-gramas de
+# caracteres de su enunciado. Por materia se arma en memoria un índice LSH
+# (16 bandas x 4 filas): una consulta solo compara contra las preguntas que
+# comparten alguna banda, no contra todo el banco.
+#
+# Similitud estimada = fracción de posiciones iguales entre firmas (~Jaccard).
+# ============================================
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from .models import Pregunta
+
+
+NUM_PERMUTACIONES = 64
+BANDAS = 16
+FILAS = NUM_PERMUTACIONES // BANDAS
+TAM_SHINGLE = 5
+
+# coeficientes fijos: las firmas guardadas en BD deben ser reproducibles
+_rng = np.random.default_rng(20240917)
+_A = _rng.integers(1, 2 ** 63, NUM_PERMUTACIONES, dtype=np.uint64) | np.uint64(1)
+_B = _rng.integers(0, 2 ** 63, NUM_PERMUTACIONES, dtype=np.uint64)
+_VACIA = np.full(NUM_PERMUTACIONES, np.iinfo(np.uint32).max, dtype=np.uint32)
+
+ESTADOS_EXCLUIDOS = ("GENERANDO", "ERROR_GENERACION")
+
+
+def _umbral_default() -> float:
+    return float(getattr(settings, "BANCO_UMBRAL_SIMILITUD", 0.7))
+
+
+def _shingles(texto) -> set:
+    # sin tildes ni signos: "¿Cuál...?" y "Cual..." comparten shingles
+    t = unicodedata.normalize("NFKD", str(texto or "").lower())
+    t = "".join(c for c in t if not unicodedata.combining(c))
+    t = re.sub(r"[^\w\s]", "", t)
+    t = re.sub(r"\s+", " ", t).strip()
+    if len(t) <= TAM_SHINGLE:
+        return {t} if t else set()
+    return {t[i:i + TAM_SHINGLE] for i in range(len(t) - TAM_SHINGLE + 1)}
+
+
+def firma_minhash(texto) -> np.ndarray:
+    sh = _shingles(texto)
+    if not sh:
+        return _VACIA.copy()
+    x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in sh), dtype=np.uint64, count=len(sh))
+    # hashing multiplicativo: (a*x + b) mod 2^64, bits altos
+    h = (_A[:, None] * x[None, :] + _B[:, None]) >> np.uint64(32)
+    return h.min(axis=1).astype(np.uint32)
+
+
+def firma_bytes(texto) -> bytes:
+    return firma_minhash(texto).tobytes()
+
+
+def _desde_bytes(raw) -> np.ndarray:
+    return np.frombuffer(bytes(raw), dtype=np.uint32)
+
+
+# =========================================================
+# Índice LSH en memoria (uno por materia)
+# =========================================================
+class IndiceBanco:
+    def __init__(self, ids: np.ndarray, examenes: np.ndarray, firmas: np.ndarray):
+        self.ids = ids
+        self.examenes = examenes
+        self.firmas = firmas
+        self.creado = time.monotonic()
+
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = defaultdict(list)
+        for b in range(BANDAS):
+            bandas = np.ascontiguousarray(firmas[:, b * FILAS:(b + 1) * FILAS])
+            for fila, clave in enumerate(bandas):
+                self._buckets[(b, clave.tobytes())].append(fila)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _candidatos(self, firma: np.ndarray) -> np.ndarray:
+        filas = set()
+        for b in range(BANDAS):
+            filas.update(self._buckets.get((b, firma[b * FILAS:(b + 1) * FILAS].tobytes()), ()))
+        return np.fromiter(filas, dtype=np.int64, count=len(filas))
+
+    def similares(
+        self,
+        firma: np.ndarray,
+        umbral: float,
+        excluir_examen: Optional[int] = None,
+        excluir_pregunta: Optional[int] = None,
+    ) -> List[Tuple[int, float]]:
+        """[(id_pregunta, similitud)] con similitud >= umbral, de mayor a menor."""
+        filas = self._candidatos(firma)
+        if not len(filas):
+            return []
+
+        sim = (self.firmas[filas] == firma).mean(axis=1)
+        ok = sim >= umbral
+        if excluir_examen is not None:
+            ok &= self.examenes[filas] != excluir_examen
+        if excluir_pregunta is not None:
+            ok &= self.ids[filas] != excluir_pregunta
+
+        filas, sim = filas[ok], sim[ok]
+        orden = np.argsort(-sim)
+        return [(int(self.ids[filas[i]]), float(sim[i])) for i in orden]
+
+
+_indices: Dict[int, IndiceBanco] = {}
+_lock = threading.Lock()
+
+
+def _construir_indice(materia_id: int) -> IndiceBanco:
+    filas = list(
+        Pregunta.objects.filter(examen__materia_id=materia_id, minhash__isnull=False)
+        .exclude(examen__estado__in=ESTADOS_EXCLUIDOS)
+        .values_list("id_pregunta", "examen_id", "minhash")
+    )
+    if not filas:
+        vacio = np.empty(0, dtype=np.int64)
+        return IndiceBanco(vacio, vacio, np.empty((0, NUM_PERMUTACIONES), dtype=np.uint32))
+
+    ids = np.fromiter((f[0] for f in filas), dtype=np.int64, count=len(filas))
+    examenes = np.fromiter((f[1] for f in filas), dtype=np.int64, count=len(filas))
+    firmas = np.vstack([_desde_bytes(f[2]) for f in filas])
+    return IndiceBanco(ids, examenes, firmas)
+
+
+def obtener_indice(materia_id: int) -> IndiceBanco:
+    """
+    Índice de la materia, reconstruido si no existe o si tiene más de
+    BANCO_INDICE_TTL segundos (otros procesos también escriben preguntas).
+    """
+    ttl = float(getattr(settings, "BANCO_INDICE_TTL", 300))
+    indice = _indices.get(materia_id)
+    if indice is not None and time.monotonic() - indice.creado < ttl:
+        return indice
+
+    with _lock:
+        indice = _indices.get(materia_id)
+        if indice is None or time.monotonic() - indice.creado >= ttl:
+            indice = _construir_indice(materia_id)
+            _indices[materia_id] = indice
+    return indice
+
+
+def invalidar_indice(materia_id: Optional[int]) -> None:
+    if materia_id is not None:
+        _indices.pop(materia_id, None)
+
+
+# =========================================================
+# Consultas
+# =========================================================
+def buscar_similares(
+    materia_id: int,
+    texto: str,
+    umbral: Optional[float] = None,
+    excluir_examen: Optional[int] = None,
+    excluir_pregunta: Optional[int] = None,
+) -> List[Tuple[int, float]]:
+    """Casi-duplicados vigentes del enunciado dentro del banco de la materia."""
+    umbral = _umbral_default() if umbral is None else umbral
+    hits = obtener_indice(materia_id).similares(
+        firma_minhash(texto), umbral, excluir_examen=excluir_examen, excluir_pregunta=excluir_pregunta
+    )
+    if not hits:
+        return hits
+
+    # el índice puede traer preguntas ya borradas (hasta que venza el TTL)
+    vigentes = set(Pregunta.objects.filter(id_pregunta__in=[i for i, _ in hits]).values_list("id_pregunta", flat=True))
+    return [(i, s) for i, s in hits if i in vigentes]
+
+
+def filtro_repetidas(materia_id: Optional[int], excluir_examen: Optional[int] = None) -> Optional[Callable[[dict], bool]]:
+    """
+    Predicado para la generación IA: True si la pregunta (dict del payload)
+    ya existe casi igual en el banco. None si no aplica.
+    """
+    if materia_id is None or not getattr(settings, "BANCO_RECHAZAR_DUPLICADAS", True):
+        return None
+
+    indice = obtener_indice(materia_id)
+    if not len(indice):
+        return None
+
+    umbral = _umbral_default()
+
+    def es_repetida(p: dict) -> bool:
+        return bool(indice.similares(firma_minhash(p.get("enunciado")), umbral, excluir_examen=excluir_examen))
+
+    return es_repetida
+
+
+def _pregunta_a_payload(p: Pregunta) -> dict:
+    opciones = sorted(p.opciones.all(), key=lambda o: (o.orden, o.id_opcion))
+    return {
+        "tipo": p.tipo,
+        "dificultad": p.dificultad,
+        "tema": p.tema,
+        "resultado_aprendizaje": p.resultado_aprendizaje,
+        "enunciado": p.enunciado,
+        "ponderacion": float(p.ponderacion),
+        "opciones": [{"clave": o.clave, "texto": o.texto} for o in opciones],
+        "correctas": [o.clave for o in opciones if o.es_correcta],
+        "respuesta_texto": p.respuesta_texto,
+        "explicacion": p.explicacion,
+        "origen_banco": p.id_pregunta,
+    }
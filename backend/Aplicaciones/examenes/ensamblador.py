@@ -0,0 +1,250 @@
+# ============================================
+# Aplicaciones/examenes/ensamblador.py
+# ============================================
+# Arma exámenes a partir del banco de preguntas de la materia siguiendo un
+# "blueprint" (el mismo formato de parametros_generacion):
+#   numero_preguntas, distribucion_tipos, distribucion_dificultad (opcional),
+#   enfoque_tematico, nivel, puntaje_total
+#
+# 1) PoolPreguntas: preguntas de la materia sin duplicados exactos ni
+#    casi-duplicados (MinHash del banco), en arreglos numpy.
+# 2) plan(): cuántas preguntas tomar de cada celda (tipo, dificultad) con un
+#    flujo máximo sobre las cantidades disponibles; lo que no alcanza son
+#    los faltantes (los completa el LLM).
+# 3) muestrear(): elige las preguntas de cada celda priorizando tema y
+#    nivel, con desempate aleatorio. El plan se calcula una vez y cada
+#    variante es solo un muestreo -> miles de variantes por segundo.
+# ============================================
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .banco import ESTADOS_EXCLUIDOS, _desde_bytes, _pregunta_a_payload, _umbral_default, firma_minhash, obtener_indice
+from .models import Pregunta
+
+
+TIPOS = ("OPCION_MULTIPLE", "SELECCION_MULTIPLE", "VERDADERO_FALSO", "RESPUESTA_CORTA")
+DIFICULTADES = ("FACIL", "MEDIA", "DIFICIL")
+
+
+def _expandir(numero: int, distribucion: Optional[dict], validos: tuple) -> Dict[str, int]:
+    """
+    {clave: cantidad} que suma exactamente `numero` (se recorta o se completa
+    con la clave mayoritaria, igual que la generación por lotes).
+    """
+    items = []
+    for k, cant in (distribucion or {}).items():
+        if k in validos:
+            items.extend([k] * max(0, int(cant or 0)))
+    if not items:
+        items = [validos[0]]
+    mayoritario = max(set(items), key=items.count)
+    items = items[:numero] + [mayoritario] * max(0, numero - len(items))
+
+    conteo = {}
+    for k in items:
+        conteo[k] = conteo.get(k, 0) + 1
+    return conteo
+
+
+def _flujo_maximo(req_filas: List[int], req_cols: List[int], disp: np.ndarray) -> np.ndarray:
+    """
+    Asignación (filas=tipos, columnas=dificultades) que maximiza el total
+    respetando demandas por fila/columna y lo disponible en cada celda
+    (Edmonds-Karp; el grafo tiene a lo sumo 9 nodos internos).
+    """
+    nf, nc = disp.shape
+    s, t = 0, 1 + nf + nc
+    cap = np.zeros((t + 1, t + 1), dtype=np.int64)
+    for i in range(nf):
+        cap[s, 1 + i] = req_filas[i]
+        for j in range(nc):
+            cap[1 + i, 1 + nf + j] = disp[i, j]
+    for j in range(nc):
+        cap[1 + nf + j, t] = req_cols[j]
+
+    flujo = np.zeros_like(cap)
+    while True:
+        previo = [-1] * (t + 1)
+        previo[s] = s
+        cola = deque([s])
+        while cola and previo[t] < 0:
+            u = cola.popleft()
+            for v in range(t + 1):
+                if previo[v] < 0 and cap[u, v] - flujo[u, v] > 0:
+                    previo[v] = u
+                    cola.append(v)
+        if previo[t] < 0:
+            break
+
+        delta, v = None, t
+        while v != s:
+            u = previo[v]
+            r = cap[u, v] - flujo[u, v]
+            delta = r if delta is None else min(delta, r)
+            v = u
+        v = t
+        while v != s:
+            u = previo[v]
+            flujo[u, v] += delta
+            flujo[v, u] -= delta
+            v = u
+
+    return flujo[1:1 + nf, 1 + nf:1 + nf + nc].clip(min=0)
+
+
+class PoolPreguntas:
+    """Preguntas únicas de una materia (opcionalmente sin las de un examen)."""
+
+    def __init__(self, materia_id: int, excluir_examen: Optional[int] = None):
+        self.materia_id = materia_id
+        self.excluir_examen = excluir_examen
+        self.indice = obtener_indice(materia_id)
+
+        qs = Pregunta.objects.filter(examen__materia_id=materia_id).exclude(examen__estado__in=ESTADOS_EXCLUIDOS)
+        if excluir_examen is not None:
+            qs = qs.exclude(examen_id=excluir_examen)
+        filas = qs.order_by("id_pregunta").values_list(
+            "id_pregunta", "tipo", "dificultad", "tema", "examen__nivel", "hash_contenido", "minhash", "enunciado"
+        )
+
+        umbral = _umbral_default()
+        vistos_hash, ids_ok = set(), set()
+        ids, tipos, difs, temas, niveles = [], [], [], [], []
+        for pid, tipo, dif, tema, nivel, h, mh, enunciado in filas:
+            if tipo not in TIPOS or dif not in DIFICULTADES:
+                continue
+            if h and h in vistos_hash:
+                continue
+            # casi-duplicado de una ya aceptada -> se queda la primera
+            firma = _desde_bytes(mh) if mh else firma_minhash(enunciado)
+            if any(i in ids_ok for i, _ in self.indice.similares(firma, umbral, excluir_pregunta=pid)):
+                continue
+            if h:
+                vistos_hash.add(h)
+            ids_ok.add(pid)
+            ids.append(pid)
+            tipos.append(TIPOS.index(tipo))
+            difs.append(DIFICULTADES.index(dif))
+            temas.append((tema or "").strip().lower())
+            niveles.append(nivel)
+
+        self.ids = np.array(ids, dtype=np.int64)
+        self.tipos = np.array(tipos, dtype=np.int8)
+        self.difs = np.array(difs, dtype=np.int8)
+        self.temas = temas
+        self.niveles = np.array(niveles, dtype=object)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def disponibles(self) -> np.ndarray:
+        disp = np.zeros((len(TIPOS), len(DIFICULTADES)), dtype=np.int64)
+        np.add.at(disp, (self.tipos, self.difs), 1)
+        return disp
+
+    def prioridad(self, blueprint: dict) -> np.ndarray:
+        """2 si el tema está en enfoque_tematico, +1 si es del mismo nivel."""
+        enfoque = [str(e).strip().lower() for e in (blueprint.get("enfoque_tematico") or []) if str(e).strip()]
+        tema_ok = np.array(
+            [bool(t) and any(e in t or t in e for e in enfoque) for t in self.temas], dtype=np.float64
+        ) if enfoque else np.zeros(len(self))
+        nivel_ok = (self.niveles == blueprint.get("nivel")).astype(np.float64)
+        return 2 * tema_ok + nivel_ok
+
+
+class Plan:
+    def __init__(self, celdas: List[Tuple[np.ndarray, np.ndarray, int]], faltantes: Dict[str, int]):
+        self.celdas = celdas  # (posiciones en el pool, prioridad, cantidad)
+        self.faltantes = faltantes
+
+    @property
+    def total(self) -> int:
+        return sum(n for _, _, n in self.celdas)
+
+
+class Ensamblador:
+    def __init__(self, pool: PoolPreguntas):
+        self.pool = pool
+
+    def plan(self, blueprint: dict) -> Plan:
+        numero = int(blueprint.get("numero_preguntas", 10))
+        req_tipos = _expandir(numero, blueprint.get("distribucion_tipos"), TIPOS)
+        filas = [req_tipos.get(t, 0) for t in TIPOS]
+
+        disp = self.pool.disponibles()
+        if blueprint.get("distribucion_dificultad"):
+            req_dif = _expandir(numero, blueprint["distribucion_dificultad"], DIFICULTADES)
+            cols = [req_dif.get(d, 0) for d in DIFICULTADES]
+        else:
+            cols = [numero] * len(DIFICULTADES)  # sin restricción de dificultad
+
+        asignado = _flujo_maximo(filas, cols, disp)
+        prioridad = self.pool.prioridad(blueprint)
+
+        celdas = []
+        for i in range(len(TIPOS)):
+            for j in range(len(DIFICULTADES)):
+                n = int(asignado[i, j])
+                if n:
+                    pos = np.flatnonzero((self.pool.tipos == i) & (self.pool.difs == j))
+                    celdas.append((pos, prioridad[pos], n))
+
+        faltantes = {
+            t: filas[i] - int(asignado[i].sum())
+            for i, t in enumerate(TIPOS)
+            if filas[i] - int(asignado[i].sum()) > 0
+        }
+        return Plan(celdas, faltantes)
+
+    def muestrear(self, plan: Plan, rng: np.random.Generator) -> np.ndarray:
+        """ids de Pregunta de una variante (prioridad + desempate aleatorio)."""
+        elegidas = []
+        for pos, prioridad, n in plan.celdas:
+            clave = prioridad + rng.random(len(pos))
+            top = np.argpartition(-clave, n - 1)[:n] if n < len(pos) else np.arange(len(pos))
+            elegidas.append(pos[top])
+        if not elegidas:
+            return np.empty(0, dtype=np.int64)
+        return self.pool.ids[np.concatenate(elegidas)]
+
+    def variantes(self, blueprint: dict, k: int, semilla=None) -> Tuple[List[np.ndarray], Dict[str, int]]:
+        plan = self.plan(blueprint)
+        rng = np.random.default_rng(semilla)
+        return [self.muestrear(plan, rng) for _ in range(k)], plan.faltantes
+
+
+# Pools recientes: se reutilizan mientras el índice del banco sea el mismo
+_pools: Dict[Tuple[int, Optional[int]], PoolPreguntas] = {}
+_lock = threading.Lock()
+
+
+def obtener_pool(materia_id: int, excluir_examen: Optional[int] = None) -> PoolPreguntas:
+    clave = (materia_id, excluir_examen)
+    pool = _pools.get(clave)
+    if pool is not None and pool.indice is obtener_indice(materia_id):
+        return pool
+
+    pool = PoolPreguntas(materia_id, excluir_examen)
+    with _lock:
+        if len(_pools) > 64:
+            _pools.clear()
+        _pools[clave] = pool
+    return pool
+
+
+def ensamblar_desde_banco(materia_id: int, blueprint: dict, excluir_examen: Optional[int] = None, semilla=None):
+    """
+    (preguntas con forma de SCHEMA_JSON, faltantes {tipo: n}) para un examen
+    según el blueprint. Las ponderaciones se ajustan después con
+    _fix_ponderaciones_exactas.
+    """
+    ens = Ensamblador(obtener_pool(materia_id, excluir_examen))
+    plan = ens.plan(blueprint)
+    ids = ens.muestrear(plan, np.random.default_rng(semilla)).tolist()
+
+    preguntas = {p.id_pregunta: p for p in Pregunta.objects.filter(id_pregunta__in=ids).prefetch_related("opciones")}
+    seleccion = [_pregunta_a_payload(preguntas[i]) for i in ids if i in preguntas]
+    return seleccion, plan.faltantes
@@ -1,12 +1,26 @@
 # ============================================
 # Aplicaciones/examenes/ia_generation.py
 # ============================================
+import asyncio
 import json
+import logging
+import re
 from decimal import Decimal, ROUND_HALF_UP
+import httpx
+from django.conf import settings
+from django.db import transaction
 from rest_framework.exceptions import ValidationError
 
-from .models import Examen, Pregunta, OpcionRespuesta
-from .llm_client import LLMClient
+from .models import Examen
+from .llm_client import AsyncLLMClient, get_llm_client
+from .banco import filtro_repetidas
+from .ensamblador import ensamblar_desde_banco
+from .json_stream import PreguntasStreamParser
+from .llm_cache import cache_activo, chat_json_cacheado, clave_cache, guardar, obtener
+from .llm_metricas import medir
+from .services import crear_preguntas_bulk, _normalizar_texto
+
+logger = logging.getLogger("django")
 
 
 SCHEMA_PROMPT = """
@@ -112,29 +126,35 @@ def _normalize_payload(payload: dict) -> dict:
         return payload
 
     for p in preguntas:
-        t = p.get("tipo")
-
-        if t == "VERDADERO_FALSO":
-            p["opciones"] = [
-                {"clave": "A", "texto": "Verdadero"},
-                {"clave": "B", "texto": "Falso"},
-            ]
-            corr = p.get("correctas", [])
-            if not (isinstance(corr, list) and len(corr) == 1 and corr[0] in ("A", "B")):
-                p["correctas"] = ["A"]
-            p["respuesta_texto"] = ""
-
-        if t == "RESPUESTA_CORTA":
-            p["opciones"] = []
-            if "correctas" not in p or p["correctas"] is None:
-                p["correctas"] = []
-            if "respuesta_texto" not in p:
-                p["respuesta_texto"] = ""
+        # los elementos que no son objeto los reporta _validate_pregunta
+        if isinstance(p, dict):
+            _normalize_pregunta(p)
 
     return payload
 
 
-from rest_framework.exceptions import ValidationError
+def _normalize_pregunta(p: dict) -> dict:
+    t = p.get("tipo")
+
+    if t == "VERDADERO_FALSO":
+        p["opciones"] = [
+            {"clave": "A", "texto": "Verdadero"},
+            {"clave": "B", "texto": "Falso"},
+        ]
+        corr = p.get("correctas", [])
+        if not (isinstance(corr, list) and len(corr) == 1 and corr[0] in ("A", "B")):
+            p["correctas"] = ["A"]
+        p["respuesta_texto"] = ""
+
+    if t == "RESPUESTA_CORTA":
+        p["opciones"] = []
+        if "correctas" not in p or p["correctas"] is None:
+            p["correctas"] = []
+        if "respuesta_texto" not in p:
+            p["respuesta_texto"] = ""
+
+    return p
+
 
 def _validate_payload(payload: dict, params_full: dict):
     if "examen" not in payload or "preguntas" not in payload:
@@ -155,59 +175,81 @@ def _validate_payload(payload: dict, params_full: dict):
     if len(set(enunciados)) != len(enunciados):
         raise ValidationError("Hay preguntas repetidas (enunciado duplicado).")
 
-    allowed_keys = {"A", "B", "C", "D"}
-
     for i, p in enumerate(preguntas, start=1):
-        tipo = p.get("tipo")
-        opciones = p.get("opciones", [])
-        correctas = p.get("correctas", [])
-        respuesta_texto = p.get("respuesta_texto", "")
-
-        if tipo in ("OPCION_MULTIPLE", "SELECCION_MULTIPLE"):
-            if not isinstance(opciones, list) or len(opciones) != 4:
-                raise ValidationError(f"{tipo} requiere exactamente 4 opciones.")
-            claves = [o.get("clave") for o in opciones]
-            if claves != ["A", "B", "C", "D"]:
-                raise ValidationError(f"{tipo} requiere claves exactamente A,B,C,D en orden.")
-            if not isinstance(correctas, list):
-                raise ValidationError(f"{tipo} requiere 'correctas' como lista.")
-            if tipo == "OPCION_MULTIPLE" and len(correctas) != 1:
-                raise ValidationError("OPCION_MULTIPLE requiere exactamente 1 correcta.")
-            if tipo == "SELECCION_MULTIPLE" and len(correctas) != 2:
-                raise ValidationError("SELECCION_MULTIPLE requiere exactamente 2 correctas.")
-            if any(c not in allowed_keys for c in correctas):
-                raise ValidationError(f"{tipo} tiene claves inválidas en 'correctas'.")
-
-        elif tipo == "VERDADERO_FALSO":
-            if not isinstance(opciones, list) or len(opciones) != 2:
-                raise ValidationError("VERDADERO_FALSO requiere exactamente 2 opciones (A,B).")
-            if opciones[0].get("clave") != "A" or opciones[0].get("texto") != "Verdadero":
-                raise ValidationError('VERDADERO_FALSO requiere A="Verdadero".')
-            if opciones[1].get("clave") != "B" or opciones[1].get("texto") != "Falso":
-                raise ValidationError('VERDADERO_FALSO requiere B="Falso".')
-            if not isinstance(correctas, list) or len(correctas) != 1 or correctas[0] not in ("A", "B"):
-                raise ValidationError("VERDADERO_FALSO requiere exactamente 1 correcta (A o B).")
-
-        elif tipo == "RESPUESTA_CORTA":
-            if opciones not in ([], None):
-                raise ValidationError("RESPUESTA_CORTA requiere 'opciones' = [].")
-            if not isinstance(respuesta_texto, str) or not respuesta_texto.strip():
-                raise ValidationError("RESPUESTA_CORTA requiere 'respuesta_texto' no vacío.")
-            # correctas se ignora en este tipo (puede venir [] o no venir)
+        _validate_pregunta(p, i)
 
-        else:
-            raise ValidationError(f"Tipo de pregunta no soportado: {tipo} (pregunta #{i}).")
+
+def _validate_pregunta(p: dict, i: int = 1):
+    """
+    Reglas por pregunta (independientes del resto del payload).
+    """
+    allowed_keys = {"A", "B", "C", "D"}
+
+    if not isinstance(p, dict):
+        raise ValidationError(f"Pregunta #{i} inválida: debe ser un objeto.")
+
+    tipo = p.get("tipo")
+    opciones = p.get("opciones", [])
+    correctas = p.get("correctas", [])
+    respuesta_texto = p.get("respuesta_texto", "")
+
+    if tipo in ("OPCION_MULTIPLE", "SELECCION_MULTIPLE"):
+        if not isinstance(opciones, list) or len(opciones) != 4:
+            raise ValidationError(f"{tipo} requiere exactamente 4 opciones.")
+        claves = [o.get("clave") for o in opciones]
+        if claves != ["A", "B", "C", "D"]:
+            raise ValidationError(f"{tipo} requiere claves exactamente A,B,C,D en orden.")
+        if not isinstance(correctas, list):
+            raise ValidationError(f"{tipo} requiere 'correctas' como lista.")
+        if tipo == "OPCION_MULTIPLE" and len(correctas) != 1:
+            raise ValidationError("OPCION_MULTIPLE requiere exactamente 1 correcta.")
+        if tipo == "SELECCION_MULTIPLE" and len(correctas) != 2:
+            raise ValidationError("SELECCION_MULTIPLE requiere exactamente 2 correctas.")
+        if any(c not in allowed_keys for c in correctas):
+            raise ValidationError(f"{tipo} tiene claves inválidas en 'correctas'.")
+
+    elif tipo == "VERDADERO_FALSO":
+        if not isinstance(opciones, list) or len(opciones) != 2:
+            raise ValidationError("VERDADERO_FALSO requiere exactamente 2 opciones (A,B).")
+        if opciones[0].get("clave") != "A" or opciones[0].get("texto") != "Verdadero":
+            raise ValidationError('VERDADERO_FALSO requiere A="Verdadero".')
+        if opciones[1].get("clave") != "B" or opciones[1].get("texto") != "Falso":
+            raise ValidationError('VERDADERO_FALSO requiere B="Falso".')
+        if not isinstance(correctas, list) or len(correctas) != 1 or correctas[0] not in ("A", "B"):
+            raise ValidationError("VERDADERO_FALSO requiere exactamente 1 correcta (A o B).")
+
+    elif tipo == "RESPUESTA_CORTA":
+        if opciones not in ([], None):
+            raise ValidationError("RESPUESTA_CORTA requiere 'opciones' = [].")
+        if not isinstance(respuesta_texto, str) or not respuesta_texto.strip():
+            raise ValidationError("RESPUESTA_CORTA requiere 'respuesta_texto' no vacío.")
+        # correctas se ignora en este tipo (puede venir [] o no venir)
+
+    else:
+        raise ValidationError(f"Tipo de pregunta no soportado: {tipo} (pregunta #{i}).")
+
+
+def _ponderaciones_cuadran(preguntas: list, puntaje_total: Decimal) -> bool:
+    try:
+        valores = [Decimal(str(p.get("ponderacion"))).quantize(Decimal("0.01")) for p in preguntas]
+        return all(v > 0 for v in valores) and sum(valores) == puntaje_total
+    except (AttributeError, ArithmeticError, ValueError):
+        # pregunta que no es objeto o ponderación no numérica
+        return False
 
 
 def _fix_ponderaciones_exactas(payload: dict, puntaje_total: Decimal) -> dict:
     """
     Ajusta ponderaciones para que sumen exacto, sin cambiar cantidad de preguntas.
-    Estrategia: repartir equitativo y ajustar la última.
+    Si ya suman puntaje_total (y todas son > 0) se respetan las del LLM;
+    si no, se reparte equitativo y se ajusta la última.
     """
     preguntas = payload.get("preguntas", [])
     n = len(preguntas)
     if n == 0:
         return payload
+    if _ponderaciones_cuadran(preguntas, puntaje_total):
+        return payload
 
     base = (puntaje_total / Decimal(n)).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
     ponderaciones = [base for _ in range(n)]
@@ -222,8 +264,446 @@ def _fix_ponderaciones_exactas(payload: dict, puntaje_total: Decimal) -> dict:
     return payload
 
 
-def generate_exam_with_llm(examen: Examen, params: dict) -> dict:
-    params_full = {
+# =========================================================
+# Generación en streaming (validación temprana)
+# =========================================================
+def _detalle_error(e: Exception) -> str:
+    if isinstance(e, ValidationError) and isinstance(e.detail, list) and e.detail:
+        return str(e.detail[0])
+    return str(e)
+
+
+def _leer_stream(client, prompt: str, numero_preguntas: int, max_tokens: int, abortar: bool = True) -> dict:
+    """
+    Consume la completion en streaming validando cada pregunta en cuanto se
+    cierra su objeto. Ante la primera inválida/repetida corta el stream
+    (con abortar=False la deja pasar para que la corrija reparar_payload).
+    """
+    parser = PreguntasStreamParser()
+    vistas = set()
+    stream = client.chat_stream(prompt, temperature=0.2, max_tokens=max_tokens)
+
+    try:
+        for fragmento in stream:
+            try:
+                completas = parser.feed(fragmento)
+            except ValueError as e:
+                raise ValidationError(f"Pregunta #{parser.emitidas + 1} con JSON inválido: {e}")
+
+            if not abortar:
+                continue
+
+            for i, p in completas:
+                if i > numero_preguntas:
+                    raise ValidationError(f"Se recibieron más de {numero_preguntas} preguntas.")
+                if not isinstance(p, dict):
+                    raise ValidationError(f"Pregunta #{i} inválida: debe ser un objeto.")
+                _normalize_pregunta(p)
+                try:
+                    _validate_pregunta(p, i)
+                except ValidationError as e:
+                    raise ValidationError(f"Pregunta #{i}: {_detalle_error(e)}")
+                clave = _clave_enunciado(p.get("enunciado"))
+                if clave in vistas:
+                    raise ValidationError(f"Pregunta #{i} repetida (enunciado duplicado).")
+                vistas.add(clave)
+    finally:
+        stream.close()
+
+    try:
+        return parser.documento()
+    except ValueError as e:
+        raise ValidationError(f"JSON inválido al final del stream: {e}")
+
+
+def _generar_en_stream(client, prompt: str, numero_preguntas: int, max_tokens: int = 2500) -> dict:
+    """
+    Si el stream se sale del esquema se descarta y se vuelve a pedir
+    (hasta IA_STREAM_REINTENTOS veces) indicando el motivo al modelo.
+    El último intento se lee completo y queda para reparar_payload.
+    """
+    reintentos = int(getattr(settings, "IA_STREAM_REINTENTOS", 2))
+    motivo = None
+
+    for intento in range(reintentos + 1):
+        prompt_intento = prompt
+        if motivo:
+            prompt_intento += f"\n\nUn intento anterior se descartó por: {motivo.rstrip('.')}. No repitas ese error."
+        try:
+            return _leer_stream(client, prompt_intento, numero_preguntas, max_tokens, abortar=intento < reintentos)
+        except ValidationError as e:
+            motivo = _detalle_error(e)
+
+    raise ValidationError(f"El LLM devolvió contenido inválido tras {reintentos + 1} intentos: {motivo}")
+
+
+# =========================================================
+# Reparación dirigida (solo las preguntas que fallan)
+# =========================================================
+TIPOS_PREGUNTA = ("OPCION_MULTIPLE", "SELECCION_MULTIPLE", "VERDADERO_FALSO", "RESPUESTA_CORTA")
+
+REPARACION_PROMPT = """
+Corrige preguntas de un examen de "{materia}" (nivel {nivel}, idioma {idioma}).
+Devuelve ÚNICAMENTE un JSON: {{"preguntas": [...]}} con exactamente {n} preguntas,
+en el mismo orden en que se listan abajo, cada una con este esquema:
+{schema_pregunta}
+
+Restricciones:
+- OPCION_MULTIPLE: 4 opciones A,B,C,D y 1 correcta.
+- SELECCION_MULTIPLE: 4 opciones A,B,C,D y 2 correctas.
+- VERDADERO_FALSO: A="Verdadero", B="Falso" y 1 correcta.
+- RESPUESTA_CORTA: "opciones" = [] y la respuesta en "respuesta_texto".
+- Mantén el tipo indicado. No repitas ninguno de los enunciados ya existentes.
+
+Preguntas a corregir:
+{fallidas}
+
+Enunciados ya existentes (no repetir):
+{existentes}
+""".strip()
+
+
+def _reparar_pregunta_local(p: dict) -> dict:
+    """
+    Arreglos que no requieren al LLM: mayúsculas/espacios en claves,
+    'correctas' como string, opciones desordenadas o sin clave.
+    """
+    if not isinstance(p, dict):
+        return p
+
+    tipo = str(p.get("tipo", "")).strip().upper().replace(" ", "_")
+    if tipo in TIPOS_PREGUNTA:
+        p["tipo"] = tipo
+
+    correctas = p.get("correctas")
+    if isinstance(correctas, str):
+        correctas = [c for c in re.split(r"[\s,;]+", correctas) if c]
+    if isinstance(correctas, list):
+        vistas = []
+        for c in correctas:
+            c = str(c).strip().upper()
+            if c and c not in vistas:
+                vistas.append(c)
+        p["correctas"] = vistas
+
+    opciones = p.get("opciones")
+    if p.get("tipo") in ("OPCION_MULTIPLE", "SELECCION_MULTIPLE") and isinstance(opciones, list) and len(opciones) == 4:
+        if all(isinstance(o, dict) for o in opciones):
+            claves = [str(o.get("clave", "")).strip().upper() for o in opciones]
+            if sorted(claves) == ["A", "B", "C", "D"]:
+                for o, c in zip(opciones, claves):
+                    o["clave"] = c
+                p["opciones"] = sorted(opciones, key=lambda o: o["clave"])
+            elif not any(claves):
+                for o, c in zip(opciones, "ABCD"):
+                    o["clave"] = c
+
+    return _normalize_pregunta(p)
+
+
+def _preguntas_con_fallas(preguntas: list, es_repetida=None) -> list:
+    """
+    [(indice, motivo)] de preguntas inválidas, con enunciado repetido (se
+    conserva la primera) o casi iguales a una del banco (es_repetida).
+    """
+    fallas, vistas = [], set()
+    for idx, p in enumerate(preguntas):
+        try:
+            _validate_pregunta(p, idx + 1)
+        except ValidationError as e:
+            fallas.append((idx, _detalle_error(e)))
+            continue
+        clave = _clave_enunciado(p.get("enunciado"))
+        if not clave or clave in vistas:
+            fallas.append((idx, "enunciado vacío o repetido"))
+            continue
+        if es_repetida and es_repetida(p):
+            fallas.append((idx, "muy similar a una pregunta existente de la materia"))
+            continue
+        vistas.add(clave)
+    return fallas
+
+
+def _build_prompt_reparacion(examen: Examen, params_full: dict, preguntas: list, fallas: list) -> str:
+    items = []
+    for n, (idx, motivo) in enumerate(fallas, start=1):
+        p = preguntas[idx] if isinstance(preguntas[idx], dict) else {}
+        tipo = p.get("tipo") if p.get("tipo") in TIPOS_PREGUNTA else "OPCION_MULTIPLE"
+        original = json.dumps(p, ensure_ascii=False)[:600]
+        items.append(f"{n}. tipo={tipo}; motivo: {motivo}\n   original: {original}")
+
+    fallidos = {idx for idx, _ in fallas}
+    existentes = [
+        f"- {p.get('enunciado', '')}"[:200]
+        for i, p in enumerate(preguntas)
+        if i not in fallidos and isinstance(p, dict)
+    ]
+    return REPARACION_PROMPT.format(
+        materia=examen.materia.nombre if examen.materia_id else "",
+        nivel=params_full.get("nivel"),
+        idioma=params_full.get("idioma"),
+        n=len(fallas),
+        schema_pregunta=json.dumps(SCHEMA_JSON["preguntas"][0], ensure_ascii=False),
+        fallidas="\n".join(items),
+        existentes="\n".join(existentes) or "- (ninguno)",
+    )
+
+
+def reparar_payload(examen: Examen, params_full: dict, payload: dict, client=None, es_repetida=None) -> dict:
+    """
+    Repara el payload en lugar de descartarlo:
+    1) arreglos locales por pregunta;
+    2) hasta IA_RONDAS_REPARACION llamadas cortas al LLM que regeneran solo
+       las preguntas que siguen fallando (con el motivo);
+    3) ponderaciones exactas y validación final.
+    """
+    if not isinstance(payload, dict) or "examen" not in payload or not isinstance(payload.get("preguntas"), list):
+        raise ValidationError("Payload inválido: falta 'examen' o 'preguntas'.")
+
+    preguntas = [_reparar_pregunta_local(p) for p in payload["preguntas"]]
+    payload["preguntas"] = preguntas
+    rondas = int(getattr(settings, "IA_RONDAS_REPARACION", 2))
+
+    for _ in range(rondas):
+        fallas = _preguntas_con_fallas(preguntas, es_repetida)
+        if not fallas:
+            break
+
+        client = client or get_llm_client()
+        prompt = _build_prompt_reparacion(examen, params_full, preguntas, fallas)
+        try:
+            resp = client.chat_json(prompt, temperature=0.2, max_tokens=max(800, 300 * len(fallas)))
+        except (RuntimeError, httpx.HTTPError, ValueError) as e:
+            # error del LLM (tras reintentos/fallbacks) o JSON inválido: otra ronda
+            logger.warning("[ia-reparacion] examen=%s ronda fallida (%s preguntas): %s",
+                           examen.id_examen, len(fallas), e)
+            continue
+
+        nuevas = resp.get("preguntas") if isinstance(resp, dict) else None
+        if not isinstance(nuevas, list):
+            continue
+
+        for (idx, _), nueva in zip(fallas, nuevas):
+            if isinstance(nueva, dict):
+                nueva["orden"] = preguntas[idx].get("orden", idx + 1) if isinstance(preguntas[idx], dict) else idx + 1
+                preguntas[idx] = _reparar_pregunta_local(nueva)
+
+    payload = _fix_ponderaciones_exactas(payload, Decimal(str(params_full["puntaje_total"])).quantize(Decimal("0.01")))
+    _validate_payload(payload, params_full)
+    return payload
+
+
+# =========================================================
+# Generación por lotes (exámenes grandes)
+# =========================================================
+LOTE_PROMPT = """
+
+Este es el bloque {bloque} de {total_bloques} de un examen más grande que se genera en paralelo.
+- Genera SOLO las {numero_preguntas} preguntas de este bloque.
+- Cubre subtemas distintos a los de los otros bloques; no repitas enunciados.
+{evitar}""".rstrip()
+
+
+def _clave_enunciado(texto) -> str:
+    """Enunciado normalizado para detectar duplicados entre lotes."""
+    return re.sub(r"[^\w\s]", "", _normalizar_texto(texto)).strip()
+
+
+def _tipos_solicitados(numero_preguntas: int, distribucion_tipos: dict) -> list:
+    """
+    Expande distribucion_tipos a una lista de tipos de largo numero_preguntas
+    (si la distribución no cuadra, se recorta o se completa con el tipo mayoritario).
+    """
+    tipos = []
+    for tipo, cant in (distribucion_tipos or {}).items():
+        tipos.extend([tipo] * max(0, int(cant or 0)))
+
+    if not tipos:
+        tipos = ["OPCION_MULTIPLE"]
+    mayoritario = max(set(tipos), key=tipos.count)
+    tipos = tipos[:numero_preguntas]
+    tipos.extend([mayoritario] * (numero_preguntas - len(tipos)))
+    return tipos
+
+
+def _conteo_tipos(params_full: dict) -> dict:
+    conteo = {}
+    for t in _tipos_solicitados(int(params_full["numero_preguntas"]), params_full.get("distribucion_tipos")):
+        conteo[t] = conteo.get(t, 0) + 1
+    return conteo
+
+
+def _dividir_en_lotes(tipos: list, tam_lote: int) -> list:
+    """Parte la lista de tipos en distribuciones {tipo: cantidad} de a lo sumo tam_lote."""
+    lotes = []
+    for i in range(0, len(tipos), tam_lote):
+        dist = {}
+        for t in tipos[i:i + tam_lote]:
+            dist[t] = dist.get(t, 0) + 1
+        lotes.append(dist)
+    return lotes
+
+
+def _build_prompt_lote(examen: Examen, params_full: dict, dist: dict, bloque: int, total_bloques: int, evitar=None) -> str:
+    n = sum(dist.values())
+    puntaje = round(float(params_full["puntaje_total"]) * n / max(1, int(params_full["numero_preguntas"])), 2)
+    prompt = build_prompt(examen, {
+        **params_full,
+        "numero_preguntas": n,
+        "distribucion_tipos": dist,
+        "puntaje_total": puntaje,
+    })
+    evitar_txt = ""
+    if evitar:
+        evitar_txt = "- Ya existen estas preguntas, NO las repitas:\n" + "\n".join(f"  * {e}" for e in evitar)
+    return prompt + LOTE_PROMPT.format(
+        bloque=bloque,
+        total_bloques=total_bloques,
+        numero_preguntas=n,
+        evitar=evitar_txt,
+    )
+
+
+def _max_tokens_lote(n: int) -> int:
+    # ~250 tokens por pregunta + cabecera del examen
+    return max(1500, 600 + 250 * n)
+
+
+async def _generar_lotes_async(prompts: list, concurrencia: int) -> list:
+    """
+    Lanza todos los prompts en paralelo (acotado por `concurrencia`).
+    Devuelve por lote el payload o la excepción (un lote caído no tumba al resto).
+    """
+    semaforo = asyncio.Semaphore(max(1, concurrencia))
+
+    async with AsyncLLMClient() as client:
+        async def uno(prompt, n):
+            async with semaforo:
+                return await client.chat_json(prompt, temperature=0.2, max_tokens=_max_tokens_lote(n))
+
+        return await asyncio.gather(*(uno(p, n) for p, n in prompts), return_exceptions=True)
+
+
+def _aceptar_preguntas(payload, pendientes: dict, vistas: set, acumuladas: list, es_repetida=None) -> None:
+    """
+    Agrega las preguntas válidas y no repetidas del lote (ni entre lotes ni
+    respecto al banco), respetando el cupo pendiente por tipo
+    (pendientes se descuenta en el lugar).
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("preguntas"), list):
+        return
+
+    for p in payload["preguntas"]:
+        if not isinstance(p, dict):
+            continue
+        _reparar_pregunta_local(p)
+        try:
+            _validate_pregunta(p)
+        except ValidationError:
+            continue
+
+        clave = _clave_enunciado(p.get("enunciado"))
+        tipo = p.get("tipo")
+        if not clave or clave in vistas or pendientes.get(tipo, 0) <= 0:
+            continue
+        if es_repetida and es_repetida(p):
+            continue
+
+        vistas.add(clave)
+        pendientes[tipo] -= 1
+        acumuladas.append(p)
+
+
+def _resolver_lotes(prompts: list, modelo: str, concurrencia: int, usar_cache: bool) -> list:
+    """
+    Resultado por lote: primero desde el cache (sync, fuera del event loop)
+    y solo los que faltan van al LLM en paralelo.
+    """
+    claves = [clave_cache(prompt, modelo, 0.2) for prompt, _ in prompts]
+    resultados = [obtener(c) if usar_cache else None for c in claves]
+
+    faltan = [i for i, r in enumerate(resultados) if r is None]
+    if faltan:
+        nuevos = asyncio.run(_generar_lotes_async([prompts[i] for i in faltan], concurrencia))
+        for i, res in zip(faltan, nuevos):
+            resultados[i] = res
+            if not isinstance(res, Exception) and cache_activo():
+                guardar(claves[i], modelo, 0.2, res)
+
+    return resultados
+
+
+def generate_exam_chunked(
+    examen: Examen, params_full: dict, tam_lote: int = 10, usar_cache: bool = True, es_repetida=None
+) -> dict:
+    """
+    Genera el examen en lotes de a lo sumo `tam_lote` preguntas, en paralelo.
+    Las preguntas inválidas o repetidas entre lotes se descartan y se piden
+    de nuevo (hasta IA_RONDAS_COMPLEMENTO rondas); al final se renumera y se
+    reparten las ponderaciones para que sumen puntaje_total.
+    """
+    numero = int(params_full["numero_preguntas"])
+    modelo = get_llm_client().model
+    usar_cache = usar_cache and cache_activo()
+    concurrencia = int(getattr(settings, "IA_LOTES_CONCURRENCIA", 4))
+    rondas = int(getattr(settings, "IA_RONDAS_COMPLEMENTO", 2))
+
+    pendientes = _conteo_tipos(params_full)
+
+    vistas, preguntas, cabecera, errores = set(), [], None, []
+
+    for ronda in range(rondas + 1):
+        faltantes = [t for t, c in pendientes.items() for _ in range(c)]
+        if not faltantes:
+            break
+
+        lotes = _dividir_en_lotes(faltantes, tam_lote)
+        evitar = [p.get("enunciado", "") for p in preguntas][-40:] if ronda else None
+        prompts = [
+            (_build_prompt_lote(examen, params_full, dist, i, len(lotes), evitar), sum(dist.values()))
+            for i, dist in enumerate(lotes, start=1)
+        ]
+
+        for res in _resolver_lotes(prompts, modelo, concurrencia, usar_cache):
+            if isinstance(res, Exception):
+                errores.append(str(res)[:300])
+                continue
+            if cabecera is None and isinstance(res, dict) and isinstance(res.get("examen"), dict):
+                cabecera = res
+            _aceptar_preguntas(res, pendientes, vistas, preguntas, es_repetida)
+
+    if len(preguntas) < numero:
+        detalle = f" Errores: {errores[:3]}" if errores else ""
+        raise ValidationError(
+            f"Generación por lotes incompleta: {len(preguntas)} de {numero} preguntas válidas.{detalle}"
+        )
+
+    for i, p in enumerate(preguntas, start=1):
+        p["orden"] = i
+
+    examen_meta = dict((cabecera or {}).get("examen") or {})
+    examen_meta["puntaje_total"] = params_full["puntaje_total"]
+    payload = {
+        "examen": examen_meta,
+        "preguntas": preguntas,
+        "control_calidad": {
+            "verificaciones": {
+                "sin_preguntas_repetidas": True,
+                "ponderaciones_suman_puntaje_total": True,
+                "todas_las_preguntas_tienen_respuesta": True,
+            },
+            "observaciones": f"Generado en lotes de {tam_lote} preguntas.",
+        },
+    }
+
+    payload = _fix_ponderaciones_exactas(payload, Decimal(str(params_full["puntaje_total"])).quantize(Decimal("0.01")))
+    _validate_payload(payload, params_full)
+    return payload
+
+
+def construir_parametros(examen: Examen, params: dict) -> dict:
+    """Blueprint completo (parametros_generacion) con los defaults del examen."""
+    return {
         "materia_id": examen.materia_id,
         "nivel": params.get("nivel", examen.nivel),
         "idioma": params.get("idioma", examen.idioma),
@@ -234,39 +714,128 @@ def generate_exam_with_llm(examen: Examen, params: dict) -> dict:
         "enfoque_tematico": params.get("enfoque_tematico", []),
         "estilo": params.get("estilo", "tipo parcial universitario"),
         "tags": params.get("tags", []),
+        "distribucion_dificultad": params.get("distribucion_dificultad", {}),
     }
 
-    prompt = build_prompt(examen, params_full)
+
+def generate_exam_with_llm(examen: Examen, params: dict) -> dict:
+    params_full = construir_parametros(examen, params)
+    # sin_cache=true fuerza una llamada nueva al LLM
+    usar_cache = str(params.get("sin_cache", "")).lower() not in ("1", "true")
+    # usar_banco=true arma primero con preguntas existentes de la materia
+    # (ensamblador por blueprint) y el LLM solo completa lo que falta
+    usar_banco = str(params.get("usar_banco", "")).lower() in ("1", "true")
 
     examen.estado = "GENERANDO"
     examen.parametros_generacion = params_full
     examen.origen = "IA"
     examen.save(update_fields=["estado", "parametros_generacion", "origen"])
 
-    client = LLMClient()
+    es_repetida = filtro_repetidas(examen.materia_id, excluir_examen=examen.id_examen)
+
+    with medir(examen.id_examen) as medicion:
+        del_banco = []
+        if usar_banco and examen.materia_id:
+            del_banco, _ = ensamblar_desde_banco(examen.materia_id, params_full, excluir_examen=examen.id_examen)
+        if del_banco:
+            payload = armar_con_banco(examen, params_full, del_banco, usar_cache, es_repetida)
+        else:
+            payload = _generar_con_llm(examen, params_full, usar_cache, es_repetida)
+
+    return _con_metricas(payload, medicion)
+
+
+def _con_metricas(payload: dict, medicion) -> dict:
+    # termina en Examen.ia_metadata["llm"] (persist_exam_from_payload)
+    payload.setdefault("control_calidad", {})["llm"] = medicion.resumen()
+    return payload
+
+
+def _generar_con_llm(examen: Examen, params_full: dict, usar_cache: bool = True, es_repetida=None) -> dict:
+    tam_lote = int(getattr(settings, "IA_PREGUNTAS_POR_LOTE", 10))
+    if params_full["numero_preguntas"] > tam_lote:
+        return generate_exam_chunked(examen, params_full, tam_lote, usar_cache=usar_cache, es_repetida=es_repetida)
+
+    prompt = build_prompt(examen, params_full)
+    client = get_llm_client()
+
+    generar = None
+    if getattr(settings, "IA_STREAMING", True):
+        def generar(pr):
+            return _generar_en_stream(client, pr, params_full["numero_preguntas"], max_tokens=2500)
 
     try:
-        payload = client.chat_json(prompt, temperature=0.2, max_tokens=2500)
+        payload = chat_json_cacheado(
+            client, prompt, temperature=0.2, max_tokens=2500, usar_cache=usar_cache, generar=generar
+        )
+    except ValidationError:
+        raise
     except Exception as e:
         raise ValidationError(f"Fallo al llamar al LLM o parsear JSON: {e}")
 
     payload = _normalize_payload(payload)
 
-    # si falla solo por ponderaciones, intentamos ajustar automáticamente
     try:
         _validate_payload(payload, params_full)
-    except ValidationError as e:
-        msg = str(e.detail[0]) if hasattr(e, "detail") else str(e)
-        if "suma de ponderaciones" in msg.lower():
-            payload = _fix_ponderaciones_exactas(payload, Decimal(str(params_full["puntaje_total"])).quantize(Decimal("0.01")))
-            _validate_payload(payload, params_full)
-        else:
-            raise
+        if es_repetida and any(es_repetida(p) for p in payload["preguntas"]):
+            raise ValidationError("Hay preguntas repetidas respecto al banco de la materia.")
+    except ValidationError:
+        # ponderaciones, claves desordenadas, preguntas inválidas o repetidas:
+        # se corrige localmente o se regeneran solo las preguntas afectadas
+        payload = reparar_payload(examen, params_full, payload, client, es_repetida)
 
     return payload
 
 
-def persist_exam_from_payload(examen: Examen, payload: dict, params: dict) -> Examen:
+def armar_con_banco(examen: Examen, params_full: dict, del_banco: list, usar_cache: bool, es_repetida=None) -> dict:
+    """
+    Arma el examen con las preguntas tomadas del banco y pide al LLM solo
+    las que faltan (por tipo). Si el banco alcanza, no hay llamada al LLM.
+    """
+    faltan = _conteo_tipos(params_full)
+    for p in del_banco:
+        faltan[p["tipo"]] = faltan.get(p["tipo"], 0) - 1
+    faltan = {t: c for t, c in faltan.items() if c > 0}
+    n_faltan = sum(faltan.values())
+
+    examen_meta, generadas = {}, []
+    if n_faltan:
+        numero = int(params_full["numero_preguntas"])
+        sub = {
+            **params_full,
+            "numero_preguntas": n_faltan,
+            "distribucion_tipos": faltan,
+            "puntaje_total": round(float(params_full["puntaje_total"]) * n_faltan / numero, 2),
+        }
+        with medir(examen.id_examen) as medicion:
+            generado = _generar_con_llm(examen, sub, usar_cache, es_repetida)
+        examen_meta, generadas = generado.get("examen") or {}, generado["preguntas"]
+
+    preguntas = del_banco + generadas
+    for i, p in enumerate(preguntas, start=1):
+        p["orden"] = i
+
+    payload = {
+        "examen": {**examen_meta, "puntaje_total": params_full["puntaje_total"]},
+        "preguntas": preguntas,
+        "control_calidad": {
+            "verificaciones": {
+                "sin_preguntas_repetidas": True,
+                "ponderaciones_suman_puntaje_total": True,
+                "todas_las_preguntas_tienen_respuesta": True,
+            },
+            "observaciones": f"{len(del_banco)} preguntas tomadas del banco de la materia, {len(generadas)} generadas.",
+        },
+    }
+    if n_faltan:
+        payload["control_calidad"]["llm"] = medicion.resumen()
+    payload = _fix_ponderaciones_exactas(payload, Decimal(str(params_full["puntaje_total"])).quantize(Decimal("0.01")))
+    _validate_payload(payload, params_full)
+    return payload
+
+
+@transaction.atomic
+def persist_exam_from_payload(examen: Examen, payload: dict, params: dict, origen: str = "IA") -> Examen:
     if not isinstance(payload, dict) or "examen" not in payload or "preguntas" not in payload:
         raise ValidationError("Payload inválido para persistir.")
 
@@ -283,49 +852,54 @@ def persist_exam_from_payload(examen: Examen, payload: dict, params: dict) -> Ex
     examen.aleatorizar_opciones = bool(ex.get("aleatorizar_opciones", examen.aleatorizar_opciones))
     examen.requiere_camara = bool(ex.get("requiere_camara", examen.requiere_camara))
     examen.tags = ex.get("tags", examen.tags) or []
-    examen.origen = "IA"
+    examen.origen = origen
     examen.estado = "PUBLICADO"
     examen.ia_metadata = payload.get("control_calidad", {}) or {}
     examen.parametros_generacion = params or {}
     examen.save()
 
-    # borrar preguntas anteriores si existían
-    examen.preguntas.all().delete()
-
-    for p in payload.get("preguntas", []):
-        pregunta = Pregunta.objects.create(
-            examen=examen,
-            orden=int(p.get("orden", 0)),
-            tipo=p.get("tipo", "OPCION_MULTIPLE"),
-            dificultad=p.get("dificultad", "MEDIA"),
-            tema=p.get("tema", "") or "",
-            resultado_aprendizaje=p.get("resultado_aprendizaje", "") or "",
-            enunciado=p.get("enunciado", ""),
-            ponderacion=Decimal(str(p.get("ponderacion", 1.0))).quantize(Decimal("0.01")),
-            respuesta_texto=p.get("respuesta_texto", "") or "",
-            explicacion=p.get("explicacion", "") or "",
-            ia_metadata={},
-        )
-
-        t = pregunta.tipo
-        opciones = p.get("opciones", []) or []
-        correctas = set(p.get("correctas", []) or [])
-
-        if t in ("OPCION_MULTIPLE", "SELECCION_MULTIPLE", "VERDADERO_FALSO"):
-            for idx, o in enumerate(opciones):
-                clave = o.get("clave", "")
-                OpcionRespuesta.objects.create(
-                    pregunta=pregunta,
-                    clave=clave,
-                    texto=o.get("texto", ""),
-                    es_correcta=(clave in correctas),
-                    orden=idx,
-                )
-
-    examen.calcular_puntaje_total(save=True)
+    # borrar preguntas anteriores si existían y crear todo en bloque
+    crear_preguntas_bulk(
+        examen,
+        [_pregunta_desde_payload(p) for p in payload.get("preguntas", [])],
+        reemplazar=True,
+    )
     return examen
 
 
+def _pregunta_desde_payload(p: dict) -> dict:
+    """
+    Convierte una pregunta con la forma de SCHEMA_JSON (opciones + correctas)
+    al formato de crear_preguntas_bulk (opciones con es_correcta).
+    """
+    tipo = p.get("tipo", "OPCION_MULTIPLE")
+    correctas = set(p.get("correctas", []) or [])
+    opciones = []
+    if tipo in ("OPCION_MULTIPLE", "SELECCION_MULTIPLE", "VERDADERO_FALSO"):
+        for idx, o in enumerate(p.get("opciones", []) or []):
+            clave = o.get("clave", "")
+            opciones.append({
+                "clave": clave,
+                "texto": o.get("texto", ""),
+                "es_correcta": clave in correctas,
+                "orden": idx,
+            })
+
+    return {
+        "orden": int(p.get("orden", 0)),
+        "tipo": tipo,
+        "dificultad": p.get("dificultad", "MEDIA"),
+        "tema": p.get("tema", "") or "",
+        "resultado_aprendizaje": p.get("resultado_aprendizaje", "") or "",
+        "enunciado": p.get("enunciado", ""),
+        "ponderacion": Decimal(str(p.get("ponderacion", 1.0))).quantize(Decimal("0.01")),
+        "respuesta_texto": p.get("respuesta_texto", "") or "",
+        "explicacion": p.get("explicacion", "") or "",
+        "ia_metadata": {"origen_banco": p["origen_banco"]} if p.get("origen_banco") else {},
+        "opciones": opciones,
+    }
+
+
 def generate_and_persist_exam(examen: Examen, params: dict) -> Examen:
     """
     Genera un examen con IA y lo persiste en la base de datos
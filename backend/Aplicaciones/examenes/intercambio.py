@@ -0,0 +1,273 @@
+# ============================================
+# Aplicaciones/examenes/intercambio.py
+# ============================================
+# Importación / exportación de exámenes completos.
+#
+# Formato JSON Lines (una línea = un objeto JSON):
+#   1ª línea : {"formato": "examen-jsonl", "version": 1, "examen": {...}}
+#   resto    : una pregunta por línea, con la forma de SCHEMA_JSON["preguntas"][i]
+#              (opciones [{clave, texto}] + correctas ["A", ...])
+#
+# Bundle ZIP: contiene "examen.jsonl" (mismo contenido) y "manifest.json".
+# ============================================
+import io
+import json
+import tempfile
+import zipfile
+
+from django.db import transaction
+from django.db.models import Max, Prefetch
+from rest_framework.exceptions import ValidationError
+
+from .models import Examen, Materia, Pregunta, OpcionRespuesta
+from .ia_generation import SCHEMA_JSON, _normalize_pregunta, _validate_pregunta, _pregunta_desde_payload
+from .services import crear_preguntas_bulk, hash_contenido_pregunta
+
+FORMATO = "examen-jsonl"
+VERSION = 1
+ARCHIVO_JSONL = "examen.jsonl"
+ARCHIVO_MANIFEST = "manifest.json"
+
+CAMPOS_EXAMEN = [k for k in SCHEMA_JSON["examen"] if k not in ("materia", "duracion_minutos")]
+
+
+# =========================================================
+# EXPORTAR
+# =========================================================
+def _examen_a_dict(examen: Examen) -> dict:
+    ex = {k: getattr(examen, k) for k in CAMPOS_EXAMEN}
+    ex["materia"] = examen.materia.nombre if examen.materia_id else ""
+    ex["duracion_minutos"] = examen.duracion
+    ex["puntaje_total"] = float(examen.puntaje_total or 0)
+    return ex
+
+
+def _pregunta_a_dict(p: Pregunta) -> dict:
+    opciones = list(p.opciones.all())
+    return {
+        "orden": p.orden,
+        "tipo": p.tipo,
+        "dificultad": p.dificultad,
+        "tema": p.tema,
+        "resultado_aprendizaje": p.resultado_aprendizaje,
+        "enunciado": p.enunciado,
+        "ponderacion": float(p.ponderacion),
+        "opciones": [{"clave": o.clave, "texto": o.texto} for o in opciones],
+        "correctas": [o.clave for o in opciones if o.es_correcta],
+        "respuesta_texto": p.respuesta_texto,
+        "explicacion": p.explicacion,
+    }
+
+
+def iter_jsonl(examen: Examen, chunk_size: int = 500):
+    """
+    Genera el examen línea por línea (bytes) sin cargar todas las preguntas:
+    se recorren en bloques de chunk_size con sus opciones precargadas.
+    """
+    encabezado = {"formato": FORMATO, "version": VERSION, "examen": _examen_a_dict(examen)}
+    yield (json.dumps(encabezado, ensure_ascii=False) + "\n").encode("utf-8")
+
+    preguntas = (
+        Pregunta.objects.filter(examen=examen)
+        .order_by("orden", "id_pregunta")
+        .prefetch_related(Prefetch("opciones", queryset=OpcionRespuesta.objects.order_by("orden")))
+    )
+    for p in preguntas.iterator(chunk_size=chunk_size):
+        yield (json.dumps(_pregunta_a_dict(p), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def exportar_zip(examen: Examen):
+    """
+    Escribe el bundle en un archivo temporal (en memoria si es pequeño)
+    y lo devuelve posicionado al inicio.
+    """
+    tmp = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024)
+    total = 0
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        with zf.open(ARCHIVO_JSONL, "w") as dst:
+            for i, linea in enumerate(iter_jsonl(examen)):
+                dst.write(linea)
+                total = i
+        zf.writestr(
+            ARCHIVO_MANIFEST,
+            json.dumps({"formato": FORMATO, "version": VERSION, "preguntas": total}, ensure_ascii=False),
+        )
+    tmp.seek(0)
+    return tmp
+
+
+# =========================================================
+# IMPORTAR
+# =========================================================
+def _lineas_desde_archivo(archivo, nombre: str = ""):
+    """
+    Devuelve un iterador de líneas de texto, leyendo en streaming
+    tanto .jsonl como el bundle .zip.
+    """
+    archivo = getattr(archivo, "file", archivo)
+    if nombre.lower().endswith(".zip") or zipfile.is_zipfile(archivo):
+        archivo.seek(0)
+        try:
+            zf = zipfile.ZipFile(archivo)
+        except zipfile.BadZipFile:
+            raise ValidationError({"archivo": "El ZIP está dañado o no es un ZIP."})
+        miembro = next((n for n in zf.namelist() if n.endswith(".jsonl")), None)
+        if not miembro:
+            raise ValidationError(f"El ZIP no contiene {ARCHIVO_JSONL}.")
+        return io.TextIOWrapper(zf.open(miembro), encoding="utf-8-sig")
+
+    archivo.seek(0)
+    return io.TextIOWrapper(archivo, encoding="utf-8-sig")
+
+
+def _aplicar_encabezado(examen: Examen, ex: dict) -> list:
+    """
+    Restaura en el examen los campos del encabezado de una exportación
+    (los valores inválidos se omiten). Devuelve los errores encontrados.
+    """
+    errores, campos = [], []
+
+    def _set(campo, valor):
+        setattr(examen, campo, valor)
+        campos.append(campo)
+
+    for campo, maximo in (("titulo", 200), ("descripcion", None), ("instrucciones", None)):
+        if campo in ex:
+            valor = ex[campo]
+            if not isinstance(valor, str) or (campo == "titulo" and not valor.strip()):
+                errores.append(f"{campo}: debe ser texto.")
+            else:
+                _set(campo, valor[:maximo] if maximo else valor)
+
+    for campo, opciones in (("nivel", Examen.NIVEL), ("idioma", Examen.IDIOMA)):
+        if campo in ex:
+            if ex[campo] in {c for c, _ in opciones}:
+                _set(campo, ex[campo])
+            else:
+                errores.append(f"{campo}: valor inválido {ex[campo]!r}.")
+
+    if "duracion_minutos" in ex:
+        try:
+            duracion = int(ex["duracion_minutos"])
+            if duracion < 1:
+                raise ValueError
+            _set("duracion", duracion)
+        except (TypeError, ValueError):
+            errores.append("duracion_minutos: debe ser un entero positivo.")
+
+    for campo in ("mostrar_respuestas", "aleatorizar_preguntas", "aleatorizar_opciones", "requiere_camara"):
+        if campo in ex:
+            if isinstance(ex[campo], bool):
+                _set(campo, ex[campo])
+            else:
+                errores.append(f"{campo}: debe ser booleano.")
+
+    if "tags" in ex:
+        if isinstance(ex["tags"], list):
+            _set("tags", [str(t) for t in ex["tags"]])
+        else:
+            errores.append("tags: debe ser una lista.")
+
+    if ex.get("materia"):
+        materia = Materia.objects.filter(nombre=ex["materia"]).first()
+        if materia:
+            _set("materia", materia)
+        else:
+            errores.append(f"materia: no existe {ex['materia']!r}; se conserva la del examen.")
+
+    if campos:
+        examen.save(update_fields=campos + ["fecha_actualizacion"])
+    return errores
+
+
+@transaction.atomic
+def importar_examen(
+    examen: Examen, archivo, nombre: str = "", batch_size: int = 500, restaurar_examen: bool = True
+) -> dict:
+    """
+    Importa un examen (JSONL o ZIP) en streaming y en bloques.
+    - Encabezado: con restaurar_examen=True sus campos (título, nivel,
+      duración, flags, materia...) se aplican al examen; así exportar e
+      importar en un examen vacío lo reconstruye completo.
+    - Preguntas: idempotente, cada una se identifica por su hash de
+      contenido; las que ya existen en el examen (o se repiten en el
+      archivo) se omiten. Las líneas inválidas se reportan y se saltan.
+    """
+    existentes = set(
+        Pregunta.objects.filter(examen=examen).exclude(hash_contenido="")
+        .values_list("hash_contenido", flat=True)
+    )
+    siguiente_orden = (Pregunta.objects.filter(examen=examen).aggregate(m=Max("orden"))["m"] or 0) + 1
+
+    resumen = {"creadas": 0, "omitidas": 0, "examen_restaurado": False, "errores": []}
+    lote = []
+
+    def _flush():
+        if lote:
+            crear_preguntas_bulk(examen, lote, batch_size=batch_size)
+            resumen["creadas"] += len(lote)
+            lote.clear()
+
+    try:
+        for n_linea, linea in enumerate(_lineas_desde_archivo(archivo, nombre), start=1):
+            linea = linea.strip()
+            if not linea:
+                continue
+
+            try:
+                obj = json.loads(linea)
+            except ValueError as e:
+                resumen["errores"].append({"linea": n_linea, "error": f"JSON inválido: {e}"})
+                continue
+
+            if not isinstance(obj, dict):
+                resumen["errores"].append({"linea": n_linea, "error": "Cada línea debe ser un objeto JSON."})
+                continue
+
+            if "examen" in obj and "enunciado" not in obj:
+                # encabezado
+                if restaurar_examen and isinstance(obj["examen"], dict):
+                    for err in _aplicar_encabezado(examen, obj["examen"]):
+                        resumen["errores"].append({"linea": n_linea, "error": err})
+                    resumen["examen_restaurado"] = True
+                continue
+
+            try:
+                _normalize_pregunta(obj)
+                _validate_pregunta(obj, n_linea)
+                data = _pregunta_desde_payload(obj)
+            except ValidationError as e:
+                detalle = e.detail[0] if isinstance(e.detail, list) else e.detail
+                resumen["errores"].append({"linea": n_linea, "error": str(detalle)})
+                continue
+            except (TypeError, ValueError, AttributeError, ArithmeticError) as e:
+                # orden/ponderación no numéricos, opciones que no son objetos...
+                resumen["errores"].append({"linea": n_linea, "error": f"Valor inválido: {e}"})
+                continue
+
+            data["hash_contenido"] = hash_contenido_pregunta(data)
+            if data["hash_contenido"] in existentes:
+                resumen["omitidas"] += 1
+                continue
+            existentes.add(data["hash_contenido"])
+
+            if "orden" not in obj:
+                data["orden"] = siguiente_orden
+            siguiente_orden = max(siguiente_orden, data["orden"]) + 1
+
+            lote.append(data)
+            if len(lote) >= batch_size:
+                _flush()
+    except UnicodeDecodeError:
+        # se decodifica por bloques: el número de línea no es confiable
+        raise ValidationError({"archivo": "El archivo debe estar codificado en UTF-8."})
+
+    _flush()
+
+    if resumen["creadas"] == 0 and resumen["omitidas"] == 0 and resumen["errores"]:
+        raise ValidationError({"errores": resumen["errores"][:50]})
+
+    resumen["errores"] = resumen["errores"][:200]
+    examen.refresh_from_db(fields=["puntaje_total"])
+    resumen["puntaje_total"] = examen.puntaje_total
+    return resumen
@@ -0,0 +1,157 @@
+# ============================================
+# Aplicaciones/examenes/jobs.py
+# ============================================
+# Worker en proceso para la generación IA.
+# La vista marca el examen como GENERANDO, encola el trabajo y responde 202;
+# el hilo del pool llama al LLM, persiste el resultado (PUBLICADO) o deja
+# el examen en ERROR_GENERACION con el motivo en ia_metadata.
+#
+# generando_desde identifica la generación en curso: si el proceso muere
+# (deploy, reinicio) el examen quedaría en GENERANDO para siempre, así que
+# pasado IA_GENERACION_TIMEOUT se puede reclamar (marcar_generando) y la
+# consulta de estado lo libera (liberar_generaciones_atascadas). Un worker
+# que termina después de perder su turno descarta el resultado.
+#
+# Los .update() no emiten post_save: se invalida el cache del examen a mano.
+# ============================================
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from backend.cache import invalidar
+
+from .models import Examen
+
+logger = logging.getLogger("django")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=int(getattr(settings, "IA_GENERACION_WORKERS", 2)),
+                thread_name_prefix="ia-generacion",
+            )
+    return _executor
+
+
+def mensaje_error(e: Exception) -> str:
+    detail = getattr(e, "detail", None)
+    if isinstance(detail, list) and detail:
+        return str(detail[0])
+    if isinstance(detail, dict) and detail:
+        v = next(iter(detail.values()))
+        return str(v[0] if isinstance(v, list) and v else v)
+    return str(detail or e)
+
+
+def _timeout() -> timedelta:
+    return timedelta(seconds=int(getattr(settings, "IA_GENERACION_TIMEOUT", 900)))
+
+
+def _vencidas(ahora):
+    return Q(generando_desde__isnull=True) | Q(generando_desde__lt=ahora - _timeout())
+
+
+def marcar_generando(examen_id: int):
+    """
+    Marca GENERANDO de forma atómica (evita dos generaciones simultáneas).
+    Devuelve el token de la generación (generando_desde) o None si ya hay
+    una en curso que no ha vencido.
+    """
+    ahora = timezone.now()
+    marcado = (
+        Examen.objects.filter(id_examen=examen_id)
+        .filter(~Q(estado="GENERANDO") | _vencidas(ahora))
+        .update(estado="GENERANDO", origen="IA", generando_desde=ahora)
+    )
+    if not marcado:
+        return None
+    invalidar("examenes.Examen", examen_id)
+    return ahora
+
+
+def _marcar_error(examen_id: int, mensaje: str, token=None, **extra) -> bool:
+    """
+    ERROR_GENERACION conservando ia_metadata (el error se agrega, no la
+    reemplaza). Con token solo aplica si la generación sigue siendo esa.
+    """
+    with transaction.atomic():
+        examen = Examen.objects.select_for_update().filter(id_examen=examen_id).first()
+        if examen is None:
+            return False
+        if token is not None and (examen.estado != "GENERANDO" or examen.generando_desde != token):
+            return False
+        metadata = examen.ia_metadata if isinstance(examen.ia_metadata, dict) else {}
+        metadata = {**metadata, "error_generacion": mensaje[:2000], **extra}
+        Examen.objects.filter(id_examen=examen_id).update(
+            estado="ERROR_GENERACION", generando_desde=None, ia_metadata=metadata
+        )
+    invalidar("examenes.Examen", examen_id)
+    return True
+
+
+def liberar_generaciones_atascadas(examen_id: Optional[int] = None) -> int:
+    """Pasa a ERROR_GENERACION los exámenes en GENERANDO más allá del timeout."""
+    qs = Examen.objects.filter(estado="GENERANDO").filter(_vencidas(timezone.now()))
+    if examen_id is not None:
+        qs = qs.filter(id_examen=examen_id)
+    liberados = 0
+    for eid, token in qs.values_list("id_examen", "generando_desde"):
+        if _marcar_error(eid, "La generación no terminó a tiempo (worker reiniciado o caído). Vuelve a intentarlo.",
+                         token=token):
+            logger.warning("[ia-generacion] examen=%s liberado por timeout", eid)
+            liberados += 1
+    return liberados
+
+
+def encolar_generacion(examen_id: int, params: dict, token=None) -> None:
+    """
+    Encola la generación cuando la transacción actual confirma
+    (así el worker ya ve estado=GENERANDO).
+    IA_GENERACION_SINCRONA=True la ejecuta en línea (útil en desarrollo).
+    """
+    if getattr(settings, "IA_GENERACION_SINCRONA", False):
+        transaction.on_commit(lambda: ejecutar_generacion(examen_id, params, token))
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_ejecutar_en_hilo, examen_id, params, token))
+
+
+def _ejecutar_en_hilo(examen_id: int, params: dict, token=None) -> None:
+    close_old_connections()
+    try:
+        ejecutar_generacion(examen_id, params, token)
+    finally:
+        close_old_connections()
+
+
+def ejecutar_generacion(examen_id: int, params: dict, token=None) -> None:
+    from .ia_generation import generate_exam_with_llm, persist_exam_from_payload
+    from .llm_metricas import resumen_examen
+
+    inicio = timezone.now()
+    try:
+        examen = Examen.objects.select_related("materia").get(id_examen=examen_id)
+        payload = generate_exam_with_llm(examen, params)
+        with transaction.atomic():
+            actual = Examen.objects.select_for_update().get(id_examen=examen_id)
+            if actual.estado != "GENERANDO" or (token is not None and actual.generando_desde != token):
+                # otra generación reclamó el examen (timeout): este resultado ya no vale
+                logger.warning("[ia-generacion] examen=%s: resultado descartado (generación reemplazada)", examen_id)
+                return
+            examen.generando_desde = None
+            persist_exam_from_payload(examen, payload, params)
+    except Exception as e:
+        logger.warning("[ia-generacion] examen=%s falló: %s", examen_id, e, exc_info=True)
+        _marcar_error(examen_id, mensaje_error(e), token=token, llm_fallido=resumen_examen(examen_id, inicio))
@@ -0,0 +1,86 @@
+# ============================================
+# Aplicaciones/examenes/json_stream.py
+# ============================================
+import json
+from typing import List, Tuple
+
+
+class PreguntasStreamParser:
+    """
+    Parser incremental para el JSON de SCHEMA_JSON que llega por streaming.
+
+    feed(fragmento) devuelve las preguntas de "preguntas": [...] que se
+    completaron con ese fragmento como (indice, dict), sin esperar al resto
+    del documento. Al final, documento() parsea el JSON completo.
+    """
+
+    def __init__(self):
+        self._texto = ""
+        self._i = 0
+
+        self._depth = 0
+        self._en_string = False
+        self._escape = False
+        self._inicio_string = -1
+        self._ultimo_string = None  # último string cerrado a nivel raíz (clave)
+
+        self._depth_preguntas = None  # depth dentro del array "preguntas"
+        self._inicio_obj = -1
+        self._emitidas = 0
+
+    @property
+    def texto(self) -> str:
+        return self._texto
+
+    @property
+    def emitidas(self) -> int:
+        return self._emitidas
+
+    def feed(self, fragmento: str) -> List[Tuple[int, dict]]:
+        self._texto += fragmento
+        t = self._texto
+        completas = []
+
+        while self._i < len(t):
+            ch = t[self._i]
+
+            if self._en_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._en_string = False
+                    if self._depth == 1:
+                        self._ultimo_string = t[self._inicio_string + 1:self._i]
+            elif ch == '"':
+                self._en_string = True
+                self._inicio_string = self._i
+            elif ch in "{[":
+                if ch == "[" and self._depth == 1 and self._ultimo_string == "preguntas":
+                    self._depth_preguntas = self._depth + 1
+                elif ch == "{" and self._depth_preguntas is not None and self._depth == self._depth_preguntas:
+                    self._inicio_obj = self._i
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth_preguntas is not None:
+                    if ch == "}" and self._depth == self._depth_preguntas and self._inicio_obj >= 0:
+                        obj = json.loads(t[self._inicio_obj:self._i + 1])
+                        self._emitidas += 1
+                        completas.append((self._emitidas, obj))
+                        self._inicio_obj = -1
+                    elif ch == "]" and self._depth == self._depth_preguntas - 1:
+                        self._depth_preguntas = None
+
+            self._i += 1
+
+        return completas
+
+    def documento(self) -> dict:
+        """JSON completo (tolera texto antes/después del objeto raíz, p.ej. ```json)."""
+        t = self._texto
+        ini, fin = t.find("{"), t.rfind("}")
+        if ini < 0 or fin < ini:
+            raise ValueError("La respuesta no contiene un objeto JSON.")
+        return json.loads(t[ini:fin + 1])
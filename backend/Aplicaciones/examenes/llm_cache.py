@@ -0,0 +1,101 @@
+# ============================================
+# Aplicaciones/examenes/llm_cache.py
+# ============================================
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .llm_metricas import registrar
+from .models import RespuestaLLMCache
+
+
+def cache_activo() -> bool:
+    return bool(getattr(settings, "IA_CACHE_ACTIVO", True))
+
+
+def clave_cache(prompt: str, modelo: str, temperatura: float) -> str:
+    raw = f"{modelo}\n{float(temperatura):.3f}\n{prompt}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def obtener(clave: str):
+    """Payload cacheado vigente o None (registra el uso para la evicción LRU)."""
+    ahora = timezone.now()
+    entrada = (
+        RespuestaLLMCache.objects.filter(clave=clave, expira_en__gt=ahora)
+        .only("id_cache", "modelo", "payload")
+        .first()
+    )
+    if entrada is None:
+        return None
+
+    registrar(
+        operacion="cache", modelo_solicitado=entrada.modelo, modelo=entrada.modelo, resultado="CACHE", intentos=0
+    )
+
+    RespuestaLLMCache.objects.filter(id_cache=entrada.id_cache).update(usos=F("usos") + 1, ultimo_uso=ahora)
+    return entrada.payload
+
+
+def guardar(clave: str, modelo: str, temperatura: float, payload: dict) -> None:
+    ttl = timedelta(hours=float(getattr(settings, "IA_CACHE_TTL_HORAS", 72)))
+    ahora = timezone.now()
+    RespuestaLLMCache.objects.update_or_create(
+        clave=clave,
+        defaults={
+            "modelo": modelo,
+            "temperatura": float(temperatura),
+            "payload": payload,
+            "ultimo_uso": ahora,
+            "expira_en": ahora + ttl,
+        },
+    )
+    purgar()
+
+
+def purgar(max_entradas=None, todo: bool = False) -> int:
+    """
+    Elimina lo vencido y, si se supera IA_CACHE_MAX_ENTRADAS, lo menos usado
+    recientemente. Devuelve cuántas entradas se borraron.
+    """
+    if todo:
+        return RespuestaLLMCache.objects.all().delete()[0]
+
+    borradas = RespuestaLLMCache.objects.filter(expira_en__lte=timezone.now()).delete()[0]
+
+    if max_entradas is None:
+        max_entradas = int(getattr(settings, "IA_CACHE_MAX_ENTRADAS", 500))
+    sobrantes = list(
+        RespuestaLLMCache.objects.order_by("-ultimo_uso").values_list("id_cache", flat=True)[max_entradas:]
+    )
+    if sobrantes:
+        borradas += RespuestaLLMCache.objects.filter(id_cache__in=sobrantes).delete()[0]
+    return borradas
+
+
+def chat_json_cacheado(
+    client, prompt: str, temperature: float = 0.2, max_tokens: int = 2500, usar_cache: bool = True, generar=None
+) -> dict:
+    """
+    client.chat_json con cache persistente. usar_cache=False fuerza una llamada
+    nueva (y refresca la entrada con el resultado). `generar(prompt)` reemplaza
+    a client.chat_json (p.ej. generación en streaming).
+    """
+    usar_cache = usar_cache and cache_activo()
+    clave = clave_cache(prompt, client.model, temperature)
+
+    if usar_cache:
+        payload = obtener(clave)
+        if payload is not None:
+            return payload
+
+    if generar is not None:
+        payload = generar(prompt)
+    else:
+        payload = client.chat_json(prompt, temperature=temperature, max_tokens=max_tokens)
+    if cache_activo():
+        guardar(clave, client.model, temperature, payload)
+    return payload
@@ -2,12 +2,60 @@
 # Aplicaciones/examenes/llm_client.py
 # ============================================
 from django.conf import settings
+import asyncio
 import httpx
 import json
-from typing import Any, Dict, List
+import random
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from .llm_metricas import registrar
+
+
+# Códigos que vale la pena reintentar (rate limit / caída temporal del proveedor)
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# 4xx que dependen del modelo pedido (no existe, retirado, sin proveedor):
+# no se reintentan, pero sí se pasa al siguiente de LLM_FALLBACK_MODELS
+MODEL_ERROR_STATUS = {404}
+MODEL_ERROR_PATRONES = ("model not found", "not a valid model", "invalid model", "no endpoints found",
+                        "does not exist", "model_not_found")
+
+SYSTEM_PROMPT = (
+    "Devuelve ÚNICAMENTE un JSON válido (RFC 8259). "
+    "No uses YAML, no uses markdown, no escribas texto fuera del JSON. "
+    "Debes iniciar con '{' y terminar con '}'."
+)
+
+
+def _http2_disponible() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class LLMRetryableError(RuntimeError):
+    pass
+
+
+class LLMModelError(RuntimeError):
+    """El modelo pedido no está disponible: probar el siguiente fallback."""
 
 
 class LLMClient:
+    """
+    Cliente OpenAI-compatible (OpenRouter u otro).
+    Usa un httpx.Client compartido (keep-alive, HTTP/2 si está `h2`) y
+    reintenta 429/5xx con backoff exponencial + jitter antes de pasar
+    al siguiente modelo de LLM_FALLBACK_MODELS. Si el modelo no existe
+    o no está disponible (404) pasa directo al siguiente.
+
+    Usar get_llm_client() para obtener la instancia del proceso.
+    """
+
     def __init__(self):
         self.api_key = getattr(settings, "LLM_API_KEY", "")
         self.base_url = getattr(settings, "LLM_BASE_URL", "").rstrip("/")
@@ -24,6 +72,39 @@ class LLMClient:
 
         self.timeout = httpx.Timeout(connect=10.0, read=180.0, write=10.0, pool=10.0)
 
+        self.max_retries = int(getattr(settings, "LLM_MAX_RETRIES", 2))
+        self.backoff_base = float(getattr(settings, "LLM_BACKOFF_BASE", 0.5))
+        self.backoff_max = float(getattr(settings, "LLM_BACKOFF_MAX", 8.0))
+        self.max_concurrency = max(1, int(getattr(settings, "LLM_MAX_CONCURRENCY", 4)))
+        self.http2 = bool(getattr(settings, "LLM_HTTP2", True)) and _http2_disponible()
+
+        self._semaforo = threading.BoundedSemaphore(self.max_concurrency)
+        self._http: Optional[httpx.Client] = None
+        self._http_lock = threading.Lock()
+
+    # ---------------------------------------------------------
+    # Conexiones
+    # ---------------------------------------------------------
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_concurrency * 2,
+            max_keepalive_connections=self.max_concurrency,
+            keepalive_expiry=60.0,
+        )
+
+    @property
+    def http(self) -> httpx.Client:
+        if self._http is None:
+            with self._http_lock:
+                if self._http is None:
+                    self._http = httpx.Client(timeout=self.timeout, limits=self._limits(), http2=self.http2)
+        return self._http
+
+    def close(self):
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
     def _headers(self) -> Dict[str, str]:
         h = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
         if "openrouter.ai" in self.base_url:
@@ -35,37 +116,42 @@ class LLMClient:
                 h["X-Title"] = title
         return h
 
-    def chat_text(self, user_prompt: str, temperature: float = 0.2, max_tokens: int = 2500) -> str:
-        url = f"{self.base_url}/chat/completions"
-        models = [self.model] + self.fallback_models
+    # ---------------------------------------------------------
+    # Request / response
+    # ---------------------------------------------------------
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/chat/completions"
 
-        body = {
+    @property
+    def models(self) -> List[str]:
+        return [self.model] + self.fallback_models
+
+    def _body(self, user_prompt: str, temperature: float, max_tokens: int, models: List[str]) -> Dict[str, Any]:
+        return {
+            "model": models[0],
             "models": models,
             "temperature": float(temperature),
             "max_tokens": int(max_tokens),
             "messages": [
-                {
-                    "role": "system",
-                    "content": (
-                        "Devuelve ÚNICAMENTE un JSON válido (RFC 8259). "
-                        "No uses YAML, no uses markdown, no escribas texto fuera del JSON. "
-                        "Debes iniciar con '{' y terminar con '}'."
-                    ),
-                },
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt},
             ],
             "reasoning": {"effort": "minimal", "exclude": True},
             "provider": {"allow_fallbacks": True, "sort": "throughput"},
         }
 
-        with httpx.Client(timeout=self.timeout) as client:
-            r = client.post(url, headers=self._headers(), json=body)
-
+    def _check_status(self, r: httpx.Response):
+        if r.status_code in RETRYABLE_STATUS:
+            raise LLMRetryableError(f"LLM HTTP {r.status_code}: {r.text[:900]}")
+        if 400 <= r.status_code < 500 and (
+            r.status_code in MODEL_ERROR_STATUS or any(p in r.text.lower() for p in MODEL_ERROR_PATRONES)
+        ):
+            raise LLMModelError(f"LLM HTTP {r.status_code}: {r.text[:900]}")
         if r.status_code < 200 or r.status_code >= 300:
             raise RuntimeError(f"LLM HTTP {r.status_code}: {r.text[:900]}")
 
-        data = r.json()
-
+    def _parse_content(self, data: Any) -> str:
         if isinstance(data, dict) and "error" in data:
             raise RuntimeError(f"LLM error: {data['error']}")
 
@@ -87,6 +173,280 @@ class LLMClient:
 
         return content
 
+    def _registrar(
+        self,
+        operacion: str,
+        inicio: float,
+        intentos: int,
+        models: List[str],
+        max_tokens: int,
+        data: Optional[dict] = None,
+        error: Optional[Exception] = None,
+        primer_token: Optional[float] = None,
+        resultado: Optional[str] = None,
+    ):
+        """Métricas de la llamada (tokens del bloque `usage`, modelo que respondió)."""
+        data = data if isinstance(data, dict) else {}
+        usage = data.get("usage") or {}
+        modelo = data.get("model") or models[0]
+        registrar(
+            operacion=operacion,
+            modelo_solicitado=self.model,
+            modelo=modelo,
+            resultado=resultado or ("ERROR" if error else "OK"),
+            intentos=intentos,
+            # fallback propio (models[0]) o ruteo del proveedor a otro modelo
+            fallback=models[0] != self.model or not modelo.startswith(self.model),
+            prompt_tokens=usage.get("prompt_tokens"),
+            completion_tokens=usage.get("completion_tokens"),
+            max_tokens=max_tokens,
+            latencia_ms=int((time.perf_counter() - inicio) * 1000),
+            primer_token_ms=int((primer_token - inicio) * 1000) if primer_token else None,
+            error=str(error or "")[:500],
+        )
+
+    def _retry_delay(self, intento: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(self.backoff_max, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        base = min(self.backoff_max, self.backoff_base * (2 ** intento))
+        # full jitter: evita que varios workers reintenten a la vez
+        return random.uniform(base / 2, base)
+
+    def _attempts(self):
+        """
+        (modelos, intento) en orden: primero todos los reintentos del modelo
+        principal, luego cada fallback.
+        """
+        models = self.models
+        for i in range(len(models)):
+            for intento in range(self.max_retries + 1):
+                yield models[i:], intento
+
+    # ---------------------------------------------------------
+    # API pública (sync)
+    # ---------------------------------------------------------
+    def chat_text(self, user_prompt: str, temperature: float = 0.2, max_tokens: int = 2500) -> str:
+        last_error: Optional[Exception] = None
+        inicio, intentos, models = time.perf_counter(), 0, self.models
+        descartados = set()  # modelos con LLMModelError: no se reintentan
+
+        try:
+            for models, intento in self._attempts():
+                if models[0] in descartados:
+                    continue
+                intentos += 1
+                body = self._body(user_prompt, temperature, max_tokens, models)
+                retry_after = None
+                try:
+                    with self._semaforo:
+                        r = self.http.post(self.url, headers=self._headers(), json=body)
+                    retry_after = r.headers.get("Retry-After")
+                    self._check_status(r)
+                    data = r.json()
+                    content = self._parse_content(data)
+                    self._registrar("chat", inicio, intentos, models, max_tokens, data)
+                    return content
+                except LLMModelError as e:
+                    last_error = e
+                    descartados.add(models[0])
+                    continue
+                except (LLMRetryableError, httpx.TransportError) as e:
+                    last_error = e
+
+                if intento < self.max_retries:
+                    time.sleep(self._retry_delay(intento, retry_after))
+
+            raise RuntimeError(f"LLM sin respuesta tras reintentos y fallbacks: {last_error}")
+        except Exception as e:
+            self._registrar("chat", inicio, intentos, models, max_tokens, error=e)
+            raise
+
     def chat_json(self, user_prompt: str, temperature: float = 0.2, max_tokens: int = 2500) -> Dict[str, Any]:
         raw = self.chat_text(user_prompt, temperature=temperature, max_tokens=max_tokens)
         return json.loads(raw)
+
+    def chat_stream(self, user_prompt: str, temperature: float = 0.2, max_tokens: int = 2500) -> Iterator[str]:
+        """
+        Completion en streaming (SSE): itera los fragmentos de texto a medida
+        que llegan. Reintentos/fallbacks solo antes del primer fragmento.
+        Cerrar el generador (break / .close()) corta la conexión y con ello
+        la generación en el proveedor.
+        """
+        last_error: Optional[Exception] = None
+        inicio, intentos, models = time.perf_counter(), 0, self.models
+        descartados = set()  # modelos con LLMModelError: no se reintentan
+        info: Dict[str, Any] = {}
+        primer_token = None
+
+        try:
+            for models, intento in self._attempts():
+                if models[0] in descartados:
+                    continue
+                intentos += 1
+                body = self._body(user_prompt, temperature, max_tokens, models)
+                body["stream"] = True
+                body["stream_options"] = {"include_usage": True}
+                retry_after = None
+                emitido = False
+                try:
+                    with self._semaforo:
+                        with self.http.stream("POST", self.url, headers=self._headers(), json=body) as r:
+                            retry_after = r.headers.get("Retry-After")
+                            if r.status_code < 200 or r.status_code >= 300:
+                                r.read()
+                            self._check_status(r)
+                            for delta in self._iter_sse(r, info):
+                                if primer_token is None:
+                                    primer_token = time.perf_counter()
+                                emitido = True
+                                yield delta
+                    self._registrar("stream", inicio, intentos, models, max_tokens, info, primer_token=primer_token)
+                    return
+                except LLMModelError as e:
+                    last_error = e
+                    descartados.add(models[0])
+                    continue
+                except (LLMRetryableError, httpx.TransportError) as e:
+                    if emitido:
+                        raise RuntimeError(f"Stream del LLM interrumpido: {e}")
+                    last_error = e
+
+                if intento < self.max_retries:
+                    time.sleep(self._retry_delay(intento, retry_after))
+
+            raise RuntimeError(f"LLM sin respuesta tras reintentos y fallbacks: {last_error}")
+        except GeneratorExit:
+            # el consumidor cortó el stream (p.ej. abortó por preguntas inválidas)
+            self._registrar(
+                "stream", inicio, intentos, models, max_tokens, info, primer_token=primer_token, resultado="ABORTADO"
+            )
+            raise
+        except Exception as e:
+            self._registrar("stream", inicio, intentos, models, max_tokens, info, error=e, primer_token=primer_token)
+            raise
+
+    def _iter_sse(self, r: httpx.Response, info: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Fragmentos de texto del SSE; `info` recibe "model" y "usage" si llegan."""
+        info = {} if info is None else info
+        for line in r.iter_lines():
+            # líneas vacías y comentarios (": OPENROUTER PROCESSING") se ignoran
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+
+            chunk = json.loads(data)
+            if isinstance(chunk, dict) and chunk.get("error"):
+                raise RuntimeError(f"LLM error: {chunk['error']}")
+            if chunk.get("model"):
+                info["model"] = chunk["model"]
+            if chunk.get("usage"):
+                info["usage"] = chunk["usage"]
+
+            choices = chunk.get("choices") or []
+            if not choices:
+                continue
+            delta = (choices[0].get("delta") or {}).get("content")
+            if delta:
+                yield delta
+
+
+class AsyncLLMClient(LLMClient):
+    """
+    Variante asyncio (httpx.AsyncClient) con la misma configuración,
+    reintentos y límite de concurrencia. Un AsyncClient pertenece a un
+    event loop, por eso se usa como context manager:
+
+        async with AsyncLLMClient() as client:
+            await asyncio.gather(*(client.chat_json(p) for p in prompts))
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._ahttp: Optional[httpx.AsyncClient] = None
+        self._asemaforo: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        self._ahttp = httpx.AsyncClient(timeout=self.timeout, limits=self._limits(), http2=self.http2)
+        self._asemaforo = asyncio.Semaphore(self.max_concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        if self._ahttp is not None:
+            await self._ahttp.aclose()
+            self._ahttp = None
+
+    async def chat_text(self, user_prompt: str, temperature: float = 0.2, max_tokens: int = 2500) -> str:
+        if self._ahttp is None:
+            await self.__aenter__()
+
+        last_error: Optional[Exception] = None
+        inicio, intentos, models = time.perf_counter(), 0, self.models
+        descartados = set()  # modelos con LLMModelError: no se reintentan
+
+        try:
+            for models, intento in self._attempts():
+                if models[0] in descartados:
+                    continue
+                intentos += 1
+                body = self._body(user_prompt, temperature, max_tokens, models)
+                retry_after = None
+                try:
+                    async with self._asemaforo:
+                        r = await self._ahttp.post(self.url, headers=self._headers(), json=body)
+                    retry_after = r.headers.get("Retry-After")
+                    self._check_status(r)
+                    data = r.json()
+                    content = self._parse_content(data)
+                    self._registrar("chat", inicio, intentos, models, max_tokens, data)
+                    return content
+                except LLMModelError as e:
+                    last_error = e
+                    descartados.add(models[0])
+                    continue
+                except (LLMRetryableError, httpx.TransportError) as e:
+                    last_error = e
+
+                if intento < self.max_retries:
+                    await asyncio.sleep(self._retry_delay(intento, retry_after))
+
+            raise RuntimeError(f"LLM sin respuesta tras reintentos y fallbacks: {last_error}")
+        except Exception as e:
+            self._registrar("chat", inicio, intentos, models, max_tokens, error=e)
+            raise
+
+    async def chat_json(self, user_prompt: str, temperature: float = 0.2, max_tokens: int = 2500) -> Dict[str, Any]:
+        raw = await self.chat_text(user_prompt, temperature=temperature, max_tokens=max_tokens)
+        return json.loads(raw)
+
+
+# =========================================================
+# Cliente del proceso (settings leídos una vez, pool reutilizado)
+# =========================================================
+_client: Optional[LLMClient] = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient()
+    return _client
+
+
+def reset_llm_client():
+    """Cierra el pool y fuerza releer settings (cambio de configuración)."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
@@ -0,0 +1,185 @@
+# ============================================
+# Aplicaciones/examenes/llm_metricas.py
+# ============================================
+# Instrumentación de las llamadas al LLM.
+#
+# LLMClient llama a registrar() al terminar cada llamada (ok o error). Los
+# registros se acumulan en el colector del contexto actual (ContextVar:
+# sirve igual en el hilo del worker y dentro de asyncio.run, cuyas tareas
+# heredan el contexto) y al cerrar medir() se guardan de una vez en
+# MetricaLLM. Fuera de medir() no se guarda nada.
+# ============================================
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from .models import MetricaLLM
+
+logger = logging.getLogger("django")
+
+_colector: ContextVar[Optional["Medicion"]] = ContextVar("llm_metricas", default=None)
+
+
+def metricas_activas() -> bool:
+    return bool(getattr(settings, "IA_METRICAS_ACTIVO", True))
+
+
+class Medicion:
+    def __init__(self, examen_id: Optional[int] = None):
+        self.examen_id = examen_id
+        self.llamadas: List[dict] = []
+
+    def resumen(self) -> dict:
+        return resumir(self.llamadas)
+
+
+def registrar(**datos) -> None:
+    """Agrega una llamada al colector activo (si lo hay)."""
+    medicion = _colector.get()
+    if medicion is not None:
+        datos.setdefault("fecha", timezone.now())
+        medicion.llamadas.append(datos)
+    logger.debug("[llm] %s", datos)
+
+
+@contextmanager
+def medir(examen_id: Optional[int] = None):
+    """
+    Colector de métricas para un bloque (p.ej. una generación). Anidado,
+    reutiliza el de afuera y solo el más externo guarda en BD.
+    """
+    actual = _colector.get()
+    if actual is not None:
+        yield actual
+        return
+
+    medicion = Medicion(examen_id)
+    token = _colector.set(medicion)
+    try:
+        yield medicion
+    finally:
+        _colector.reset(token)
+        if metricas_activas() and medicion.llamadas:
+            try:
+                guardar(medicion)
+            except Exception:
+                # las métricas nunca deben tumbar una generación
+                logger.warning("[llm] no se pudieron guardar las métricas", exc_info=True)
+
+
+def guardar(medicion: Medicion) -> None:
+    campos = {f.name for f in MetricaLLM._meta.concrete_fields}
+    MetricaLLM.objects.bulk_create([
+        MetricaLLM(examen_id=medicion.examen_id, **{k: v for k, v in d.items() if k in campos})
+        for d in medicion.llamadas
+    ])
+
+    dias = int(getattr(settings, "IA_METRICAS_RETENCION_DIAS", 30))
+    if dias > 0:
+        MetricaLLM.objects.filter(fecha__lt=timezone.now() - timedelta(days=dias)).delete()
+
+
+def resumir(llamadas: List[dict]) -> dict:
+    """Resumen compacto para Examen.ia_metadata["llm"]."""
+    reales = [d for d in llamadas if d.get("resultado") != "CACHE"]
+    modelos: Dict[str, int] = {}
+    for d in reales:
+        if d.get("modelo"):
+            modelos[d["modelo"]] = modelos.get(d["modelo"], 0) + 1
+    return {
+        "llamadas": len(reales),
+        "cache": len(llamadas) - len(reales),
+        "errores": sum(1 for d in reales if d.get("resultado") == "ERROR"),
+        "reintentos": sum(max(0, int(d.get("intentos") or 1) - 1) for d in reales),
+        "fallbacks": sum(1 for d in reales if d.get("fallback")),
+        "prompt_tokens": sum(int(d.get("prompt_tokens") or 0) for d in reales),
+        "completion_tokens": sum(int(d.get("completion_tokens") or 0) for d in reales),
+        "latencia_ms": sum(int(d.get("latencia_ms") or 0) for d in reales),
+        "modelos": modelos,
+    }
+
+
+def resumen_examen(examen_id: int, desde) -> dict:
+    """resumir() desde lo guardado (p.ej. para una generación que falló)."""
+    campos = ["resultado", "modelo", "intentos", "fallback", "prompt_tokens", "completion_tokens", "latencia_ms"]
+    return resumir(list(MetricaLLM.objects.filter(examen_id=examen_id, fecha__gte=desde).values(*campos)))
+
+
+# =========================================================
+# Estadísticas agregadas (endpoint de administración)
+# =========================================================
+def estadisticas(desde=None, modelo: Optional[str] = None, operacion: Optional[str] = None) -> dict:
+    """
+    Por (modelo, operación): llamadas, errores, fallbacks, tokens, latencia
+    p50/p95, tokens/s y uso de max_tokens (cerca de 1.0 = respuestas
+    truncadas -> subir max_tokens o achicar los lotes).
+    """
+    qs = MetricaLLM.objects.all()
+    if desde is not None:
+        qs = qs.filter(fecha__gte=desde)
+    if modelo:
+        qs = qs.filter(Q(modelo=modelo) | Q(modelo_solicitado=modelo))
+    if operacion:
+        qs = qs.filter(operacion=operacion)
+
+    cache = qs.filter(resultado="CACHE").count()
+    qs = qs.exclude(resultado="CACHE")
+
+    grupos = (
+        qs.values("modelo", "operacion")
+        .annotate(
+            llamadas=Count("id_metrica"),
+            errores=Count("id_metrica", filter=Q(resultado="ERROR")),
+            fallbacks=Count("id_metrica", filter=Q(fallback=True)),
+            intentos=Sum("intentos"),
+            prompt_tokens=Sum("prompt_tokens"),
+            completion_tokens=Sum("completion_tokens"),
+        )
+        .order_by("-llamadas")
+    )
+
+    # latencias y uso de max_tokens: una sola consulta, agrupado en memoria
+    series: Dict[tuple, list] = {}
+    for fila in qs.filter(resultado="OK").values_list(
+        "modelo", "operacion", "latencia_ms", "primer_token_ms", "completion_tokens", "max_tokens"
+    ):
+        series.setdefault(fila[:2], []).append(fila[2:])
+
+    filas = []
+    for g in grupos:
+        datos = np.array(series.get((g["modelo"], g["operacion"]), []), dtype=np.float64).reshape(-1, 4)
+        lat, primer, completion, maximo = datos.T if len(datos) else (np.empty(0),) * 4
+        con_tokens = ~np.isnan(completion) & (lat > 0)
+        con_max = ~np.isnan(completion) & (maximo > 0)
+        primer = primer[~np.isnan(primer)]
+
+        filas.append({
+            "modelo": g["modelo"],
+            "operacion": g["operacion"],
+            "llamadas": g["llamadas"],
+            "errores": g["errores"],
+            "tasa_error": round(g["errores"] / g["llamadas"], 4),
+            "fallbacks": g["fallbacks"],
+            "reintentos": int(g["intentos"] or 0) - g["llamadas"],
+            "prompt_tokens": int(g["prompt_tokens"] or 0),
+            "completion_tokens": int(g["completion_tokens"] or 0),
+            "latencia_p50_ms": int(np.percentile(lat, 50)) if len(lat) else None,
+            "latencia_p95_ms": int(np.percentile(lat, 95)) if len(lat) else None,
+            "primer_token_p50_ms": int(np.percentile(primer, 50)) if len(primer) else None,
+            "tokens_por_segundo": (
+                round(float(completion[con_tokens].sum() / (lat[con_tokens].sum() / 1000)), 1)
+                if con_tokens.any() else None
+            ),
+            "uso_max_tokens": (
+                round(float((completion[con_max] / maximo[con_max]).mean()), 3) if con_max.any() else None
+            ),
+        })
+
+    return {"cache": cache, "grupos": filas}
@@ -0,0 +1,109 @@
+# ============================================
+# Aplicaciones/examenes/management/commands/benchmark_materias_examenes.py
+# ============================================
+# Mide GET /api/examenes/materias-con-examenes/ sobre datos sintéticos
+# (por defecto 100 materias x 50 exámenes x 5 preguntas): consultas SQL y
+# tiempo con cache frío y caliente, por rol. Todo corre dentro de una
+# transacción que se revierte al final: no deja datos.
+#
+#   python manage.py benchmark_materias_examenes
+#   python manage.py benchmark_materias_examenes --materias 20 --examenes 10 --repeticiones 3
+# ============================================
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from Aplicaciones.examenes.models import Examen, Materia, Pregunta
+from Aplicaciones.examenes.views import MateriasConExamenesView
+from Aplicaciones.usuarios.models import Usuario
+from backend.cache import invalidar
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark de MateriasConExamenesView con datos sintéticos (se revierten)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--materias", type=int, default=100)
+        parser.add_argument("--examenes", type=int, default=50, help="Exámenes por materia.")
+        parser.add_argument("--preguntas", type=int, default=5, help="Preguntas por examen.")
+        parser.add_argument("--repeticiones", type=int, default=5)
+
+    def handle(self, *args, **opts):
+        try:
+            with transaction.atomic():
+                self._correr(opts)
+                raise _Rollback
+        except _Rollback:
+            pass
+        invalidar("examenes.Materia")
+
+    def _poblar(self, opts):
+        sello = int(time.time()) % 10**9
+        prefijo = f"bench-{sello}"
+        Materia.objects.bulk_create([
+            Materia(nombre=f"{prefijo}-{i:04d}") for i in range(opts["materias"])
+        ])
+        materias = list(Materia.objects.filter(nombre__startswith=prefijo))
+
+        estados = ["ACTIVO", "PUBLICADO", "BORRADOR"]
+        Examen.objects.bulk_create([
+            Examen(
+                materia=m, titulo=f"Examen {j}", docente_id=0, docente_nombre="bench",
+                estado=estados[j % len(estados)],
+            )
+            for m in materias for j in range(opts["examenes"])
+        ], batch_size=1000)
+
+        ids = Examen.objects.filter(materia__in=materias).values_list("id_examen", flat=True)
+        Pregunta.objects.bulk_create([
+            Pregunta(examen_id=eid, enunciado=f"Pregunta {k}", orden=k)
+            for eid in ids for k in range(opts["preguntas"])
+        ], batch_size=2000)
+
+        return tuple(
+            Usuario.objects.create_user(
+                f"{prefijo}-{rol.lower()}@bench.local", f"{sello:09d}{i}", "x",
+                nombres="Bench", apellidos=rol, rol=rol,
+            )
+            for i, rol in enumerate(("ESTUDIANTE", "DOCENTE"))
+        )
+
+    def _medir(self, vista, usuario, frio: bool) -> tuple:
+        factory = APIRequestFactory()
+        if frio:
+            invalidar("examenes.Materia")
+        request = factory.get("/api/examenes/materias-con-examenes/")
+        force_authenticate(request, user=usuario)
+
+        with CaptureQueriesContext(connection) as ctx:
+            t0 = time.perf_counter()
+            respuesta = vista(request)
+            respuesta.render()
+            ms = (time.perf_counter() - t0) * 1000
+        return ms, len(ctx), len(respuesta.content)
+
+    def _correr(self, opts):
+        estudiante, docente = self._poblar(opts)
+        vista = MateriasConExamenesView.as_view()
+        self.stdout.write(
+            f"materias={opts['materias']} examenes_por_materia={opts['examenes']} "
+            f"preguntas_por_examen={opts['preguntas']}"
+        )
+
+        for nombre, usuario in (("estudiante", estudiante), ("docente", docente)):
+            for frio in (True, False):
+                muestras = [self._medir(vista, usuario, frio) for _ in range(opts["repeticiones"])]
+                ms = np.array([m[0] for m in muestras])
+                self.stdout.write(
+                    f"{nombre:<10} cache={'frio ' if frio else 'calor'} "
+                    f"p50={np.percentile(ms, 50):8.1f}ms max={ms.max():8.1f}ms "
+                    f"consultas={muestras[-1][1]} bytes={muestras[-1][2]}"
+                )
@@ -0,0 +1,41 @@
+# ============================================
+# Aplicaciones/examenes/management/commands/indexar_banco_preguntas.py
+# ============================================
+# Calcula la firma MinHash de las preguntas que aún no la tienen
+# (preguntas anteriores al banco). Idempotente.
+#
+#   python manage.py indexar_banco_preguntas
+#   python manage.py indexar_banco_preguntas --todas   (recalcula todas)
+# ============================================
+from django.core.management.base import BaseCommand
+
+from Aplicaciones.examenes.banco import firma_bytes, invalidar_indice
+from Aplicaciones.examenes.models import Pregunta
+
+
+class Command(BaseCommand):
+    help = "Completa Pregunta.minhash para el banco de preguntas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--todas", action="store_true", help="Recalcular también las que ya tienen firma.")
+
+    def handle(self, *args, **opts):
+        qs = Pregunta.objects.all() if opts["todas"] else Pregunta.objects.filter(minhash__isnull=True)
+        qs = qs.order_by("id_pregunta").only("id_pregunta", "enunciado", "examen__materia_id").select_related("examen")
+
+        total, ultimo, materias = 0, 0, set()
+        while True:
+            lote = list(qs.filter(id_pregunta__gt=ultimo)[:opts["batch_size"]])
+            if not lote:
+                break
+            for p in lote:
+                p.minhash = firma_bytes(p.enunciado)
+                materias.add(p.examen.materia_id)
+            Pregunta.objects.bulk_update(lote, ["minhash"])
+            total += len(lote)
+            ultimo = lote[-1].id_pregunta
+
+        for materia_id in materias:
+            invalidar_indice(materia_id)
+        self.stdout.write(f"preguntas_indexadas={total} materias={len(materias)}")
@@ -0,0 +1,23 @@
+# ============================================
+# Aplicaciones/examenes/management/commands/purgar_cache_llm.py
+# ============================================
+# Limpia el cache de respuestas del LLM (vencidas + exceso de entradas).
+#
+#   python manage.py purgar_cache_llm
+#   python manage.py purgar_cache_llm --todo
+# ============================================
+from django.core.management.base import BaseCommand
+
+from Aplicaciones.examenes.llm_cache import purgar
+
+
+class Command(BaseCommand):
+    help = "Elimina respuestas del LLM vencidas o que exceden IA_CACHE_MAX_ENTRADAS."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--max-entradas", type=int, default=None, help="Tope de entradas a conservar.")
+        parser.add_argument("--todo", action="store_true", help="Vaciar el cache completo.")
+
+    def handle(self, *args, **opts):
+        borradas = purgar(max_entradas=opts["max_entradas"], todo=opts["todo"])
+        self.stdout.write(f"entradas_borradas={borradas}")
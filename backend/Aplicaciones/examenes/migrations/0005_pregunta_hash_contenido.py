@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 10:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examenes', '0004_remove_examen_examenes_materia_d34811_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pregunta',
+            name='hash_contenido',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.10 on 2026-10-19 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examenes', '0005_pregunta_hash_contenido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RespuestaLLMCache',
+            fields=[
+                ('id_cache', models.AutoField(primary_key=True, serialize=False)),
+                ('clave', models.CharField(max_length=64, unique=True)),
+                ('modelo', models.CharField(max_length=200)),
+                ('temperatura', models.FloatField(default=0.2)),
+                ('payload', models.JSONField(default=dict)),
+                ('usos', models.IntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('ultimo_uso', models.DateTimeField(auto_now_add=True)),
+                ('expira_en', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'db_table': 'respuestas_llm_cache',
+                'ordering': ['-ultimo_uso'],
+                'indexes': [models.Index(fields=['ultimo_uso'], name='respuestas__ultimo__7a2171_idx')],
+            },
+        ),
+    ]
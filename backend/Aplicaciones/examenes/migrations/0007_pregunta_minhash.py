@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examenes', '0006_respuestallmcache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pregunta',
+            name='minhash',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.10 on 2026-10-19 11:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examenes', '0007_pregunta_minhash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VarianteExamen',
+            fields=[
+                ('id_variante', models.AutoField(primary_key=True, serialize=False)),
+                ('numero', models.PositiveSmallIntegerField()),
+                ('preguntas', models.JSONField(default=list)),
+                ('puntaje_total', models.DecimalField(decimal_places=2, default=0, max_digits=7)),
+                ('semilla', models.BigIntegerField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('examen', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variantes', to='examenes.examen')),
+            ],
+            options={
+                'db_table': 'variantes_examen',
+                'ordering': ['examen', 'numero'],
+                'unique_together': {('examen', 'numero')},
+            },
+        ),
+        migrations.AddField(
+            model_name='horario',
+            name='variante',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='horarios', to='examenes.varianteexamen'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.10 on 2026-10-19 11:15
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examenes', '0008_varianteexamen'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricaLLM',
+            fields=[
+                ('id_metrica', models.AutoField(primary_key=True, serialize=False)),
+                ('examen_id', models.IntegerField(blank=True, db_index=True, null=True)),
+                ('operacion', models.CharField(max_length=20)),
+                ('modelo_solicitado', models.CharField(blank=True, max_length=200)),
+                ('modelo', models.CharField(blank=True, max_length=200)),
+                ('resultado', models.CharField(choices=[('OK', 'OK'), ('ERROR', 'Error'), ('CACHE', 'Cache'), ('ABORTADO', 'Abortado')], default='OK', max_length=10)),
+                ('intentos', models.PositiveSmallIntegerField(default=1)),
+                ('fallback', models.BooleanField(default=False)),
+                ('prompt_tokens', models.IntegerField(blank=True, null=True)),
+                ('completion_tokens', models.IntegerField(blank=True, null=True)),
+                ('max_tokens', models.IntegerField(blank=True, null=True)),
+                ('latencia_ms', models.IntegerField(default=0)),
+                ('primer_token_ms', models.IntegerField(blank=True, null=True)),
+                ('error', models.CharField(blank=True, max_length=500)),
+                ('fecha', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'metricas_llm',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['modelo', 'fecha'], name='metricas_ll_modelo_c06920_idx')],
+            },
+        ),
+    ]
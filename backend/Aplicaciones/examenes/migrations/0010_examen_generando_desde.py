@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 11:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('examenes', '0009_metricallm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='examen',
+            name='generando_desde',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
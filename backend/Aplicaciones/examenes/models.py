@@ -70,6 +70,9 @@ class Examen(models.Model):
 
     parametros_generacion = models.JSONField(default=dict, blank=True)
     ia_metadata = models.JSONField(default=dict, blank=True)
+    # inicio de la generación en curso; si supera IA_GENERACION_TIMEOUT se
+    # considera huérfana (worker caído) y el examen se puede reclamar
+    generando_desde = models.DateTimeField(null=True, blank=True, editable=False)
 
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
@@ -129,15 +132,20 @@ class Pregunta(models.Model):
 
     ia_metadata = models.JSONField(default=dict, blank=True)
 
+    # SHA-256 del contenido normalizado (importaciones idempotentes)
+    hash_contenido = models.CharField(max_length=64, blank=True, db_index=True)
+    # firma MinHash del enunciado (uint32[64]) para el banco de preguntas
+    minhash = models.BinaryField(null=True, blank=True, editable=False)
+
     fecha_creacion = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = "preguntas"
         ordering = ["examen", "orden"]
 
-    def save(self, *args, **kwargs):
+    def save(self, *args, recalcular_puntaje=True, **kwargs):
         super().save(*args, **kwargs)
-        if self.examen_id:
+        if recalcular_puntaje and self.examen_id:
             self.examen.calcular_puntaje_total(save=True)
 
 
@@ -155,9 +163,34 @@ class OpcionRespuesta(models.Model):
         ordering = ["pregunta", "orden"]
 
 
+class VarianteExamen(models.Model):
+    """
+    Variante de un examen: subconjunto/permutación de SUS preguntas.
+    No copia filas de Pregunta: solo guarda los ids en el orden de la variante.
+    """
+    id_variante = models.AutoField(primary_key=True)
+    examen = models.ForeignKey(Examen, on_delete=models.CASCADE, related_name="variantes")
+    numero = models.PositiveSmallIntegerField()
+    preguntas = models.JSONField(default=list)  # [id_pregunta, ...] en orden
+    puntaje_total = models.DecimalField(max_digits=7, decimal_places=2, default=0)
+    semilla = models.BigIntegerField(null=True, blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "variantes_examen"
+        ordering = ["examen", "numero"]
+        unique_together = [["examen", "numero"]]
+
+    def __str__(self):
+        return f"{self.examen_id} - variante {self.numero}"
+
+
 class Horario(models.Model):
     id_horario = models.AutoField(primary_key=True)
     examen = models.ForeignKey(Examen, on_delete=models.CASCADE, related_name="horarios")
+    variante = models.ForeignKey(
+        VarianteExamen, on_delete=models.SET_NULL, related_name="horarios", null=True, blank=True
+    )
     grupo = models.CharField(max_length=100, blank=True)
     fecha = models.DateField()
     hora_inicio = models.TimeField()
@@ -171,3 +204,64 @@ class Horario(models.Model):
     class Meta:
         db_table = "horarios"
         ordering = ["fecha", "hora_inicio"]
+
+
+class RespuestaLLMCache(models.Model):
+    """
+    Respuestas del LLM reutilizables: clave = sha256(prompt + modelo + temperatura).
+    Se guarda el JSON crudo; al leerlo pasa igual por normalización/validación.
+    """
+    id_cache = models.AutoField(primary_key=True)
+    clave = models.CharField(max_length=64, unique=True)
+    modelo = models.CharField(max_length=200)
+    temperatura = models.FloatField(default=0.2)
+    payload = models.JSONField(default=dict)
+    usos = models.IntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    ultimo_uso = models.DateTimeField(auto_now_add=True)
+    expira_en = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = "respuestas_llm_cache"
+        ordering = ["-ultimo_uso"]
+        indexes = [models.Index(fields=["ultimo_uso"])]
+
+    def __str__(self):
+        return f"{self.modelo} - {self.clave[:12]}"
+
+
+class MetricaLLM(models.Model):
+    """
+    Una llamada al LLM (o un acierto del cache) durante una generación:
+    qué modelo respondió, tokens del bloque `usage`, latencia y reintentos.
+    """
+    RESULTADOS = [
+        ("OK", "OK"),
+        ("ERROR", "Error"),
+        ("CACHE", "Cache"),
+        ("ABORTADO", "Abortado"),
+    ]
+
+    id_metrica = models.AutoField(primary_key=True)
+    examen_id = models.IntegerField(null=True, blank=True, db_index=True)
+    operacion = models.CharField(max_length=20)  # chat / stream / cache
+    modelo_solicitado = models.CharField(max_length=200, blank=True)
+    modelo = models.CharField(max_length=200, blank=True)  # el que respondió
+    resultado = models.CharField(max_length=10, choices=RESULTADOS, default="OK")
+    intentos = models.PositiveSmallIntegerField(default=1)
+    fallback = models.BooleanField(default=False)
+    prompt_tokens = models.IntegerField(null=True, blank=True)
+    completion_tokens = models.IntegerField(null=True, blank=True)
+    max_tokens = models.IntegerField(null=True, blank=True)
+    latencia_ms = models.IntegerField(default=0)
+    primer_token_ms = models.IntegerField(null=True, blank=True)  # solo streaming
+    error = models.CharField(max_length=500, blank=True)
+    fecha = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        db_table = "metricas_llm"
+        ordering = ["-fecha"]
+        indexes = [models.Index(fields=["modelo", "fecha"])]
+
+    def __str__(self):
+        return f"{self.operacion} {self.modelo or self.modelo_solicitado} {self.resultado}"
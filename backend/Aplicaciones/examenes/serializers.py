@@ -2,7 +2,42 @@
 # Aplicaciones/examenes/serializers.py
 # ============================================
 from rest_framework import serializers
-from .models import Materia, Examen, Pregunta, OpcionRespuesta
+from .models import Materia, Examen, Pregunta, OpcionRespuesta, VarianteExamen
+from .services import crear_preguntas_bulk, hash_contenido_pregunta
+from .banco import buscar_similares, firma_bytes, invalidar_indice
+from backend.cache import invalidar
+
+
+def _lista_param(valor) -> set:
+    return {v.strip() for v in str(valor or "").split(",") if v.strip()}
+
+
+def campos_expandidos(request) -> set:
+    """Valores de ?expand= (p.ej. {"preguntas"})."""
+    return _lista_param(getattr(request, "query_params", {}).get("expand"))
+
+
+class CamposDinamicosMixin:
+    """
+    Selección de campos por query string (context["request"]):
+      ?fields=id_examen,titulo  -> solo esos campos
+      ?expand=preguntas         -> agrega los campos de Meta.expandibles
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        params = getattr(request, "query_params", {})
+
+        expand = _lista_param(params.get("expand"))
+        for nombre, campo in getattr(self.Meta, "expandibles", {}).items():
+            if nombre in expand:
+                self.fields[nombre] = campo()
+
+        solo = _lista_param(params.get("fields"))
+        if solo:
+            for nombre in set(self.fields) - solo - expand:
+                self.fields.pop(nombre)
 
 
 class MateriaSerializer(serializers.ModelSerializer):
@@ -38,39 +73,113 @@ class PreguntaSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["examen"]
 
-    def create(self, validated_data):
-        opciones_data = validated_data.pop("opciones", [])
-        pregunta = Pregunta.objects.create(**validated_data)
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # context["ponderaciones"]: ponderaciones de una variante (reescaladas)
+        ponderaciones = self.context.get("ponderaciones")
+        if ponderaciones and instance.id_pregunta in ponderaciones:
+            data["ponderacion"] = self.fields["ponderacion"].to_representation(ponderaciones[instance.id_pregunta])
+        # context["ocultar_respuestas"]: vista de estudiante, sin la clave
+        if self.context.get("ocultar_respuestas"):
+            data.pop("respuesta_texto", None)
+            data.pop("explicacion", None)
+            for o in data.get("opciones") or []:
+                o.pop("es_correcta", None)
+        return data
 
-        for idx, o in enumerate(opciones_data):
-            OpcionRespuesta.objects.create(
-                pregunta=pregunta,
-                clave=o.get("clave", ""),
-                texto=o.get("texto", ""),
-                es_correcta=bool(o.get("es_correcta", False)),
-                orden=int(o.get("orden", idx)),
-            )
-        return pregunta
+    def validate(self, attrs):
+        """
+        Rechaza enunciados casi iguales a otra pregunta del banco de la materia.
+        context: "examen" (alta) y "reemplazar" (carga masiva que sustituye
+        las preguntas del propio examen).
+        """
+        examen = self.instance.examen if self.instance else self.context.get("examen")
+        enunciado = attrs.get("enunciado")
+        if examen is None or not examen.materia_id or enunciado is None:
+            return attrs
+
+        similares = buscar_similares(
+            examen.materia_id,
+            enunciado,
+            excluir_examen=examen.id_examen if self.context.get("reemplazar") else None,
+            excluir_pregunta=self.instance.id_pregunta if self.instance else None,
+        )
+        if similares:
+            id_pregunta, similitud = similares[0]
+            raise serializers.ValidationError({
+                "enunciado": f"Ya existe una pregunta muy similar en la materia (#{id_pregunta}, {similitud:.0%})."
+            })
+        return attrs
+
+    def create(self, validated_data):
+        examen = validated_data.pop("examen")
+        return crear_preguntas_bulk(examen, [validated_data])[0]
 
     def update(self, instance, validated_data):
         opciones_data = validated_data.pop("opciones", None)
 
         for k, v in validated_data.items():
             setattr(instance, k, v)
-        instance.save()
+
+        opciones_hash = (
+            opciones_data if opciones_data is not None
+            else list(instance.opciones.values("clave", "texto", "es_correcta"))
+        )
+        instance.hash_contenido = hash_contenido_pregunta({
+            "tipo": instance.tipo,
+            "enunciado": instance.enunciado,
+            "respuesta_texto": instance.respuesta_texto,
+            "opciones": opciones_hash,
+        })
+        if "enunciado" in validated_data:
+            instance.minhash = firma_bytes(instance.enunciado)
+        instance.save(recalcular_puntaje=False)
+        if "enunciado" in validated_data:
+            invalidar_indice(instance.examen.materia_id)
 
         if opciones_data is not None:
-            instance.opciones.all().delete()
-            for idx, o in enumerate(opciones_data):
-                OpcionRespuesta.objects.create(
-                    pregunta=instance,
-                    clave=o.get("clave", ""),
-                    texto=o.get("texto", ""),
-                    es_correcta=bool(o.get("es_correcta", False)),
-                    orden=int(o.get("orden", idx)),
-                )
+            self._sincronizar_opciones(instance, opciones_data)
+
+        # solo cambia el puntaje del examen si cambió la ponderación
+        if "ponderacion" in validated_data:
+            instance.examen.calcular_puntaje_total(save=True)
         return instance
 
+    @staticmethod
+    def _sincronizar_opciones(pregunta, opciones_data):
+        """
+        Actualiza las opciones EN SITIO (por clave, o por posición si no hay clave)
+        en vez de borrarlas y recrearlas: así los id_opcion ya respondidos por
+        estudiantes siguen siendo válidos y se puede recalificar.
+        """
+        existentes = list(pregunta.opciones.all().order_by("orden", "id_opcion"))
+        por_clave = {o.clave: o for o in existentes if o.clave}
+        sin_clave = [o for o in existentes if not o.clave]
+
+        usadas, actualizar, crear = set(), [], []
+        for idx, o in enumerate(opciones_data):
+            clave = o.get("clave", "")
+            op = por_clave.pop(clave, None) if clave else (sin_clave.pop(0) if sin_clave else None)
+            if op is None:
+                crear.append(OpcionRespuesta(pregunta=pregunta, clave=clave))
+                op = crear[-1]
+            else:
+                usadas.add(op.id_opcion)
+                actualizar.append(op)
+            op.texto = o.get("texto", "")
+            op.es_correcta = bool(o.get("es_correcta", False))
+            op.orden = int(o.get("orden", idx))
+
+        sobrantes = [o.id_opcion for o in existentes if o.id_opcion not in usadas]
+        if sobrantes:
+            OpcionRespuesta.objects.filter(id_opcion__in=sobrantes).delete()
+        if actualizar:
+            OpcionRespuesta.objects.bulk_update(actualizar, ["texto", "es_correcta", "orden"])
+        if crear:
+            OpcionRespuesta.objects.bulk_create(crear)
+        # bulk_* no emite señales: la clave de respuestas del examen cambió
+        invalidar("examenes.Examen", pregunta.examen_id)
+
 
 class ExamenSerializer(serializers.ModelSerializer):
     materia = serializers.PrimaryKeyRelatedField(queryset=Materia.objects.all())
@@ -104,3 +213,64 @@ class ExamenSerializer(serializers.ModelSerializer):
             "ia_metadata",
             "preguntas",
         ]
+
+
+class ExamenResumenSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    """
+    Examen para listados: sin preguntas anidadas. ?expand=preguntas las
+    incluye (la vista debe prefetch-earlas). total_preguntas sale de la
+    anotación de la vista si existe.
+    """
+    materia_nombre = serializers.CharField(source="materia.nombre", read_only=True, default=None)
+    total_preguntas = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Examen
+        fields = [
+            "id_examen",
+            "materia",
+            "materia_nombre",
+            "titulo",
+            "descripcion",
+            "docente_id",
+            "docente_nombre",
+            "estado",
+            "nivel",
+            "idioma",
+            "tags",
+            "origen",
+            "fecha_inicio",
+            "fecha_fin",
+            "duracion",
+            "intentos_permitidos",
+            "aleatorizar_preguntas",
+            "requiere_camara",
+            "puntaje_total",
+            "total_preguntas",
+        ]
+        read_only_fields = fields
+        expandibles = {"preguntas": lambda: PreguntaSerializer(many=True, read_only=True)}
+
+    def get_total_preguntas(self, obj):
+        return getattr(obj, "total_preguntas", None)
+
+
+class VarianteExamenSerializer(serializers.ModelSerializer):
+    total_preguntas = serializers.SerializerMethodField()
+    horarios = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    class Meta:
+        model = VarianteExamen
+        fields = [
+            "id_variante",
+            "numero",
+            "preguntas",
+            "total_preguntas",
+            "puntaje_total",
+            "semilla",
+            "horarios",
+            "fecha_creacion",
+        ]
+
+    def get_total_preguntas(self, obj):
+        return len(obj.preguntas or [])
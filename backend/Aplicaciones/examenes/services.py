@@ -0,0 +1,102 @@
+# ============================================
+# Aplicaciones/examenes/services.py
+# ============================================
+import hashlib
+import json
+import re
+
+from django.db import transaction
+
+from .models import Examen, Pregunta, OpcionRespuesta
+from .banco import firma_bytes, invalidar_indice
+from backend.cache import cacheado
+
+
+@transaction.atomic
+def crear_preguntas_bulk(examen: Examen, preguntas_data, reemplazar: bool = False, batch_size: int = 500):
+    """
+    Persiste preguntas con sus opciones en 3 pasos, sin importar cuántas sean:
+      1) bulk_create de todas las preguntas
+      2) bulk_create de todas las opciones
+      3) UN solo recálculo de Examen.puntaje_total
+
+    preguntas_data: lista de dicts con campos de Pregunta y
+    'opciones' = [{"clave", "texto", "es_correcta", "orden"}, ...]
+    (el mismo formato que validated_data de PreguntaSerializer).
+    """
+    if reemplazar:
+        examen.preguntas.all().delete()
+
+    preguntas, opciones_por_pregunta = [], []
+    for data in preguntas_data:
+        data = dict(data)
+        data.pop("examen", None)
+        if not data.get("hash_contenido"):
+            data["hash_contenido"] = hash_contenido_pregunta(data)
+        if not data.get("minhash"):
+            data["minhash"] = firma_bytes(data.get("enunciado", ""))
+        opciones_por_pregunta.append(data.pop("opciones", None) or [])
+        preguntas.append(Pregunta(examen=examen, **data))
+
+    # 1) preguntas (bulk_create devuelve los PK en PostgreSQL)
+    preguntas = Pregunta.objects.bulk_create(preguntas, batch_size=batch_size)
+
+    # 2) opciones
+    opciones = [
+        OpcionRespuesta(
+            pregunta=pregunta,
+            clave=o.get("clave", ""),
+            texto=o.get("texto", ""),
+            es_correcta=bool(o.get("es_correcta", False)),
+            orden=int(o.get("orden", idx)),
+        )
+        for pregunta, opciones_data in zip(preguntas, opciones_por_pregunta)
+        for idx, o in enumerate(opciones_data)
+    ]
+    if opciones:
+        OpcionRespuesta.objects.bulk_create(opciones, batch_size=batch_size)
+
+    # 3) puntaje total una sola vez
+    examen.calcular_puntaje_total(save=True)
+    invalidar_indice(examen.materia_id)
+    return preguntas
+
+
+def _normalizar_texto(texto) -> str:
+    return re.sub(r"\s+", " ", str(texto or "")).strip().lower()
+
+
+def hash_contenido_pregunta(data: dict) -> str:
+    """
+    Hash estable del contenido de una pregunta (formato de crear_preguntas_bulk):
+    tipo, enunciado, opciones (clave/texto/es_correcta) y respuesta_texto.
+    No incluye orden ni ponderación: la misma pregunta con otro peso es la misma.
+    """
+    opciones = sorted(
+        (
+            (str(o.get("clave", "")), _normalizar_texto(o.get("texto", "")), bool(o.get("es_correcta", False)))
+            for o in (data.get("opciones") or [])
+        ),
+    )
+    canonico = [
+        data.get("tipo", "OPCION_MULTIPLE"),
+        _normalizar_texto(data.get("enunciado", "")),
+        opciones,
+        _normalizar_texto(data.get("respuesta_texto", "")),
+    ]
+    raw = json.dumps(canonico, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# =========================================================
+# Clave de respuestas (calificación)
+# =========================================================
+@cacheado("examen:clave_respuestas", modelos=[lambda examen_id: ("examenes.Examen", examen_id)])
+def clave_respuestas(examen_id: int) -> dict:
+    """{id_pregunta: [id_opcion correctas]} del examen, en una consulta."""
+    correctas = {}
+    for pregunta_id, opcion_id in OpcionRespuesta.objects.filter(
+        pregunta__examen_id=examen_id, es_correcta=True
+    ).values_list("pregunta_id", "id_opcion"):
+        correctas.setdefault(pregunta_id, []).append(opcion_id)
+    return correctas
@@ -0,0 +1,21 @@
+# ============================================
+# Aplicaciones/examenes/signals.py
+# ============================================
+# Versiones de cache (backend/cache.py) de materias y exámenes. Preguntas y
+# opciones suben además la versión de su examen: el snapshot y la clave de
+# respuestas se cachean por examen.
+# ============================================
+from backend.cache import versionar_modelo
+
+from .models import Examen, Materia, OpcionRespuesta, Pregunta
+
+
+def _examen_de_opcion(opcion):
+    examen_id = Pregunta.objects.filter(id_pregunta=opcion.pregunta_id).values_list("examen_id", flat=True).first()
+    return [("examenes.Examen", examen_id)] if examen_id else []
+
+
+versionar_modelo(Materia)
+versionar_modelo(Examen)
+versionar_modelo(Pregunta, alcances=lambda p: [("examenes.Examen", p.examen_id)])
+versionar_modelo(OpcionRespuesta, alcances=_examen_de_opcion)
@@ -1,3 +1,844 @@
-from django.test import TestCase
+import asyncio
+import json
+import threading
+import time
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.test import APIClient, force_authenticate
+from rest_framework.views import APIView
+
+from backend import throttling
+from backend.cache import cache_vista, clave, invalidar, obtener_o_calcular
+from Aplicaciones.analisis.models import IntentoExamen
+from Aplicaciones.analisis.services import recalificar_examen
+from Aplicaciones.usuarios.models import Usuario
+
+from . import banco, ensamblador
+from .ia_generation import reparar_payload
+from .llm_client import AsyncLLMClient, LLMClient, reset_llm_client
+from .models import Examen, Horario, Materia, OpcionRespuesta, Pregunta, VarianteExamen
+from .services import crear_preguntas_bulk
+from .variantes import escalar_ponderaciones, variante_asignada
+from .views import snapshot_examen
+
+try:
+    import fakeredis
+except ImportError:  # dependencia solo de pruebas
+    fakeredis = None
+
+try:
+    import lupa  # fakeredis lo necesita para ejecutar scripts Lua
+except ImportError:
+    lupa = None
+
+if fakeredis is not None:
+    CACHE_FAKEREDIS = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": "redis://fakeredis:6379/0",
+            "OPTIONS": {"connection_class": fakeredis.FakeConnection},
+        }
+    }
+else:
+    CACHE_FAKEREDIS = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+# Redis inalcanzable (puerto cerrado): el cache debe fallar abierto
+CACHE_REDIS_CAIDO = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://127.0.0.1:1/0",
+        "OPTIONS": {"socket_connect_timeout": 0.2, "socket_timeout": 0.2},
+    }
+}
+
+
+# =========================================================
+# Servidor LLM falso (OpenAI-compatible) en 127.0.0.1
+# =========================================================
+class ServidorLLMFalso:
+    """
+    POST /chat/completions responde con la cola `respuestas`:
+    (status, dict) -> el dict va como content JSON si status=200 (en SSE
+    si se pidió stream), o como cuerpo del error en otro caso. Sin
+    respuestas en cola usa `por_defecto`. `solicitudes` guarda los cuerpos
+    recibidos.
+    """
+
+    def __init__(self, por_defecto=None):
+        self.respuestas = []
+        self.por_defecto = por_defecto
+        self.solicitudes = []
+        self.demora = 0.0
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                servidor.solicitudes.append(body)
+                if servidor.demora:
+                    time.sleep(servidor.demora)
+                status, contenido = servidor.respuestas.pop(0) if servidor.respuestas else servidor.por_defecto
+                if status == 200 and body.get("stream"):
+                    texto = json.dumps(contenido, ensure_ascii=False)
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/event-stream")
+                    self.end_headers()
+                    for i in range(0, len(texto), 16):
+                        chunk = {"model": body["model"], "choices": [{"delta": {"content": texto[i:i + 16]}}]}
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    return
+                if status == 200:
+                    data = {
+                        "model": body["model"],
+                        "choices": [{"message": {"content": json.dumps(contenido, ensure_ascii=False)}}],
+                        "usage": {"prompt_tokens": 10, "completion_tokens": 20},
+                    }
+                else:
+                    data = contenido
+                raw = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.hilo = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def payload_examen(n=2, puntaje_total=10):
+    return {
+        "examen": {"titulo": "Examen generado", "duracion_minutos": 30},
+        "preguntas": [
+            {
+                "orden": i,
+                "tipo": "OPCION_MULTIPLE",
+                "dificultad": "MEDIA",
+                "enunciado": f"Pregunta generada {i}",
+                "ponderacion": puntaje_total / n,
+                "opciones": [{"clave": c, "texto": f"Opción {c}"} for c in "ABCD"],
+                "correctas": ["A"],
+            }
+            for i in range(1, n + 1)
+        ],
+        "control_calidad": {},
+    }
+
+
+PARAMS_IA = {
+    "numero_preguntas": 2,
+    "distribucion_tipos": {"OPCION_MULTIPLE": 2},
+    "puntaje_total": 10,
+    "sin_cache": True,
+}
+
+
+# =========================================================
+# Generación IA en segundo plano (worker en proceso)
+# =========================================================
+@override_settings(
+    IA_GENERACION_SINCRONA=False,
+    IA_STREAMING=False,
+    LLM_API_KEY="test",
+    LLM_MODEL="modelo-principal",
+    LLM_FALLBACK_MODELS="",
+    LLM_MAX_RETRIES=0,
+    LLM_BACKOFF_BASE=0,
+)
+class GeneracionIATests(TransactionTestCase):
+    def setUp(self):
+        self.docente = Usuario.objects.create_user(
+            correo_electronico="docente@test.com", cedula="0102030405", password="x",
+            nombres="Doc", apellidos="Ente", rol="DOCENTE",
+        )
+        self.materia = Materia.objects.create(nombre="Álgebra")
+        self.examen = Examen.objects.create(
+            titulo="Parcial", materia=self.materia,
+            docente_id=self.docente.id_usuario, docente_nombre="Doc Ente",
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.docente)
+        reset_llm_client()
+
+    def tearDown(self):
+        reset_llm_client()
+
+    def _url(self, sufijo=""):
+        return f"/api/examenes/{self.examen.id_examen}/generar-ia/{sufijo}"
+
+    def _esperar(self, timeout=10.0):
+        fin = time.monotonic() + timeout
+        while time.monotonic() < fin:
+            r = self.api.get(self._url("estado/"))
+            self.assertEqual(r.status_code, 200)
+            if r.data["terminado"]:
+                return r.data
+            time.sleep(0.05)
+        self.fail("La generación no terminó a tiempo.")
+
+    def test_202_y_polling_hasta_terminar(self):
+        with ServidorLLMFalso(por_defecto=(200, payload_examen())) as llm:
+            with self.settings(LLM_BASE_URL=llm.url):
+                r = self.api.post(self._url(), PARAMS_IA, format="json")
+                self.assertEqual(r.status_code, 202)
+                self.assertEqual(r.data["estado"], "GENERANDO")
+                estado = self._esperar()
+
+        self.assertEqual(estado["estado"], "PUBLICADO")
+        self.assertIsNone(estado["error"])
+        self.assertEqual(estado["total_preguntas"], 2)
+        self.examen.refresh_from_db()
+        self.assertIsNone(self.examen.generando_desde)
+        self.assertEqual(self.examen.titulo, "Examen generado")
+
+    def test_409_si_ya_hay_una_generacion(self):
+        with ServidorLLMFalso(por_defecto=(200, payload_examen())) as llm:
+            llm.demora = 0.5
+            with self.settings(LLM_BASE_URL=llm.url):
+                r1 = self.api.post(self._url(), PARAMS_IA, format="json")
+                self.assertEqual(r1.status_code, 202)
+                # segundo envío mientras el worker espera al LLM
+                fin = time.monotonic() + 5
+                while not llm.solicitudes and time.monotonic() < fin:
+                    time.sleep(0.01)
+                r2 = self.api.post(self._url(), PARAMS_IA, format="json")
+                self.assertEqual(r2.status_code, 409)
+                self.assertEqual(self._esperar()["estado"], "PUBLICADO")
+        self.assertEqual(len(llm.solicitudes), 1)
+
+    def test_fallo_del_llm_termina_en_error_generacion(self):
+        Examen.objects.filter(id_examen=self.examen.id_examen).update(ia_metadata={"previo": 1})
+        with ServidorLLMFalso(por_defecto=(400, {"error": {"message": "bad request"}})) as llm:
+            with self.settings(LLM_BASE_URL=llm.url):
+                r = self.api.post(self._url(), PARAMS_IA, format="json")
+                self.assertEqual(r.status_code, 202)
+                estado = self._esperar()
+
+        self.assertEqual(estado["estado"], "ERROR_GENERACION")
+        self.assertIn("400", estado["error"])
+        self.examen.refresh_from_db()
+        # el error se agrega a la metadata existente
+        self.assertEqual(self.examen.ia_metadata["previo"], 1)
+        self.assertIn("error_generacion", self.examen.ia_metadata)
+        self.assertIsNone(self.examen.generando_desde)
+
+    def test_generacion_huerfana_se_libera_y_se_reclama(self):
+        # worker muerto: GENERANDO desde hace más que IA_GENERACION_TIMEOUT
+        Examen.objects.filter(id_examen=self.examen.id_examen).update(
+            estado="GENERANDO", generando_desde=timezone.now() - timedelta(hours=1)
+        )
+        with self.settings(IA_GENERACION_TIMEOUT=60):
+            estado = self.api.get(self._url("estado/")).data
+            self.assertEqual(estado["estado"], "ERROR_GENERACION")
+            self.assertTrue(estado["terminado"])
+
+            # aún en GENERANDO (sin consultar el estado) se puede volver a pedir
+            Examen.objects.filter(id_examen=self.examen.id_examen).update(
+                estado="GENERANDO", generando_desde=timezone.now() - timedelta(hours=1)
+            )
+            with ServidorLLMFalso(por_defecto=(200, payload_examen())) as llm:
+                with self.settings(LLM_BASE_URL=llm.url):
+                    r = self.api.post(self._url(), PARAMS_IA, format="json")
+                    self.assertEqual(r.status_code, 202)
+                    self.assertEqual(self._esperar()["estado"], "PUBLICADO")
+
+
+# =========================================================
+# Cliente LLM: reintentos y fallbacks
+# =========================================================
+@override_settings(
+    LLM_API_KEY="test",
+    LLM_MODEL="modelo-principal",
+    LLM_FALLBACK_MODELS="fallback-1,fallback-2",
+    LLM_MAX_RETRIES=2,
+    LLM_BACKOFF_BASE=0,
+    LLM_HTTP2=False,
+)
+class LLMClientTests(TestCase):
+    def _cliente(self, llm, cls=LLMClient):
+        with self.settings(LLM_BASE_URL=llm.url):
+            return cls()
+
+    def _modelos(self, llm):
+        return [b["model"] for b in llm.solicitudes]
+
+    def test_reintenta_429_en_el_mismo_modelo(self):
+        with ServidorLLMFalso(por_defecto=(200, {"ok": True})) as llm:
+            llm.respuestas = [(429, {"error": "rate limit"})]
+            client = self._cliente(llm)
+            self.assertEqual(client.chat_json("hola"), {"ok": True})
+            client.close()
+        self.assertEqual(self._modelos(llm), ["modelo-principal", "modelo-principal"])
+
+    def test_5xx_agota_reintentos_y_pasa_al_fallback(self):
+        with ServidorLLMFalso(por_defecto=(200, {"ok": True})) as llm:
+            llm.respuestas = [(503, {"error": "caído"})] * 3
+            client = self._cliente(llm)
+            self.assertEqual(client.chat_json("hola"), {"ok": True})
+            client.close()
+        self.assertEqual(self._modelos(llm), ["modelo-principal"] * 3 + ["fallback-1"])
+
+    def test_404_pasa_al_fallback_sin_reintentar(self):
+        with ServidorLLMFalso(por_defecto=(200, {"ok": True})) as llm:
+            llm.respuestas = [(404, {"error": {"message": "No endpoints found for modelo-principal"}})]
+            client = self._cliente(llm)
+            self.assertEqual(client.chat_json("hola"), {"ok": True})
+            client.close()
+        self.assertEqual(self._modelos(llm), ["modelo-principal", "fallback-1"])
+
+    def test_modelo_inexistente_en_400_pasa_al_fallback(self):
+        with ServidorLLMFalso(por_defecto=(200, {"ok": True})) as llm:
+            llm.respuestas = [(400, {"error": {"message": "modelo-principal is not a valid model ID"}})]
+            client = self._cliente(llm)
+            self.assertEqual(client.chat_json("hola"), {"ok": True})
+            client.close()
+        self.assertEqual(self._modelos(llm), ["modelo-principal", "fallback-1"])
+
+    def test_4xx_del_request_no_reintenta(self):
+        with ServidorLLMFalso(por_defecto=(400, {"error": {"message": "max_tokens demasiado alto"}})) as llm:
+            client = self._cliente(llm)
+            with self.assertRaisesRegex(RuntimeError, "LLM HTTP 400"):
+                client.chat_json("hola")
+            client.close()
+        self.assertEqual(self._modelos(llm), ["modelo-principal"])
+
+    def test_todos_los_modelos_fallan(self):
+        with ServidorLLMFalso(por_defecto=(404, {"error": "not found"})) as llm:
+            client = self._cliente(llm)
+            with self.assertRaisesRegex(RuntimeError, "tras reintentos y fallbacks"):
+                client.chat_json("hola")
+            client.close()
+        self.assertEqual(self._modelos(llm), ["modelo-principal", "fallback-1", "fallback-2"])
+
+    def test_stream_con_fallback(self):
+        with ServidorLLMFalso(por_defecto=(200, {"preguntas": [1, 2, 3]})) as llm:
+            llm.respuestas = [(404, {"error": "not found"})]
+            client = self._cliente(llm)
+            texto = "".join(client.chat_stream("hola"))
+            client.close()
+        self.assertEqual(json.loads(texto), {"preguntas": [1, 2, 3]})
+        self.assertEqual(self._modelos(llm), ["modelo-principal", "fallback-1"])
+
+    def test_cliente_async_con_fallback(self):
+        async def pedir(client):
+            async with client:
+                return await client.chat_json("hola")
+
+        with ServidorLLMFalso(por_defecto=(200, {"ok": True})) as llm:
+            llm.respuestas = [(404, {"error": "not found"}), (429, {"error": "rate limit"})]
+            client = self._cliente(llm, AsyncLLMClient)
+            self.assertEqual(asyncio.run(pedir(client)), {"ok": True})
+        self.assertEqual(self._modelos(llm), ["modelo-principal", "fallback-1", "fallback-1"])
+
+
+# =========================================================
+# Reparación de payloads
+# =========================================================
+class ReparacionPayloadTests(TestCase):
+    def setUp(self):
+        materia = Materia.objects.create(nombre="Física")
+        self.examen = Examen.objects.create(titulo="Parcial", materia=materia, docente_id=1, docente_nombre="Doc")
+        self.params = {"puntaje_total": 10, "nivel": "INTERMEDIO", "idioma": "ES"}
+
+    def test_respeta_ponderaciones_que_ya_suman(self):
+        payload = payload_examen()
+        payload["preguntas"][0]["ponderacion"] = 7
+        payload["preguntas"][1]["ponderacion"] = 3
+        payload["preguntas"][1]["correctas"] = "b"  # se arregla localmente
+
+        reparado = reparar_payload(self.examen, self.params, payload, client=object())
+        self.assertEqual([p["ponderacion"] for p in reparado["preguntas"]], [7, 3])
+
+    def test_rebalancea_si_no_suman(self):
+        payload = payload_examen()
+        payload["preguntas"][0]["ponderacion"] = 7
+
+        reparado = reparar_payload(self.examen, self.params, payload, client=object())
+        self.assertEqual([p["ponderacion"] for p in reparado["preguntas"]], [5.0, 5.0])
+
+    def test_fallo_del_llm_en_reparacion_se_registra(self):
+        class ClienteCaido:
+            def chat_json(self, *args, **kwargs):
+                raise RuntimeError("LLM HTTP 503")
+
+        payload = payload_examen()
+        payload["preguntas"][1]["opciones"] = []
+        with self.assertLogs("django", level="WARNING") as logs:
+            with self.assertRaises(ValidationError):
+                reparar_payload(self.examen, self.params, payload, client=ClienteCaido())
+        self.assertIn("LLM HTTP 503", logs.output[0])
+
+    def test_error_de_programacion_no_se_oculta(self):
+        class ClienteRoto:
+            def chat_json(self, *args, **kwargs):
+                raise TypeError("bug")
+
+        payload = payload_examen()
+        payload["preguntas"][1]["opciones"] = []
+        with self.assertRaises(TypeError):
+            reparar_payload(self.examen, self.params, payload, client=ClienteRoto())
+
+
+# =========================================================
+# Cache de aplicación (backend/cache.py)
+# =========================================================
+@unittest.skipIf(fakeredis is None, "fakeredis no instalado")
+@override_settings(CACHES=CACHE_FAKEREDIS, CACHE_APLICACION_ACTIVO=True, CACHE_LOCK_ESPERA=5)
+class CacheAplicacionTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        materia = Materia.objects.create(nombre="Química")
+        self.examen = Examen.objects.create(titulo="Parcial", materia=materia, docente_id=1, docente_nombre="Doc")
+        self.pregunta = Pregunta.objects.create(examen=self.examen, enunciado="¿Qué es un mol?", ponderacion=5)
+        self.opcion = OpcionRespuesta.objects.create(pregunta=self.pregunta, clave="A", texto="Una unidad")
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_snapshot_se_invalida_al_escribir_pregunta_y_opcion(self):
+        snapshot_examen(self.examen.id_examen, False)
+        with self.assertNumQueries(0):
+            snapshot_examen(self.examen.id_examen, False)
+
+        self.pregunta.enunciado = "¿Qué es un mol? (editada)"
+        self.pregunta.save()
+        data = snapshot_examen(self.examen.id_examen, False)
+        self.assertEqual(data["preguntas"][0]["enunciado"], "¿Qué es un mol? (editada)")
+
+        self.opcion.texto = "Una cantidad de sustancia"
+        self.opcion.save()
+        data = snapshot_examen(self.examen.id_examen, False)
+        self.assertEqual(data["preguntas"][0]["opciones"][0]["texto"], "Una cantidad de sustancia")
+
+        Pregunta.objects.create(examen=self.examen, enunciado="¿Qué es un ion?", ponderacion=5)
+        self.assertEqual(len(snapshot_examen(self.examen.id_examen, False)["preguntas"]), 2)
+
+    def test_single_flight_con_misses_concurrentes(self):
+        k = clave("prueba:single_flight", 1, modelos=[("examenes.Examen", self.examen.id_examen)])
+        llamadas, lock = [], threading.Lock()
+
+        def calcular():
+            with lock:
+                llamadas.append(1)
+            time.sleep(0.3)
+            return {"valor": 42}
+
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(obtener_o_calcular(k, calcular))) for _ in range(8)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+        self.assertEqual(len(llamadas), 1)
+        self.assertEqual(resultados, [{"valor": 42}] * 8)
+
+    def test_cache_vista_no_guarda_respuestas_no_200(self):
+        llamadas = []
+
+        class Vista(APIView):
+            @cache_vista("prueba:vista", modelos=["examenes.Examen"])
+            def get(self, request):
+                llamadas.append(1)
+                if len(llamadas) == 1:
+                    return Response({"detail": "no disponible"}, status=503)
+                return Response({"ok": len(llamadas)})
+
+        usuario = Usuario(id_usuario=1, rol="DOCENTE")
+        vista = Vista.as_view()
+
+        def get():
+            request = RequestFactory().get("/prueba/")
+            force_authenticate(request, user=usuario)
+            return vista(request)
+
+        self.assertEqual(get().status_code, 503)
+        self.assertEqual(get().data, {"ok": 2})
+        self.assertEqual(get().data, {"ok": 2})  # ya cacheada
+        self.assertEqual(len(llamadas), 2)
+
+        invalidar("examenes.Examen")
+        self.assertEqual(get().data, {"ok": 3})
+
+
+@override_settings(CACHES=CACHE_REDIS_CAIDO, CACHE_APLICACION_ACTIVO=True)
+class CacheFallaAbiertaTests(TestCase):
+    def test_redis_caido_calcula_directo(self):
+        materia = Materia.objects.create(nombre="Biología")
+        examen = Examen.objects.create(titulo="Parcial", materia=materia, docente_id=1, docente_nombre="Doc")
+        with self.assertLogs("django", level="WARNING"):
+            # la señal post_save (invalidar) tampoco debe tumbar la escritura
+            Pregunta.objects.create(examen=examen, enunciado="¿Qué es una célula?", ponderacion=10)
+            data = snapshot_examen(examen.id_examen, False)
+        self.assertEqual(len(data["preguntas"]), 1)
+
+
+# =========================================================
+# Variantes: del docente que las genera al intento calificado
+# =========================================================
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class VariantesExamenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.docente = Usuario.objects.create_user(
+            correo_electronico="docente@test.com", cedula="0102030405", password="x",
+            nombres="Doc", apellidos="Ente", rol="DOCENTE",
+        )
+        self.estudiantes = [
+            Usuario.objects.create_user(
+                correo_electronico=f"est{i}@test.com", cedula=f"09000000{i:02d}", password="x",
+                nombres="Est", apellidos=str(i), rol="ESTUDIANTE",
+            )
+            for i in range(2)
+        ]
+        self.examen = Examen.objects.create(
+            titulo="Parcial", materia=Materia.objects.create(nombre="Física"), estado="ACTIVO",
+            docente_id=self.docente.id_usuario, docente_nombre="Doc Ente", puntaje_total=Decimal("12.00"),
+        )
+        # pool de 6 con ponderaciones distintas: cada subconjunto de 3 suma distinto
+        for i, ponderacion in enumerate(["1.00", "1.00", "1.00", "3.00", "3.00", "3.00"]):
+            p = Pregunta.objects.create(
+                examen=self.examen, enunciado=f"Enunciado número {i} sobre cinemática {i * 7}",
+                orden=i, ponderacion=Decimal(ponderacion),
+            )
+            OpcionRespuesta.objects.create(pregunta=p, clave="A", texto="Correcta", es_correcta=True, orden=0)
+            OpcionRespuesta.objects.create(pregunta=p, clave="B", texto="Incorrecta", orden=1)
+        hoy = timezone.localdate()
+        self.horarios = [
+            Horario.objects.create(
+                examen=self.examen, grupo=f"G{i}", fecha=hoy, hora_inicio="08:00", hora_fin="10:00",
+                estudiantes_ids=[est.id_usuario],
+            )
+            for i, est in enumerate(self.estudiantes)
+        ]
+
+        self.api = APIClient()
+        self.api.force_authenticate(self.docente)
+        r = self.api.post(
+            f"/api/examenes/{self.examen.id_examen}/variantes/",
+            {"k": 2, "preguntas_por_variante": 3, "semilla": 7}, format="json",
+        )
+        self.assertEqual(r.status_code, 201)
+        for h in self.horarios:
+            h.refresh_from_db()
+
+    def _rendir(self, estudiante, horario_id=None):
+        api = APIClient()
+        api.force_authenticate(estudiante)
+        r = api.post("/api/analisis/intentos/", {
+            "estudiante_id": estudiante.id_usuario, "estudiante_nombre": "Est", "estudiante_cedula": estudiante.cedula,
+            "examen_id": self.examen.id_examen, "examen_titulo": self.examen.titulo,
+            "horario_id": horario_id, "fecha_limite": timezone.now() + timedelta(hours=1), "puntaje_total": "12.00",
+        }, format="json")
+        self.assertEqual(r.status_code, 201, r.data)
+        return api, r.data
+
+    def test_rinde_solo_su_variante_y_se_califica_sobre_el_total_del_examen(self):
+        for estudiante, horario in zip(self.estudiantes, self.horarios):
+            api, intento = self._rendir(estudiante)
+            self.assertEqual(IntentoExamen.objects.get(pk=intento["id_intento"]).variante_id, horario.variante_id)
+            variante = VarianteExamen.objects.get(id_variante=horario.variante_id)
+
+            examen = api.get(f"/api/examenes/{self.examen.id_examen}/").data
+            self.assertEqual(examen["variante"], variante.numero)
+            self.assertEqual([p["id_pregunta"] for p in examen["preguntas"]], variante.preguntas)
+            self.assertEqual(sum(Decimal(p["ponderacion"]) for p in examen["preguntas"]), Decimal("12.00"))
+            self.assertNotIn("es_correcta", examen["preguntas"][0]["opciones"][0])
+
+            # una pregunta del pool fuera de la variante no se puede responder
+            fuera = Pregunta.objects.filter(examen=self.examen).exclude(id_pregunta__in=variante.preguntas).first()
+            r = api.post(f"/api/analisis/intentos/{intento['id_intento']}/respuestas/",
+                         {"pregunta_id": fuera.pk, "opcion_id": fuera.opciones.get(es_correcta=True).pk}, format="json")
+            self.assertEqual(r.status_code, 400)
+
+            for p in examen["preguntas"]:
+                correcta = OpcionRespuesta.objects.get(pregunta_id=p["id_pregunta"], es_correcta=True)
+                r = api.post(f"/api/analisis/intentos/{intento['id_intento']}/respuestas/",
+                             {"pregunta_id": p["id_pregunta"], "opcion_id": correcta.pk}, format="json")
+                self.assertEqual(r.status_code, 200, r.data)
+
+            r = api.post(f"/api/analisis/intentos/{intento['id_intento']}/finalizar/", {}, format="json")
+            self.assertEqual(r.status_code, 200, r.data)
+            self.assertEqual(Decimal(r.data["intento"]["calificacion_final"]), Decimal("12.00"))
+            self.assertEqual(Decimal(r.data["intento"]["puntaje_total"]), Decimal("12.00"))
+
+        # recalificar con la misma clave usa las mismas ponderaciones: no cambia nada
+        resumen = recalificar_examen(self.examen.id_examen)
+        self.assertEqual(resumen["intentos_cambiados"], 0)
+        self.assertEqual(
+            set(IntentoExamen.objects.values_list("calificacion_final", "puntaje_total")),
+            {(Decimal("12.00"), Decimal("12.00"))},
+        )
+
+    def test_horario_ajeno_no_cambia_la_variante(self):
+        propio, ajeno = self.horarios
+        self.assertNotEqual(propio.variante_id, ajeno.variante_id)
+        estudiante_id = self.estudiantes[0].id_usuario
+        v = variante_asignada(self.examen.id_examen, estudiante_id, ajeno.id_horario)
+        self.assertEqual(v.id_variante, propio.variante_id)
+
+        # inscrito en ambos: el horario indicado decide
+        Horario.objects.filter(pk=ajeno.pk).update(estudiantes_ids=[estudiante_id])
+        v = variante_asignada(self.examen.id_examen, estudiante_id, ajeno.id_horario)
+        self.assertEqual(v.id_variante, ajeno.variante_id)
+
+    def test_escalar_ponderaciones_suma_exacta(self):
+        pesos = escalar_ponderaciones([Decimal("1"), Decimal("1"), Decimal("1")], Decimal("10.00"))
+        self.assertEqual(sum(pesos), Decimal("10.00"))
+        self.assertEqual(sorted(pesos), [Decimal("3.33"), Decimal("3.33"), Decimal("3.34")])
+        self.assertEqual(escalar_ponderaciones([Decimal("0"), Decimal("0")], Decimal("5")), [Decimal("2.50")] * 2)
+
+
+# =========================================================
+# Banco de preguntas (MinHash + LSH por materia)
+# =========================================================
+def pregunta_payload(enunciado, ponderacion=1):
+    return {
+        "tipo": "OPCION_MULTIPLE", "enunciado": enunciado, "ponderacion": ponderacion,
+        "opciones": [
+            {"clave": "A", "texto": "Sí", "es_correcta": True, "orden": 0},
+            {"clave": "B", "texto": "No", "es_correcta": False, "orden": 1},
+        ],
+    }
+
+
+ENUNCIADO_BANCO = "¿Cuál es la derivada de la función seno respecto de x en el intervalo real?"
+
+
+class BancoPreguntasTests(TestCase):
+    def setUp(self):
+        banco._indices.clear()
+        self.addCleanup(banco._indices.clear)
+        self.docente = Usuario.objects.create_user(
+            correo_electronico="docente@test.com", cedula="0102030405", password="x",
+            nombres="Doc", apellidos="Ente", rol="DOCENTE",
+        )
+        self.materia = Materia.objects.create(nombre="Cálculo")
+        self.examenes = [
+            Examen.objects.create(
+                titulo=f"Parcial {i}", materia=self.materia,
+                docente_id=self.docente.id_usuario, docente_nombre="Doc Ente",
+            )
+            for i in range(2)
+        ]
+        self.api = APIClient()
+        self.api.force_authenticate(self.docente)
+
+    def _crear(self, examen, enunciado):
+        return self.api.post(f"/api/examenes/{examen.id_examen}/preguntas/", pregunta_payload(enunciado), format="json")
+
+    def test_firma_ignora_tildes_y_signos(self):
+        a = banco.firma_minhash(ENUNCIADO_BANCO)
+        b = banco.firma_minhash("cual es la derivada de la funcion seno respecto de x en el intervalo real")
+        c = banco.firma_minhash("Enumere tres causas de la Revolución Francesa y explique su impacto.")
+        self.assertEqual((a == b).mean(), 1.0)
+        self.assertLess((a == c).mean(), 0.3)
+
+    def test_rechaza_casi_duplicado_en_otro_examen_de_la_materia(self):
+        self.assertEqual(self._crear(self.examenes[0], ENUNCIADO_BANCO).status_code, 201)
+
+        r = self._crear(self.examenes[1], ENUNCIADO_BANCO.replace("¿Cuál", "Cual").rstrip("?"))
+        self.assertEqual(r.status_code, 400)
+        self.assertIn("muy similar", str(r.data["enunciado"]))
+
+        # en otra materia el mismo enunciado es válido
+        otro = Examen.objects.create(
+            titulo="Otro", materia=Materia.objects.create(nombre="Física"),
+            docente_id=self.docente.id_usuario, docente_nombre="Doc Ente",
+        )
+        self.assertEqual(self._crear(otro, ENUNCIADO_BANCO).status_code, 201)
+
+    def test_reemplazar_no_choca_con_las_preguntas_del_propio_examen(self):
+        examen = self.examenes[0]
+        self.assertEqual(self._crear(examen, ENUNCIADO_BANCO).status_code, 201)
+        r = self.api.post(
+            f"/api/examenes/{examen.id_examen}/preguntas/bulk/",
+            {"reemplazar": True, "preguntas": [pregunta_payload(ENUNCIADO_BANCO, 5)]}, format="json",
+        )
+        self.assertEqual(r.status_code, 201, r.data)
+        self.assertEqual(examen.preguntas.count(), 1)
+        self.assertIsNotNone(examen.preguntas.get().minhash)
+
+    def test_filtro_repetidas_para_la_generacion_ia(self):
+        self._crear(self.examenes[0], ENUNCIADO_BANCO)
+        es_repetida = banco.filtro_repetidas(self.materia.id_materia)
+        self.assertTrue(es_repetida({"enunciado": ENUNCIADO_BANCO.upper()}))
+        self.assertFalse(es_repetida({"enunciado": "Defina límite lateral y dé un ejemplo con una función a trozos."}))
+        # las del propio examen no cuentan como repetidas al regenerarlo
+        es_repetida = banco.filtro_repetidas(self.materia.id_materia, excluir_examen=self.examenes[0].id_examen)
+        self.assertFalse(es_repetida({"enunciado": ENUNCIADO_BANCO}))
+
+
+# =========================================================
+# Ensamblado desde el banco (flujo máximo por celdas)
+# =========================================================
+TEMAS_BANCO = [
+    ("OPCION_MULTIPLE", "FACIL", "Defina la velocidad media de un móvil en un tramo recto"),
+    ("OPCION_MULTIPLE", "FACIL", "Indique la unidad del Sistema Internacional para la fuerza"),
+    ("OPCION_MULTIPLE", "MEDIA", "Calcule la aceleración de un bloque sobre un plano inclinado sin roce"),
+    ("VERDADERO_FALSO", "MEDIA", "La energía cinética depende del cuadrado de la rapidez del cuerpo"),
+    ("VERDADERO_FALSO", "MEDIA", "Un cuerpo en caída libre no tiene aceleración constante cerca de la Tierra"),
+]
+
+
+def opciones_de(tipo):
+    if tipo == "VERDADERO_FALSO":
+        return pregunta_payload("")["opciones"]
+    return [
+        {"clave": clave, "texto": f"Opción {clave}", "es_correcta": clave == "A", "orden": i}
+        for i, clave in enumerate("ABCD")
+    ]
+
+
+class EnsambladorTests(TestCase):
+    def setUp(self):
+        banco._indices.clear()
+        ensamblador._pools.clear()
+        self.addCleanup(banco._indices.clear)
+        self.addCleanup(ensamblador._pools.clear)
+        self.docente = Usuario.objects.create_user(
+            correo_electronico="docente@test.com", cedula="0102030405", password="x",
+            nombres="Doc", apellidos="Ente", rol="DOCENTE",
+        )
+        materia = Materia.objects.create(nombre="Física I")
+        fuente = Examen.objects.create(
+            titulo="Banco", materia=materia, estado="PUBLICADO",
+            docente_id=self.docente.id_usuario, docente_nombre="Doc Ente",
+        )
+        crear_preguntas_bulk(fuente, [
+            {**pregunta_payload(enunciado), "tipo": tipo, "dificultad": dificultad, "opciones": opciones_de(tipo)}
+            for tipo, dificultad, enunciado in TEMAS_BANCO
+        ])
+        self.examen = Examen.objects.create(
+            titulo="Parcial", materia=materia, docente_id=self.docente.id_usuario, docente_nombre="Doc Ente",
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.docente)
+
+    def _ensamblar(self, blueprint, query=""):
+        return self.api.post(f"/api/examenes/{self.examen.id_examen}/ensamblar/{query}", blueprint, format="json")
+
+    def test_flujo_maximo_no_se_queda_en_la_asignacion_golosa(self):
+        # la fila 0 puede ir a ambas columnas, la fila 1 solo a la 1:
+        # tomar (0, 1) primero dejaría a la fila 1 sin nada
+        asignado = ensamblador._flujo_maximo([1, 1], [1, 1], np.array([[1, 1], [0, 1]]))
+        self.assertEqual(asignado.tolist(), [[1, 0], [0, 1]])
+
+    def test_simular_respeta_tipos_y_dificultades(self):
+        blueprint = {
+            "numero_preguntas": 4, "puntaje_total": 8,
+            "distribucion_tipos": {"OPCION_MULTIPLE": 2, "VERDADERO_FALSO": 2},
+            "distribucion_dificultad": {"FACIL": 1, "MEDIA": 3},
+        }
+        r = self._ensamblar(blueprint, "?simular=true")
+        self.assertEqual(r.status_code, 200, r.data)
+        self.assertEqual(r.data["del_banco"], 4)
+        self.assertEqual(r.data["faltantes"], {})
+
+        elegidas = Pregunta.objects.filter(id_pregunta__in=r.data["preguntas"])
+        self.assertEqual(elegidas.filter(dificultad="FACIL").count(), 1)
+        self.assertEqual(elegidas.filter(tipo="VERDADERO_FALSO").count(), 2)
+        self.assertFalse(self.examen.preguntas.exists())
+
+    def test_sin_faltantes_guarda_sin_llm(self):
+        r = self._ensamblar({
+            "numero_preguntas": 3, "puntaje_total": 9,
+            "distribucion_tipos": {"OPCION_MULTIPLE": 3},
+        })
+        self.assertEqual(r.status_code, 200, r.data)
+        self.examen.refresh_from_db()
+        self.assertEqual(self.examen.origen, "MIXTO")
+        self.assertEqual(self.examen.preguntas.count(), 3)
+        self.assertEqual(self.examen.puntaje_total, Decimal("9.00"))
+
+    def test_banco_insuficiente_sin_llm_es_409(self):
+        r = self._ensamblar({
+            "numero_preguntas": 5, "permitir_llm": False,
+            "distribucion_tipos": {"VERDADERO_FALSO": 5},
+        })
+        self.assertEqual(r.status_code, 409)
+        self.assertEqual(r.data["del_banco"], 2)
+        self.assertEqual(r.data["faltantes"], {"VERDADERO_FALSO": 3})
+
+
+# =========================================================
+# Throttles token bucket (backend/throttling.py)
+# =========================================================
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class TokenBucketLocalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_rafaga_y_recarga(self):
+        with mock.patch.object(throttling.time, "time", return_value=1000.0) as reloj:
+            permitidos = [throttling.consumir("throttle:t:1", 3, 0.5)[0] for _ in range(4)]
+            self.assertEqual(permitidos, [True, True, True, False])
+            self.assertAlmostEqual(throttling.consumir("throttle:t:1", 3, 0.5)[1], 2.0)
+
+            reloj.return_value = 1002.0  # 2 s a 0.5 tokens/s: un token
+            self.assertTrue(throttling.consumir("throttle:t:1", 3, 0.5)[0])
+            self.assertFalse(throttling.consumir("throttle:t:1", 3, 0.5)[0])
+
+    def test_buckets_por_usuario_o_ip(self):
+        factory = RequestFactory()
+        usuario = Usuario(id_usuario=4)
+        con_usuario = factory.post("/", REMOTE_ADDR="10.0.0.1")
+        con_usuario.user = usuario
+        anonima = factory.post("/", REMOTE_ADDR="10.0.0.1")
+
+        self.assertEqual(throttling.EventosThrottle().get_identidad(con_usuario), "u4")
+        self.assertEqual(throttling.EventosThrottle().get_identidad(anonima), "ip10.0.0.1")
+        self.assertEqual(throttling.LoginThrottle().get_identidad(con_usuario), "ip10.0.0.1")
+
+    @override_settings(THROTTLE_RAFAGA={"eventos": 2})
+    def test_throttle_usa_la_rafaga_configurada(self):
+        request = RequestFactory().post("/", REMOTE_ADDR="10.0.0.2")
+        throttle = throttling.EventosThrottle()
+        resultados = [throttle.allow_request(request, None) for _ in range(3)]
+        self.assertEqual(resultados, [True, True, False])
+        self.assertGreater(throttle.wait(), 0)
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis no instalado")
+@override_settings(CACHES=CACHE_FAKEREDIS)
+class TokenBucketRedisTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_con_redis_usa_el_script(self):
+        self.assertIsNotNone(throttling._script_redis())
+
+    @unittest.skipIf(lupa is None, "lupa no instalado: fakeredis no ejecuta Lua")
+    def test_script_lua_limita_la_rafaga(self):
+        permitidos = [throttling.consumir("throttle:t:redis", 2, 0.01)[0] for _ in range(3)]
+        self.assertEqual(permitidos, [True, True, False])
+
+
+@override_settings(CACHES=CACHE_REDIS_CAIDO)
+class TokenBucketFallaAbiertaTests(TestCase):
+    def test_redis_caido_deja_pasar(self):
+        self.assertEqual(throttling.consumir("throttle:t:caido", 1, 0.01), (True, 0.0))
@@ -12,8 +12,15 @@ from .views import (
     CrearExamenView,
     DetalleExamenView,
     PreguntasExamenView,
+    PreguntasBulkView,
     DetallePreguntaView,
     GenerarExamenIAView,
+    EstadoGeneracionIAView,
+    EnsamblarExamenView,
+    VariantesExamenView,
+    MetricasLLMView,
+    ExportarExamenView,
+    ImportarExamenView,
 )
 
 app_name = "examenes"
@@ -31,10 +38,23 @@ urlpatterns = [
     path("crear/", CrearExamenView.as_view(), name="crear"),
     path("<int:id>/", DetalleExamenView.as_view(), name="detalle"),
 
+    # importar / exportar
+    path("<int:examen_id>/exportar/", ExportarExamenView.as_view(), name="exportar"),
+    path("<int:examen_id>/importar/", ImportarExamenView.as_view(), name="importar"),
+
     # preguntas
     path("<int:examen_id>/preguntas/", PreguntasExamenView.as_view(), name="preguntas"),
+    path("<int:examen_id>/preguntas/bulk/", PreguntasBulkView.as_view(), name="preguntas_bulk"),
     path("<int:examen_id>/preguntas/<int:pregunta_id>/", DetallePreguntaView.as_view(), name="pregunta_detalle"),
 
     # ia
     path("<int:examen_id>/generar-ia/", GenerarExamenIAView.as_view(), name="generar_ia"),
+    path("<int:examen_id>/generar-ia/estado/", EstadoGeneracionIAView.as_view(), name="generar_ia_estado"),
+    path("ia/metricas/", MetricasLLMView.as_view(), name="metricas_llm"),
+
+    # banco de preguntas
+    path("<int:examen_id>/ensamblar/", EnsamblarExamenView.as_view(), name="ensamblar"),
+
+    # variantes por grupo
+    path("<int:examen_id>/variantes/", VariantesExamenView.as_view(), name="variantes"),
 ]
@@ -0,0 +1,215 @@
+# ============================================
+# Aplicaciones/examenes/variantes.py
+# ============================================
+# K variantes paralelas de un mismo examen (una por grupo/Horario).
+#
+# - Todas las variantes salen del pool de preguntas del propio examen: una
+#   variante es solo una lista ordenada de id_pregunta (permutación si usa
+#   todas, subconjunto si preguntas_por_variante < total).
+# - Dificultad equivalente: cada variante toma EXACTAMENTE la misma
+#   cantidad de preguntas de cada celda (tipo, dificultad), proporcional a
+#   lo que hay en el examen.
+# - Las K variantes se calculan juntas con numpy (una matriz K x n) y se
+#   guardan con un bulk_create; los horarios se reparten con bulk_update.
+# - Misma escala: VarianteExamen.puntaje_total es el del examen y las
+#   ponderaciones de sus preguntas se reescalan a ese total
+#   (ponderaciones_variante), así un subconjunto vale lo mismo que el pool.
+# ============================================
+import hashlib
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+import numpy as np
+from django.db import transaction
+
+from backend.cache import cacheado
+
+from .models import Examen, Horario, Pregunta, VarianteExamen
+
+CENTIMO = Decimal("0.01")
+
+
+def _cuotas(tamanos: List[int], n: int) -> List[int]:
+    """Reparte n entre las celdas en proporción a su tamaño (mayor resto)."""
+    total = sum(tamanos)
+    exactas = [t * n / total for t in tamanos]
+    cuotas = [int(e) for e in exactas]
+    restos = sorted(range(len(tamanos)), key=lambda i: exactas[i] - cuotas[i], reverse=True)
+    for i in restos[: n - sum(cuotas)]:
+        cuotas[i] += 1
+    return cuotas
+
+
+def escalar_ponderaciones(ponderaciones: List[Decimal], total: Decimal) -> List[Decimal]:
+    """
+    Reescala las ponderaciones para que sumen exactamente `total`
+    (reparto en centésimas por mayor resto; sin pesos, partes iguales).
+    """
+    if not ponderaciones:
+        return []
+    pesos = [Decimal(p) for p in ponderaciones]
+    if sum(pesos) <= 0:
+        pesos = [Decimal(1)] * len(pesos)
+    centesimas = int((Decimal(total) / CENTIMO).to_integral_value())
+    return [(Decimal(c) * CENTIMO).quantize(CENTIMO) for c in _cuotas(pesos, centesimas)]
+
+
+def calcular_variantes(
+    ids: np.ndarray,
+    celdas: np.ndarray,
+    k: int,
+    n: int,
+    rng: np.random.Generator,
+) -> np.ndarray:
+    """
+    Matriz K x n de posiciones en `ids`: fila = variante, ya barajada.
+    `celdas` es la celda (tipo, dificultad) de cada pregunta como entero.
+    """
+    unicas, inversa = np.unique(celdas, return_inverse=True)
+    grupos = [np.flatnonzero(inversa == c) for c in range(len(unicas))]
+    cuotas = _cuotas([len(g) for g in grupos], n)
+
+    bloques = []
+    for pos, c in zip(grupos, cuotas):
+        if c:
+            # K muestreos sin reemplazo de una vez: orden aleatorio por fila
+            orden = np.argsort(rng.random((k, len(pos))), axis=1)[:, :c]
+            bloques.append(pos[orden])
+    elegidas = np.concatenate(bloques, axis=1)
+
+    barajado = np.argsort(rng.random(elegidas.shape), axis=1)
+    return np.take_along_axis(elegidas, barajado, axis=1)
+
+
+@transaction.atomic
+def generar_variantes(
+    examen: Examen,
+    k: int,
+    preguntas_por_variante: Optional[int] = None,
+    semilla: Optional[int] = None,
+    asignar_horarios: bool = True,
+) -> List[VarianteExamen]:
+    """
+    Reemplaza las variantes del examen por K nuevas y, si se pide, asigna
+    una a cada horario activo en orden (fecha, hora) de forma circular.
+    """
+    filas = list(
+        Pregunta.objects.filter(examen=examen)
+        .order_by("orden", "id_pregunta")
+        .values_list("id_pregunta", "tipo", "dificultad", "ponderacion")
+    )
+    if not filas:
+        raise ValueError("El examen no tiene preguntas.")
+
+    total = len(filas)
+    n = total if preguntas_por_variante is None else int(preguntas_por_variante)
+    if k < 1:
+        raise ValueError("k debe ser mayor o igual a 1.")
+    if not 1 <= n <= total:
+        raise ValueError(f"preguntas_por_variante debe estar entre 1 y {total}.")
+
+    if semilla is None:
+        semilla = int(np.random.SeedSequence().entropy % (2 ** 63))
+    rng = np.random.default_rng(semilla)
+
+    ids = np.array([f[0] for f in filas], dtype=np.int64)
+    claves = {}
+    celdas = np.array([claves.setdefault((f[1], f[2]), len(claves)) for f in filas], dtype=np.int64)
+    # todas las variantes valen lo que el examen (o la suma del pool si no tiene total)
+    total_examen = Decimal(examen.puntaje_total or 0) or sum((Decimal(f[3]) for f in filas), Decimal("0.00"))
+
+    matriz = calcular_variantes(ids, celdas, k, n, rng)
+
+    VarianteExamen.objects.filter(examen=examen).delete()
+    variantes = VarianteExamen.objects.bulk_create([
+        VarianteExamen(
+            examen=examen,
+            numero=i + 1,
+            preguntas=ids[fila].tolist(),
+            puntaje_total=Decimal(total_examen).quantize(CENTIMO),
+            semilla=semilla,
+        )
+        for i, fila in enumerate(matriz)
+    ])
+
+    if asignar_horarios:
+        horarios = list(
+            Horario.objects.filter(examen=examen, activo=True).order_by("fecha", "hora_inicio", "id_horario")
+        )
+        for i, h in enumerate(horarios):
+            h.variante = variantes[i % k]
+        Horario.objects.bulk_update(horarios, ["variante"])
+
+    return variantes
+
+
+def _numero_por_estudiante(examen_id: int, estudiante_id: int, k: int) -> int:
+    # estable entre procesos (hash() de Python cambia por proceso)
+    h = hashlib.sha256(f"{examen_id}:{estudiante_id}".encode("utf-8")).digest()
+    return int.from_bytes(h[:8], "big") % k + 1
+
+
+def variante_asignada(
+    examen_id: int,
+    estudiante_id: Optional[int] = None,
+    horario_id: Optional[int] = None,
+) -> Optional[VarianteExamen]:
+    """
+    Variante que le toca al estudiante:
+    1) la del horario indicado, solo si el estudiante está inscrito en él,
+    2) la del horario donde está inscrito (estudiantes_ids),
+    3) una fija por estudiante (hash de examen + estudiante).
+    None si el examen no tiene variantes (o no se indica estudiante).
+    """
+    variantes: Dict[int, VarianteExamen] = {
+        v.numero: v for v in VarianteExamen.objects.filter(examen_id=examen_id)
+    }
+    if not variantes:
+        return None
+    por_id = {v.id_variante: v for v in variantes.values()}
+
+    if estudiante_id is None:
+        return None
+
+    # el horario_id viene del cliente: solo cuenta entre los horarios del estudiante
+    inscrito = []
+    for hid, vid, inscritos in Horario.objects.filter(examen_id=examen_id, variante__isnull=False).values_list(
+        "id_horario", "variante_id", "estudiantes_ids"
+    ):
+        if vid in por_id and int(estudiante_id) in {int(x) for x in (inscritos or [])}:
+            inscrito.append((hid, vid))
+    for hid, vid in inscrito:
+        if horario_id is not None and hid == int(horario_id):
+            return por_id[vid]
+    if inscrito:
+        return por_id[inscrito[0][1]]
+
+    return variantes.get(_numero_por_estudiante(examen_id, int(estudiante_id), len(variantes)))
+
+
+def preguntas_de_variante(variante: VarianteExamen):
+    """Preguntas vigentes de la variante, en el orden de la variante."""
+    orden = {pid: i for i, pid in enumerate(variante.preguntas)}
+    preguntas = Pregunta.objects.filter(id_pregunta__in=variante.preguntas).prefetch_related("opciones")
+    return sorted(preguntas, key=lambda p: orden[p.id_pregunta])
+
+
+def escalar_variante(preguntas: List[int], ponderaciones: Dict[int, Decimal], total: Decimal) -> Dict[int, Decimal]:
+    """{id_pregunta: ponderación reescalada} de las preguntas vigentes de la variante."""
+    vigentes = [pid for pid in preguntas if pid in ponderaciones]
+    return dict(zip(vigentes, escalar_ponderaciones([ponderaciones[p] for p in vigentes], total)))
+
+
+@cacheado(
+    "examen:ponderaciones_variante",
+    modelos=[lambda examen_id, variante_id: ("examenes.Examen", examen_id)],
+)
+def ponderaciones_variante(examen_id: int, variante_id: int) -> Dict[int, Decimal]:
+    """Ponderaciones de la variante sobre su puntaje_total; {} si ya no existe."""
+    variante = VarianteExamen.objects.filter(id_variante=variante_id, examen_id=examen_id).first()
+    if variante is None:
+        return {}
+    ponderaciones = dict(
+        Pregunta.objects.filter(id_pregunta__in=variante.preguntas).values_list("id_pregunta", "ponderacion")
+    )
+    return escalar_variante(variante.preguntas, ponderaciones, variante.puntaje_total)
@@ -2,17 +2,41 @@
 # Aplicaciones/examenes/views.py
 # (COMPLETO y listo para usar)
 # ============================================
+from datetime import timedelta
+from decimal import Decimal
+
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied, ValidationError
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-
-from .models import Materia, Examen, Pregunta
-from .serializers import MateriaSerializer, ExamenSerializer, PreguntaSerializer
-
-from .ia_generation import generate_and_persist_exam
+from django.conf import settings
+from django.db.models import Count, Prefetch
+from django.utils import timezone
+from rest_framework.parsers import MultiPartParser
+
+from .models import Materia, Examen, Pregunta, VarianteExamen
+from .serializers import (
+    MateriaSerializer,
+    ExamenSerializer,
+    ExamenResumenSerializer,
+    PreguntaSerializer,
+    VarianteExamenSerializer,
+    campos_expandidos,
+)
+
+from .jobs import encolar_generacion, liberar_generaciones_atascadas, marcar_generando
+from .services import crear_preguntas_bulk
+from .intercambio import iter_jsonl, exportar_zip, importar_examen
+from .ensamblador import ensamblar_desde_banco
+from .ia_generation import armar_con_banco, construir_parametros, persist_exam_from_payload
+from .variantes import generar_variantes, ponderaciones_variante, preguntas_de_variante, variante_asignada
+from .llm_metricas import estadisticas
+from Aplicaciones.analisis.models import IntentoExamen
+from backend.cache import cache_vista, cacheado
+from backend.paginacion import PaginacionCursor
 
 
 def is_admin(user):
@@ -45,6 +69,87 @@ def can_manage_exam(user, examen: Examen):
     return False
 
 
+def _contexto_preguntas(request) -> dict:
+    # el estudiante nunca recibe es_correcta / respuesta_texto / explicacion
+    return {"request": request, "ocultar_respuestas": is_estudiante(request.user)}
+
+
+def _examenes_listado(qs, request):
+    """
+    Queryset para ExamenResumenSerializer: conteo de preguntas anotado y
+    preguntas + opciones (2 consultas en total) solo con ?expand=preguntas.
+    """
+    qs = qs.select_related("materia").annotate(total_preguntas=Count("preguntas"))
+    if "preguntas" in campos_expandidos(request):
+        qs = qs.prefetch_related(
+            Prefetch("preguntas", queryset=Pregunta.objects.order_by("orden").prefetch_related("opciones"))
+        )
+    return qs
+
+
+def _variante_estudiante(request, examen_id: int):
+    """
+    Variante que ve el estudiante: la de su intento abierto (la que se
+    califica) o, si aún no empezó, la que le toca (?horario_id= opcional).
+    """
+    user_id = _user_id(request.user)
+    variante_id = (
+        IntentoExamen.objects.filter(
+            examen_id=examen_id, estudiante_id=user_id,
+            estado__in=["INICIADO", "EN_PROGRESO"], variante_id__isnull=False,
+        )
+        .order_by("-fecha_inicio")
+        .values_list("variante_id", flat=True)
+        .first()
+    )
+    if variante_id is not None:
+        variante = VarianteExamen.objects.filter(id_variante=variante_id).first()
+        if variante is not None:
+            return variante
+
+    horario_id = request.query_params.get("horario_id")
+    return variante_asignada(examen_id, user_id, _parse_int("horario_id", horario_id) if horario_id else None)
+
+
+def _serializar_variante(variante: VarianteExamen, context: dict):
+    preguntas = preguntas_de_variante(variante)
+    context = {**context, "ponderaciones": ponderaciones_variante(variante.examen_id, variante.id_variante)}
+    return PreguntaSerializer(preguntas, many=True, context=context).data
+
+
+@cacheado(
+    "examen:snapshot",
+    modelos=[
+        "examenes.Materia",
+        lambda examen_id, ocultar_respuestas, variante_id=None: ("examenes.Examen", examen_id),
+    ],
+)
+def snapshot_examen(examen_id: int, ocultar_respuestas: bool, variante_id=None):
+    """
+    ExamenSerializer completo (preguntas + opciones) o None si no existe.
+    Con variante_id, solo las preguntas de esa variante, en su orden.
+    """
+    variante = VarianteExamen.objects.filter(id_variante=variante_id, examen_id=examen_id).first() if variante_id else None
+    # con variante las preguntas salen de preguntas_de_variante: no se carga el pool
+    preguntas = Pregunta.objects.none() if variante else Pregunta.objects.prefetch_related("opciones")
+    examen = (
+        Examen.objects.select_related("materia")
+        .prefetch_related(Prefetch("preguntas", queryset=preguntas))
+        .filter(id_examen=examen_id)
+        .first()
+    )
+    if examen is None:
+        return None
+    data = ExamenSerializer(examen, context={"ocultar_respuestas": ocultar_respuestas}).data
+    if variante is None:
+        return data
+
+    data["preguntas"] = _serializar_variante(variante, {"ocultar_respuestas": ocultar_respuestas})
+    data["puntaje_total"] = str(Decimal(variante.puntaje_total).quantize(Decimal("0.01")))
+    data["variante"] = variante.numero
+    return data
+
+
 def _parse_int(param_name: str, value: str):
     try:
         return int(value)
@@ -58,6 +163,7 @@ def _parse_int(param_name: str, value: str):
 class MateriasView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cache_vista("examenes:materias", modelos=["examenes.Materia"], variar_por=())
     def get(self, request):
         qs = Materia.objects.all().order_by("nombre")
         serializer = MateriaSerializer(qs, many=True)
@@ -75,33 +181,45 @@ class MateriasView(APIView):
 
 
 class MateriasConExamenesView(APIView):
+    """
+    Materias activas con sus exámenes (resumen). Dos consultas en total
+    (materias + exámenes anotados) agrupadas en Python; la respuesta se
+    cachea por rol y query string (EXAMENES_LISTADO_CACHE_TTL) hasta que
+    cambie una materia, un examen o una pregunta.
+    """
     permission_classes = [IsAuthenticated]
 
+    @cache_vista(
+        "examenes:materias_con_examenes",
+        ttl=getattr(settings, "EXAMENES_LISTADO_CACHE_TTL", 60),
+        modelos=["examenes.Materia", "examenes.Examen", "examenes.Pregunta"],
+    )
     def get(self, request):
-        materias = Materia.objects.filter(activo=True).order_by("nombre")
-
-        resultado = []
-        for materia in materias:
-            examenes = (
-                Examen.objects.select_related("materia")
-                .filter(materia=materia)
-                .order_by("-id_examen")
-            )
+        estudiante = is_estudiante(request.user)
+        materias = list(Materia.objects.filter(activo=True).order_by("nombre").values("id_materia", "nombre"))
 
-            # IMPORTANTE: estudiante solo ve ACTIVO
-            if is_estudiante(request.user):
-                examenes = examenes.filter(estado="ACTIVO")
+        examenes = Examen.objects.filter(materia__activo=True).order_by("-id_examen")
+        # IMPORTANTE: estudiante solo ve ACTIVO
+        if estudiante:
+            examenes = examenes.filter(estado="ACTIVO")
 
-            resultado.append(
-                {
-                    "id_materia": materia.id_materia,
-                    "nombre": materia.nombre,
-                    "examenes": ExamenSerializer(examenes, many=True).data,
-                }
-            )
+        filas = list(_examenes_listado(examenes, request))
+        data = ExamenResumenSerializer(filas, many=True, context=_contexto_preguntas(request)).data
+        por_materia = {}
+        for examen, item in zip(filas, data):
+            por_materia.setdefault(examen.materia_id, []).append(item)
 
+        resultado = [
+            {
+                "id_materia": m["id_materia"],
+                "nombre": m["nombre"],
+                "examenes": por_materia.get(m["id_materia"], []),
+            }
+            for m in materias
+        ]
         return Response(resultado)
 
+
 class ExamenesPorMateriaView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -126,12 +244,13 @@ class ExamenesPorMateriaView(APIView):
                 raise PermissionDenied("No tienes permiso para ver exámenes no habilitados.")
             examenes = examenes.filter(estado=estado)
 
-        serializer = ExamenSerializer(examenes, many=True)
+        examenes = _examenes_listado(examenes, request)
+        data = ExamenResumenSerializer(examenes, many=True, context=_contexto_preguntas(request)).data
         return Response(
             {
                 "materia": MateriaSerializer(materia).data,
-                "total": examenes.count(),
-                "examenes": serializer.data,
+                "total": len(data),
+                "examenes": data,
             }
         )
 class DetalleMateriaView(APIView):
@@ -159,7 +278,7 @@ class ListaExamenesView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        examenes = Examen.objects.select_related("materia").all()
+        examenes = Examen.objects.all()
 
         # filtrar por materia
         materia_id = request.query_params.get("materia_id")
@@ -179,10 +298,10 @@ class ListaExamenesView(APIView):
                 raise PermissionDenied("No tienes permiso para ver exámenes no habilitados.")
             examenes = examenes.filter(estado=estado)
 
-        examenes = examenes.order_by("-id_examen")
-
-        serializer = ExamenSerializer(examenes, many=True)
-        return Response({"total": examenes.count(), "examenes": serializer.data})
+        return PaginacionCursor(("-id_examen",)).responder(
+            request, _examenes_listado(examenes, request), ExamenResumenSerializer, "examenes",
+            context=_contexto_preguntas(request),
+        )
 
 
 class CrearExamenView(APIView):
@@ -208,14 +327,20 @@ class DetalleExamenView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, id):
-        examen = get_object_or_404(Examen, id_examen=id)
+        # con variantes, el estudiante solo recibe las preguntas de la suya
+        if is_estudiante(request.user):
+            variante = _variante_estudiante(request, id)
+            data = snapshot_examen(id, True, variante.id_variante if variante else None)
+        else:
+            data = snapshot_examen(id, False)
+        if data is None:
+            raise Http404
 
         # estudiante no ve exámenes no activos
-        if is_estudiante(request.user) and examen.estado != "ACTIVO":
+        if is_estudiante(request.user) and data["estado"] != "ACTIVO":
             raise PermissionDenied("Este examen aún no está habilitado.")
 
-        serializer = ExamenSerializer(examen)
-        return Response(serializer.data)
+        return Response(data)
 
     def put(self, request, id):
         examen = get_object_or_404(Examen, id_examen=id)
@@ -252,9 +377,21 @@ class PreguntasExamenView(APIView):
         if is_estudiante(request.user) and examen.estado != "ACTIVO":
             raise PermissionDenied("Este examen aún no está habilitado.")
 
-        preguntas = Pregunta.objects.filter(examen=examen).order_by("orden")
-        serializer = PreguntaSerializer(preguntas, many=True)
-        return Response({"total": preguntas.count(), "preguntas": serializer.data})
+        # con variantes: el estudiante ve solo la suya; el docente puede pedir ?variante=N
+        variante = None
+        if is_estudiante(request.user):
+            variante = _variante_estudiante(request, examen.id_examen)
+        elif request.query_params.get("variante"):
+            numero = _parse_int("variante", request.query_params.get("variante"))
+            variante = get_object_or_404(VarianteExamen, examen=examen, numero=numero)
+
+        if variante is not None:
+            preguntas = _serializar_variante(variante, _contexto_preguntas(request))
+            return Response({"total": len(preguntas), "variante": variante.numero, "preguntas": preguntas})
+
+        preguntas = Pregunta.objects.filter(examen=examen).order_by("orden").prefetch_related("opciones")
+        serializer = PreguntaSerializer(preguntas, many=True, context=_contexto_preguntas(request))
+        return Response({"total": len(serializer.data), "preguntas": serializer.data})
 
     def post(self, request, examen_id):
         examen = get_object_or_404(Examen, id_examen=examen_id)
@@ -262,7 +399,7 @@ class PreguntasExamenView(APIView):
         if not can_manage_exam(request.user, examen):
             raise PermissionDenied("No tienes permiso para agregar preguntas a este examen.")
 
-        serializer = PreguntaSerializer(data=request.data)
+        serializer = PreguntaSerializer(data=request.data, context={"examen": examen})
         if serializer.is_valid():
             pregunta = serializer.save(examen=examen)
             return Response(PreguntaSerializer(pregunta).data, status=status.HTTP_201_CREATED)
@@ -270,6 +407,89 @@ class PreguntasExamenView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class PreguntasBulkView(APIView):
+    """
+    Carga masiva de preguntas ya redactadas (mismo formato que PreguntasExamenView,
+    pero una lista completa en un solo POST):
+    { "reemplazar": false, "preguntas": [ {...}, {...} ] }
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, examen_id):
+        examen = get_object_or_404(Examen, id_examen=examen_id)
+
+        if not can_manage_exam(request.user, examen):
+            raise PermissionDenied("No tienes permiso para agregar preguntas a este examen.")
+
+        preguntas = request.data.get("preguntas")
+        if not isinstance(preguntas, list) or not preguntas:
+            raise ValidationError({"preguntas": "Debe ser una lista no vacía."})
+
+        # "false" de un form/multipart no debe borrar las preguntas
+        reemplazar = str(request.data.get("reemplazar", "")).lower() in ("1", "true")
+        serializer = PreguntaSerializer(
+            data=preguntas, many=True, context={"examen": examen, "reemplazar": reemplazar}
+        )
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        creadas = crear_preguntas_bulk(examen, serializer.validated_data, reemplazar=reemplazar)
+        return Response(
+            {"creadas": len(creadas), "puntaje_total": examen.puntaje_total},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class ExportarExamenView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, examen_id):
+        """
+        ?formato=jsonl (por defecto, en streaming) | zip
+        Incluye la clave de respuestas: solo para quien gestiona el examen.
+        """
+        examen = get_object_or_404(Examen.objects.select_related("materia"), id_examen=examen_id)
+
+        if not can_manage_exam(request.user, examen):
+            raise PermissionDenied("No tienes permiso para exportar este examen.")
+
+        formato = request.query_params.get("formato", "jsonl")
+        nombre = f"examen_{examen.id_examen}"
+
+        if formato == "zip":
+            return FileResponse(exportar_zip(examen), as_attachment=True, filename=f"{nombre}.zip")
+        if formato != "jsonl":
+            raise ValidationError({"formato": "Use 'jsonl' o 'zip'."})
+
+        response = StreamingHttpResponse(iter_jsonl(examen), content_type="application/x-ndjson")
+        response["Content-Disposition"] = f'attachment; filename="{nombre}.jsonl"'
+        return response
+
+
+class ImportarExamenView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request, examen_id):
+        """
+        Importa un examen desde un archivo .jsonl o .zip (campo 'archivo').
+        Restaura los campos del examen desde el encabezado salvo con
+        ?solo_preguntas=1. Reimportar el mismo archivo no duplica preguntas.
+        """
+        examen = get_object_or_404(Examen, id_examen=examen_id)
+
+        if not can_manage_exam(request.user, examen):
+            raise PermissionDenied("No tienes permiso para importar preguntas a este examen.")
+
+        archivo = request.FILES.get("archivo")
+        if not archivo:
+            raise ValidationError({"archivo": "Se requiere un archivo .jsonl o .zip."})
+
+        solo_preguntas = str(request.query_params.get("solo_preguntas", "")).lower() in ("1", "true")
+        resumen = importar_examen(examen, archivo, nombre=archivo.name, restaurar_examen=not solo_preguntas)
+        return Response(resumen, status=status.HTTP_201_CREATED if resumen["creadas"] else status.HTTP_200_OK)
+
+
 class DetallePreguntaView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -307,6 +527,10 @@ class GenerarExamenIAView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, examen_id):
+        """
+        Encola la generación y responde 202 de inmediato.
+        El progreso se consulta en GET <id>/generar-ia/estado/.
+        """
         examen = get_object_or_404(Examen, id_examen=examen_id)
 
         if not can_manage_exam(request.user, examen):
@@ -314,11 +538,183 @@ class GenerarExamenIAView(APIView):
 
         params = request.data or {}
 
+        # Marca GENERANDO de forma atómica: evita dos generaciones simultáneas
+        # (una generación huérfana, más vieja que IA_GENERACION_TIMEOUT, se reclama)
+        token = marcar_generando(examen.id_examen)
+        if token is None:
+            return Response(
+                {"detail": "Ya hay una generación en curso para este examen."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        encolar_generacion(examen.id_examen, dict(params), token)
+        return Response(
+            {"id_examen": examen.id_examen, "estado": "GENERANDO"},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class EstadoGeneracionIAView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, examen_id):
+        examen = get_object_or_404(Examen, id_examen=examen_id)
+
+        if not can_manage_exam(request.user, examen):
+            raise PermissionDenied("No tienes permiso para ver este examen.")
+
+        # si el worker murió, el polling termina en ERROR_GENERACION en vez de esperar para siempre
+        if examen.estado == "GENERANDO" and liberar_generaciones_atascadas(examen.id_examen):
+            examen.refresh_from_db()
+
+        metadata = examen.ia_metadata or {}
+        return Response(
+            {
+                "id_examen": examen.id_examen,
+                "estado": examen.estado,
+                "generando_desde": examen.generando_desde,
+                "terminado": examen.estado != "GENERANDO",
+                "error": metadata.get("error_generacion") if examen.estado == "ERROR_GENERACION" else None,
+                "total_preguntas": examen.preguntas.count() if examen.estado != "GENERANDO" else 0,
+            }
+        )
+
+
+class EnsamblarExamenView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, examen_id):
+        """
+        Arma el examen desde el banco de la materia según el blueprint
+        (mismo formato que generar-ia + distribucion_dificultad opcional).
+
+        - Sin faltantes: se guarda de inmediato, sin LLM (200).
+        - Con faltantes: se encola la generación con usar_banco=true y el
+          LLM solo completa los huecos (202); con permitir_llm=false -> 409.
+        - ?simular=true solo devuelve la selección.
+        """
+        examen = get_object_or_404(Examen.objects.select_related("materia"), id_examen=examen_id)
+
+        if not can_manage_exam(request.user, examen):
+            raise PermissionDenied("No tienes permiso para ensamblar este examen.")
+        if not examen.materia_id:
+            raise ValidationError({"materia": "El examen no tiene materia: no hay banco de preguntas."})
+        if examen.estado == "GENERANDO" and not liberar_generaciones_atascadas(examen.id_examen):
+            return Response(
+                {"detail": "Ya hay una generación en curso para este examen."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        params = dict(request.data or {})
+        semilla = _parse_int("semilla", params["semilla"]) if params.get("semilla") is not None else None
+        blueprint = construir_parametros(examen, params)
+        seleccion, faltantes = ensamblar_desde_banco(
+            examen.materia_id, blueprint, excluir_examen=examen.id_examen, semilla=semilla
+        )
+        resumen = {
+            "id_examen": examen.id_examen,
+            "del_banco": len(seleccion),
+            "faltantes": faltantes,
+            "preguntas": [p["origen_banco"] for p in seleccion],
+        }
+
+        if str(request.query_params.get("simular", "")).lower() in ("1", "true"):
+            return Response(resumen)
+
+        if faltantes:
+            if str(params.get("permitir_llm", "true")).lower() in ("0", "false"):
+                return Response(
+                    {**resumen, "detail": "El banco no alcanza para el blueprint."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            token = marcar_generando(examen.id_examen)
+            if token is None:
+                return Response(
+                    {"detail": "Ya hay una generación en curso para este examen."},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            encolar_generacion(examen.id_examen, {**params, "usar_banco": True}, token)
+            return Response({**resumen, "estado": "GENERANDO"}, status=status.HTTP_202_ACCEPTED)
+
+        payload = armar_con_banco(examen, blueprint, seleccion, usar_cache=False)
+        persist_exam_from_payload(examen, payload, blueprint, origen="MIXTO")
+        examen.refresh_from_db()
+        return Response({**resumen, "estado": examen.estado, "puntaje_total": examen.puntaje_total})
+
+
+class VariantesExamenView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, examen_id):
+        examen = get_object_or_404(Examen, id_examen=examen_id)
+
+        if not can_manage_exam(request.user, examen):
+            raise PermissionDenied("No tienes permiso para ver las variantes de este examen.")
+
+        variantes = VarianteExamen.objects.filter(examen=examen).prefetch_related("horarios")
+        return Response({
+            "total": len(variantes),
+            "variantes": VarianteExamenSerializer(variantes, many=True).data,
+        })
+
+    def post(self, request, examen_id):
+        """
+        Genera K variantes de dificultad equivalente desde las preguntas del
+        examen y las reparte entre sus horarios activos. Reemplaza las
+        anteriores.
+        { "k": 3, "preguntas_por_variante": 20, "semilla": 42, "asignar_horarios": true }
+        """
+        examen = get_object_or_404(Examen, id_examen=examen_id)
+
+        if not can_manage_exam(request.user, examen):
+            raise PermissionDenied("No tienes permiso para generar variantes de este examen.")
+
+        data = request.data or {}
+        k = _parse_int("k", data.get("k"))
+        por_variante = data.get("preguntas_por_variante")
+        semilla = data.get("semilla")
+
+        # los intentos guardan el id de su variante: no se puede reemplazar debajo de ellos
+        if IntentoExamen.objects.filter(examen_id=examen.id_examen, variante_id__isnull=False).exists():
+            return Response(
+                {"detail": "Ya hay intentos rindiendo con las variantes actuales."},
+                status=status.HTTP_409_CONFLICT,
+            )
+
         try:
-            examen = generate_and_persist_exam(examen, params)
-            return Response(ExamenSerializer(examen).data, status=status.HTTP_201_CREATED)
+            generar_variantes(
+                examen,
+                k,
+                preguntas_por_variante=_parse_int("preguntas_por_variante", por_variante) if por_variante is not None else None,
+                semilla=_parse_int("semilla", semilla) if semilla is not None else None,
+                asignar_horarios=str(data.get("asignar_horarios", "true")).lower() not in ("0", "false"),
+            )
+        except ValueError as e:
+            raise ValidationError({"detail": str(e)})
 
-        except ValidationError as e:
-            examen.estado = "ERROR_GENERACION"
-            examen.save(update_fields=["estado"])
-            raise e
+        variantes = VarianteExamen.objects.filter(examen=examen).prefetch_related("horarios")
+        return Response(
+            {"total": len(variantes), "variantes": VarianteExamenSerializer(variantes, many=True).data},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class MetricasLLMView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Estadísticas de las llamadas al LLM por modelo y operación (solo admin).
+        ?dias=7 (0 = todo), ?modelo=..., ?operacion=chat|stream
+        """
+        if not is_admin(request.user):
+            raise PermissionDenied("Solo un administrador puede ver las métricas del LLM.")
+
+        dias = _parse_int("dias", request.query_params.get("dias", 7))
+        desde = timezone.now() - timedelta(days=dias) if dias > 0 else None
+        datos = estadisticas(
+            desde=desde,
+            modelo=request.query_params.get("modelo") or None,
+            operacion=request.query_params.get("operacion") or None,
+        )
+        return Response({"dias": dias, **datos})
@@ -11,6 +11,8 @@ class MonitoreoConfig(AppConfig):
         Carga el modelo MediaPipe en memoria para que
         no se repita la carga en cada petición.
         """
+        from . import signals  # noqa: F401  (invalidación de cache de configuración)
+
         try:
             from .detection_service import _init_model
             _init_model()
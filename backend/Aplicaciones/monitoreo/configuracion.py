@@ -0,0 +1,99 @@
+# ============================================
+# Aplicaciones/monitoreo/configuracion.py
+# ============================================
+# ConfiguracionMonitoreo con cache de lectura (se lee en cada evento y
+# cambia pocas veces por examen):
+#
+#   1) LRU en memoria del proceso (TTL corto: otros procesos no reciben
+#      nuestras señales, así que su copia local caduca sola)
+#   2) cache compartido de Django (Redis en producción), con single-flight
+#   3) BD
+#
+# "Sin configuración" también se cachea, para que los exámenes sin config
+# no vayan a la BD en cada evento. signals.py invalida al guardar/borrar.
+# ============================================
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import ConfiguracionMonitoreo
+from backend.cache import obtener_o_calcular
+
+_SIN_CONFIG = "__sin_config__"
+
+_lru: "OrderedDict[int, tuple]" = OrderedDict()  # examen_id -> (expira, valores | _SIN_CONFIG)
+_lock = threading.Lock()
+
+
+def _clave(examen_id: int) -> str:
+    return f"monitoreo:config:{examen_id}"
+
+
+def _ttl_compartido() -> int:
+    return int(getattr(settings, "MONITOREO_CONFIG_CACHE_TTL", 300))
+
+
+def _ttl_local() -> float:
+    return float(getattr(settings, "MONITOREO_CONFIG_LRU_TTL", 5))
+
+
+def _max_local() -> int:
+    return int(getattr(settings, "MONITOREO_CONFIG_LRU_MAX", 1024))
+
+
+def _leer_local(examen_id: int):
+    with _lock:
+        entrada = _lru.get(examen_id)
+        if entrada is None:
+            return None
+        if entrada[0] < time.monotonic():
+            _lru.pop(examen_id, None)
+            return None
+        _lru.move_to_end(examen_id)
+        return entrada[1]
+
+
+def _guardar_local(examen_id: int, valor) -> None:
+    with _lock:
+        _lru[examen_id] = (time.monotonic() + _ttl_local(), valor)
+        _lru.move_to_end(examen_id)
+        while len(_lru) > _max_local():
+            _lru.popitem(last=False)
+
+
+def _cargar(examen_id: int):
+    valores = ConfiguracionMonitoreo.objects.filter(examen_id=examen_id).values().first()
+    return valores if valores is not None else _SIN_CONFIG
+
+
+def obtener_configuracion(examen_id: Optional[int]) -> Optional[ConfiguracionMonitoreo]:
+    """
+    Configuración del examen o None si no tiene. Devuelve una instancia
+    nueva (no guardada en BD) en cada llamada: se puede leer sin riesgo,
+    pero para modificarla hay que ir por el modelo.
+    """
+    if not examen_id:
+        return None
+    examen_id = int(examen_id)
+
+    valor = _leer_local(examen_id)
+    if valor is None:
+        valor = obtener_o_calcular(_clave(examen_id), lambda: _cargar(examen_id), _ttl_compartido())
+        _guardar_local(examen_id, valor)
+
+    if valor == _SIN_CONFIG:
+        return None
+    return ConfiguracionMonitoreo(**valor)
+
+
+def invalidar_configuracion(examen_id: Optional[int]) -> None:
+    if not examen_id:
+        return
+    examen_id = int(examen_id)
+    with _lock:
+        _lru.pop(examen_id, None)
+    cache.delete(_clave(examen_id))
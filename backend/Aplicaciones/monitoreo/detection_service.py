@@ -59,6 +59,20 @@ YAW_PCT_OK_LOW   = 80.0
 YAW_PCT_OK_HIGH  = 85.0
 YAW_PCT_BAD      = 85.0
 
+# Embedding de identidad: distancias 3D entre puntos estables del rostro
+# (ojos, cejas, nariz, boca, mandíbula). Solo con el rostro casi de frente.
+# sin labios ni comisuras (0, 13, 14, 17, 61, 291): se mueven al hablar y
+# bajaban la similitud del propio estudiante por debajo del umbral.
+# Cambiar la lista cambia DIM_EMBEDDING: correr indexar_rostros --todas.
+EMB_IDX = [10, 152, 234, 454, 33, 133, 362, 263, 70, 105, 107, 300, 334, 336, 168, 6,
+           197, 1, 4, 98, 327, 172, 397, 58, 288, 199]
+_EMB_I, _EMB_J = np.triu_indices(len(EMB_IDX), k=1)
+DIM_EMBEDDING  = len(_EMB_I)
+# frontalidad: posición de la punta de la nariz entre las comisuras
+# externas de los ojos (0.5 = de frente)
+EMB_FRONTAL_MIN = 0.35
+EMB_FRONTAL_MAX = 0.65
+
 _landmarker  = None
 _face_mesh   = None
 _initialized = False
@@ -164,7 +178,51 @@ def _yaw_to_pct(abs_yaw_deg: float) -> float:
     return float(max(0.0, min(100.0, pct)))
 
 
-def analyze_frame(jpeg_bytes: bytes) -> dict:
+def _es_frontal(landmarks):
+    ancho = landmarks[263].x - landmarks[33].x
+    if abs(ancho) < 1e-6:
+        return False
+    r = (landmarks[1].x - landmarks[33].x) / ancho
+    return EMB_FRONTAL_MIN <= r <= EMB_FRONTAL_MAX
+
+
+def _embedding(landmarks, w, h):
+    """
+    float32[DIM_EMBEDDING] con norma 1: log de las distancias entre EMB_IDX,
+    relativas a su media (invariante a escala/posición) y centradas, para
+    comparar con producto punto.
+    """
+    pts = np.array([[landmarks[i].x * w, landmarks[i].y * h, landmarks[i].z * w] for i in EMB_IDX])
+    d = np.linalg.norm(pts[_EMB_I] - pts[_EMB_J], axis=1)
+    if d.mean() <= 1e-6:
+        return None
+    v = np.log(d / d.mean() + 1e-6)
+    v -= v.mean()
+    n = np.linalg.norm(v)
+    return (v / n).astype(np.float32) if n > 1e-9 else None
+
+
+def embedding_rostro(imagen_bytes: bytes):
+    """Embedding del rostro más grande de la imagen, o None (sin rostro / de perfil)."""
+    if not _initialized:
+        _init_model()
+
+    bgr = cv2.imdecode(np.frombuffer(imagen_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if bgr is None:
+        return None
+    h, w = bgr.shape[:2]
+    caras = _get_landmarks(np.ascontiguousarray(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)))
+    if not caras:
+        return None
+    lms = max(caras, key=_face_width_norm)
+    return _embedding(lms, w, h) if _es_frontal(lms) else None
+
+
+def analyze_frame(jpeg_bytes: bytes, con_embedding: bool = False) -> dict:
+    """
+    con_embedding=True agrega "embedding" (np.ndarray o None) con el rostro
+    principal, reutilizando los landmarks ya calculados del frame.
+    """
     if not _initialized:
         _init_model()
 
@@ -216,6 +274,11 @@ def analyze_frame(jpeg_bytes: bytes) -> dict:
     primary_idx = max(range(num_faces), key=lambda i: faces_info[i]["face_width_norm"])
     primary     = faces_info[primary_idx]
 
+    embedding = None
+    lms_primary = all_landmarks[primary_idx]
+    if con_embedding and primary["face_width_norm"] >= MIN_FACE_SCALE and _es_frontal(lms_primary):
+        embedding = _embedding(lms_primary, w, h)
+
     events     = []
     confidence = 1.0
     status     = "✓ Rostro detectado"
@@ -274,7 +337,7 @@ def analyze_frame(jpeg_bytes: bytes) -> dict:
             if "OJOS_CERRADOS" not in events:
                 status = f"✓ Enfocado | Yaw: {yaw_deg:.1f}°"
 
-    return {
+    result = {
         "num_faces":   num_faces,
         "faces":       faces_info,
         "events":      events,
@@ -284,3 +347,6 @@ def analyze_frame(jpeg_bytes: bytes) -> dict:
         "yaw_pct":     round(yaw_pct, 1),
         "severity":    severity,
     }
+    if con_embedding:
+        result["embedding"] = embedding
+    return result
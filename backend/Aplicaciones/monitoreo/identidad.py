@@ -0,0 +1,295 @@
+# ============================================
+# Aplicaciones/monitoreo/identidad.py
+# ============================================
+# Verificación de identidad con embeddings faciales.
+#
+# El embedding sale de los landmarks de MediaPipe que ya usa
+# detection_service (float32[DIM_EMBEDDING], norma 1) y se guarda en
+# FotoPerfil.embedding como bytes. Similitud = producto punto (coseno).
+#
+#   1:1  analizar_frame compara cada MONITOREO_IDENTIDAD_INTERVALO segundos
+#        el rostro del frame con la referencia del estudiante. Un rostro que
+#        no coincide queda registrado en el servidor (RegistroMonitoreo del
+#        intento activo + contador en cache para revisar_identidades); no
+#        genera advertencias: lo revisa el docente.
+#   1:N  IndiceRostros (matriz numpy en memoria) cruza a todos los
+#        estudiantes de un examen: cuentas con el mismo rostro y frames en
+#        vivo que se parecen más a otro estudiante que al propio.
+#
+# Las distancias entre landmarks varían poco entre personas (todas las
+# caras se parecen en geometría): el umbral es alto y se calibra con fotos
+# reales de la institución. Por eso la similitud solo informa al docente:
+# no genera advertencias, la foto de validación no se rechaza salvo
+# MONITOREO_IDENTIDAD_VALIDACION_ESTRICTA, y los duplicados usan un umbral
+# más estricto (MONITOREO_IDENTIDAD_UMBRAL_DUPLICADOS) con tope de pares. Otro modelo de embeddings puede reemplazar
+# ds._embedding; al cambiar la dimensión, los embeddings guardados se
+# ignoran (desde_bytes) hasta correr indexar_rostros --todas.
+# ============================================
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from backend.cache import clave, obtener_o_calcular
+from Aplicaciones.analisis.models import IntentoExamen
+from Aplicaciones.usuarios.models import FotoPerfil
+
+from . import detection_service as ds
+from .models import RegistroMonitoreo
+
+DIM = ds.DIM_EMBEDDING
+
+
+def _umbral() -> float:
+    return float(getattr(settings, "MONITOREO_IDENTIDAD_UMBRAL", 0.985))
+
+
+def embedding_bytes(vec: np.ndarray) -> bytes:
+    return np.asarray(vec, dtype="<f4").tobytes()
+
+
+def desde_bytes(raw) -> Optional[np.ndarray]:
+    """None si no hay embedding o es de otra versión (otra dimensión)."""
+    if not raw:
+        return None
+    vec = np.frombuffer(bytes(raw), dtype="<f4")
+    return vec if vec.shape[0] == DIM else None
+
+
+def embedding_de_archivo(campo) -> Optional[np.ndarray]:
+    """Embedding de un ImageField/UploadedFile; deja el archivo rebobinado."""
+    if not campo:
+        return None
+    campo.open("rb")
+    try:
+        campo.seek(0)
+        datos = campo.read()
+    finally:
+        campo.seek(0)
+    return ds.embedding_rostro(datos)
+
+
+def referencia_de_foto(foto_perfil: FotoPerfil, respaldo: Optional[np.ndarray] = None,
+                       guardar: bool = True) -> Optional[np.ndarray]:
+    """
+    Embedding de referencia: el guardado, o se calcula de `foto` y se
+    persiste. Sin foto de perfil, la referencia es `respaldo` (o la
+    foto_validacion): la primera validación fija el rostro del estudiante.
+    """
+    vec = desde_bytes(foto_perfil.embedding)
+    if vec is not None:
+        return vec
+
+    if foto_perfil.foto:
+        vec = embedding_de_archivo(foto_perfil.foto)
+    else:
+        vec = respaldo if respaldo is not None else embedding_de_archivo(foto_perfil.foto_validacion)
+    if vec is not None and guardar and foto_perfil.pk:
+        foto_perfil.embedding = embedding_bytes(vec)
+        foto_perfil.save(update_fields=["embedding"])
+    return vec
+
+
+def referencia_usuario(usuario_id: int) -> Optional[np.ndarray]:
+    """Referencia desde el cache compartido (versionado por usuario; FotoPerfil lo invalida)."""
+    def _calcular():
+        raw = FotoPerfil.objects.filter(usuario_id=usuario_id).values_list("embedding", flat=True).first()
+        return bytes(raw) if raw else None
+
+    k = clave("rostro_ref", usuario_id, modelos=[("usuarios.Usuario", usuario_id)])
+    return desde_bytes(obtener_o_calcular(k, _calcular))
+
+
+def similitud(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.dot(a, b))
+
+
+def comparar(ref: Optional[np.ndarray], vec: np.ndarray) -> dict:
+    """{"coincide": bool | None, "similitud": float | None}; None sin referencia."""
+    if ref is None:
+        return {"coincide": None, "similitud": None}
+    sim = similitud(ref, vec)
+    return {"coincide": sim >= _umbral(), "similitud": round(sim, 4)}
+
+
+# =========================================================
+# 1:1 durante el examen (analizar_frame)
+# =========================================================
+def _clave_turno(usuario_id: int) -> str:
+    return f"rostro_turno:{usuario_id}"
+
+
+def _clave_vivo(usuario_id: int) -> str:
+    return f"rostro_vivo:{usuario_id}"
+
+
+def _clave_alerta(usuario_id: int) -> str:
+    return f"rostro_alerta:{usuario_id}"
+
+
+def _vivo_ttl() -> int:
+    return int(getattr(settings, "MONITOREO_IDENTIDAD_VIVO_TTL", 900))
+
+
+def toca_verificar(usuario_id: int) -> bool:
+    """True como mucho una vez cada MONITOREO_IDENTIDAD_INTERVALO s por usuario (0 = nunca)."""
+    intervalo = int(getattr(settings, "MONITOREO_IDENTIDAD_INTERVALO", 30))
+    return intervalo > 0 and cache.add(_clave_turno(usuario_id), 1, timeout=intervalo)
+
+
+def liberar_turno(usuario_id: int) -> None:
+    # frame sin rostro útil: reintentar con el siguiente
+    cache.delete(_clave_turno(usuario_id))
+
+
+def verificar_identidad(usuario_id: int, vec: np.ndarray) -> dict:
+    """comparar() contra la referencia del usuario; guarda el embedding en vivo para el 1:N."""
+    cache.set(_clave_vivo(usuario_id), embedding_bytes(vec), timeout=_vivo_ttl())
+    return comparar(referencia_usuario(usuario_id), vec)
+
+
+def registrar_no_coincidencia(usuario_id: int, resultado: dict) -> Optional[RegistroMonitoreo]:
+    """
+    Deja constancia de un 1:1 fallido: contador en cache (lo lee
+    revisar_identidades) y RegistroMonitoreo en el intento activo, si hay.
+    No pasa por procesar_evento_y_reglas: sin advertencias automáticas.
+    """
+    alerta = cache.get(_clave_alerta(usuario_id)) or {"veces": 0}
+    alerta = {
+        "veces": alerta["veces"] + 1,
+        "similitud": resultado.get("similitud"),
+        "ultima": timezone.now().isoformat(),
+    }
+    cache.set(_clave_alerta(usuario_id), alerta, timeout=_vivo_ttl())
+
+    intento_id = (
+        IntentoExamen.objects.filter(estudiante_id=usuario_id, estado__in=["INICIADO", "EN_PROGRESO"])
+        .order_by("-fecha_inicio")
+        .values_list("id_intento", flat=True)
+        .first()
+    )
+    if intento_id is None:
+        return None
+    return RegistroMonitoreo.objects.create(
+        intento_id=intento_id,
+        estudiante_id=usuario_id,
+        tipo_evento="IDENTIDAD_NO_COINCIDE",
+        detalles={"similitud": resultado.get("similitud"), "umbral": _umbral(), "veces": alerta["veces"]},
+    )
+
+
+# =========================================================
+# 1:N por examen
+# =========================================================
+class IndiceRostros:
+    def __init__(self, ids: np.ndarray, matriz: np.ndarray):
+        self.ids = ids
+        self.matriz = matriz  # (n, DIM) float32, filas de norma 1
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def de_usuarios(cls, usuario_ids: Iterable[int]) -> "IndiceRostros":
+        ids, vecs = [], []
+        filas = FotoPerfil.objects.filter(usuario_id__in=list(usuario_ids), embedding__isnull=False)
+        for uid, raw in filas.values_list("usuario_id", "embedding"):
+            vec = desde_bytes(raw)
+            if vec is not None:
+                ids.append(uid)
+                vecs.append(vec)
+        if not ids:
+            return cls(np.empty(0, dtype=np.int64), np.empty((0, DIM), dtype=np.float32))
+        return cls(np.asarray(ids, dtype=np.int64), np.vstack(vecs))
+
+    def buscar(self, consultas: np.ndarray, k: int = 1) -> List[List[Tuple[int, float]]]:
+        """Por cada fila de `consultas`: [(usuario_id, similitud)] top-k, de mayor a menor."""
+        if not len(self) or not len(consultas):
+            return [[] for _ in range(len(consultas))]
+        k = min(k, len(self))
+        sim = consultas @ self.matriz.T  # (m, n) en una sola multiplicación
+        top = np.argpartition(-sim, k - 1, axis=1)[:, :k]
+        salida = []
+        for fila, cols in enumerate(top):
+            cols = cols[np.argsort(-sim[fila, cols])]
+            salida.append([(int(self.ids[c]), float(sim[fila, c])) for c in cols])
+        return salida
+
+    def pares_similares(self, umbral: float, bloque: int = 1024) -> List[Tuple[int, int, float]]:
+        """[(usuario_a, usuario_b, similitud)] con a < b en el índice, por bloques de filas."""
+        pares = []
+        for ini in range(0, len(self), bloque):
+            sim = self.matriz[ini:ini + bloque] @ self.matriz.T
+            filas, cols = np.nonzero(sim >= umbral)
+            for f, c in zip(filas, cols):
+                if ini + f < c:
+                    pares.append((int(self.ids[ini + f]), int(self.ids[c]), float(sim[f, c])))
+        pares.sort(key=lambda p: -p[2])
+        return pares
+
+
+def revisar_identidades(estudiante_ids: Iterable[int], umbral: Optional[float] = None,
+                        umbral_duplicados: Optional[float] = None) -> dict:
+    """
+    Cruce 1:N entre estudiantes (p.ej. los de un examen):
+    - duplicados: dos cuentas con el mismo rostro de referencia
+      (>= umbral_duplicados, los MONITOREO_IDENTIDAD_MAX_DUPLICADOS más parecidos)
+    - suplantaciones: el último frame en vivo de X se parece más a la
+      referencia de otro estudiante Y (>= umbral) que a la propia
+    - no_coinciden: 1:1 fallidos recientes (registrar_no_coincidencia)
+    """
+    umbral = _umbral() if umbral is None else umbral
+    if umbral_duplicados is None:
+        umbral_duplicados = float(getattr(settings, "MONITOREO_IDENTIDAD_UMBRAL_DUPLICADOS", 0.998))
+    estudiante_ids = sorted(set(estudiante_ids))
+    indice = IndiceRostros.de_usuarios(estudiante_ids)
+    con_ref = set(indice.ids.tolist())
+
+    vivos: Dict[int, np.ndarray] = {}
+    claves = {_clave_vivo(u): u for u in estudiante_ids}
+    for k, raw in cache.get_many(list(claves)).items():
+        vec = desde_bytes(raw)
+        if vec is not None:
+            vivos[claves[k]] = vec
+
+    no_coinciden = []
+    claves_alerta = {_clave_alerta(u): u for u in estudiante_ids}
+    for k, alerta in cache.get_many(list(claves_alerta)).items():
+        no_coinciden.append({"estudiante_id": claves_alerta[k], **alerta})
+    no_coinciden.sort(key=lambda a: a["estudiante_id"])
+
+    suplantaciones = []
+    if vivos and len(indice):
+        uids = list(vivos)
+        hits = indice.buscar(np.vstack([vivos[u] for u in uids]), k=2)
+        fila_de = {u: i for i, u in enumerate(indice.ids.tolist())}
+        for uid, top in zip(uids, hits):
+            otro, sim = top[0]
+            propia = similitud(vivos[uid], indice.matriz[fila_de[uid]]) if uid in fila_de else None
+            if otro != uid and sim >= umbral and (propia is None or sim > propia):
+                suplantaciones.append({
+                    "estudiante_id": uid,
+                    "parecido_a": otro,
+                    "similitud": round(sim, 4),
+                    "similitud_propia": None if propia is None else round(propia, 4),
+                })
+
+    pares = indice.pares_similares(umbral_duplicados)
+    max_duplicados = int(getattr(settings, "MONITOREO_IDENTIDAD_MAX_DUPLICADOS", 50))
+
+    return {
+        "umbral": umbral,
+        "umbral_duplicados": umbral_duplicados,
+        "estudiantes": len(estudiante_ids),
+        "sin_referencia": [u for u in estudiante_ids if u not in con_ref],
+        "sin_frame_reciente": [u for u in estudiante_ids if u not in vivos],
+        "duplicados_total": len(pares),
+        "duplicados": [
+            {"estudiante_a": a, "estudiante_b": b, "similitud": round(s, 4)}
+            for a, b, s in pares[:max_duplicados]
+        ],
+        "suplantaciones": suplantaciones,
+        "no_coinciden": no_coinciden,
+    }
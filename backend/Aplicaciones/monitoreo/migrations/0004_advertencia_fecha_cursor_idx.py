@@ -0,0 +1,17 @@
+# Generated by Django 5.2.10 on 2026-10-19 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoreo', '0003_alter_advertencia_tipo_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='advertencia',
+            index=models.Index(fields=['fecha', 'id_advertencia'], name='advertencia_fecha_1b5557_idx'),
+        ),
+    ]
@@ -25,6 +25,7 @@ class RegistroMonitoreo(models.Model):
         ("MULTIPLES_ROSTROS",     "Múltiples rostros detectados"),
         ("MIRADA_DESVIADA",       "Mirada desviada"),
         ("OJOS_CERRADOS",         "Ojos cerrados"),               # ← NUEVO
+        ("IDENTIDAD_NO_COINCIDE", "Rostro no coincide con el registrado"),
         ("CAMBIO_PESTAÑA",        "Cambio de pestaña"),
         ("PANTALLA_COMPLETA_OFF", "Salida de pantalla completa"),
         ("CONEXION_PERDIDA",      "Conexión perdida"),
@@ -124,6 +125,7 @@ class Advertencia(models.Model):
         ("PERDIDA_CONEXION",        "Pérdida de conexión"),
         ("CAMARA_BLOQUEADA",        "Cámara bloqueada"),
         ("COMPORTAMIENTO_SOSPECHOSO", "Comportamiento sospechoso"),
+        ("SUPLANTACION",            "Posible suplantación de identidad"),
     ]
 
     NIVELES = [
@@ -175,6 +177,7 @@ class Advertencia(models.Model):
         indexes = [
             models.Index(fields=["intento_id", "fecha"]),
             models.Index(fields=["intento_id", "tipo"]),
+            models.Index(fields=["fecha", "id_advertencia"]),  # listado paginado por cursor
         ]
 
     def __str__(self):
@@ -11,7 +11,8 @@ from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
 
-from .models import Advertencia, Expulsion, RegistroMonitoreo, ConfiguracionMonitoreo
+from .configuracion import obtener_configuracion
+from .models import Advertencia, Expulsion, RegistroMonitoreo
 from Aplicaciones.analisis.models import IntentoExamen
 
 EVENTO_A_ADVERTENCIA = {
@@ -25,6 +26,9 @@ EVENTO_A_ADVERTENCIA = {
     "CONEXION_PERDIDA":       ("PERDIDA_CONEXION",       "LEVE"),
 }
 
+# IDENTIDAD_NO_COINCIDE no está a propósito: la similitud por landmarks no
+# basta para sancionar; lo revisa el docente (monitoreo/identidad.py).
+
 DEFAULT_MAX_ADVERTENCIAS = 3
 
 # ✅ Ventana para evitar duplicados del mismo tipo (segundos)
@@ -34,7 +38,7 @@ DUPLICATE_WINDOW_SECONDS = 20
 def _get_max_advertencias(examen_id: int | None) -> int:
     if not examen_id:
         return DEFAULT_MAX_ADVERTENCIAS
-    cfg = ConfiguracionMonitoreo.objects.filter(examen_id=examen_id).first()
+    cfg = obtener_configuracion(examen_id)
     if not cfg:
         return DEFAULT_MAX_ADVERTENCIAS
     return int(cfg.max_advertencias or DEFAULT_MAX_ADVERTENCIAS)
@@ -0,0 +1,21 @@
+# ============================================
+# Aplicaciones/monitoreo/signals.py
+# ============================================
+# Invalida el cache de ConfiguracionMonitoreo (ver configuracion.py).
+# ============================================
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .configuracion import invalidar_configuracion
+from .models import ConfiguracionMonitoreo
+
+
+@receiver(post_save, sender=ConfiguracionMonitoreo)
+@receiver(post_delete, sender=ConfiguracionMonitoreo)
+def _invalidar_configuracion(sender, instance, **kwargs):
+    examen_id = instance.examen_id
+    invalidar_configuracion(examen_id)
+    # y otra vez al confirmar: una lectura concurrente antes del commit
+    # pudo volver a cachear el valor viejo
+    transaction.on_commit(lambda: invalidar_configuracion(examen_id))
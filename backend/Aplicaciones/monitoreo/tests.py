@@ -1,3 +1,139 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from Aplicaciones.analisis.models import IntentoExamen
+from Aplicaciones.usuarios.models import FotoPerfil, Usuario
+
+from . import configuracion, identidad
+from .configuracion import obtener_configuracion
+from .models import Advertencia, ConfiguracionMonitoreo, RegistroMonitoreo
+from .services import procesar_evento_y_reglas
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class NoCoincidenciaIdentidadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def _intento(self, estudiante_id, estado="EN_PROGRESO", numero=1):
+        return IntentoExamen.objects.create(
+            estudiante_id=estudiante_id, estudiante_nombre="Est", estudiante_cedula="0900000001",
+            examen_id=1, examen_titulo="Examen", estado=estado, numero_intento=numero,
+            fecha_limite=timezone.now() + timedelta(hours=1), puntaje_total=10,
+        )
+
+    def test_registra_en_el_intento_activo_sin_advertencias(self):
+        self._intento(7, estado="COMPLETADO")
+        activo = self._intento(7, numero=2)
+
+        identidad.registrar_no_coincidencia(7, {"coincide": False, "similitud": 0.91})
+        registro = identidad.registrar_no_coincidencia(7, {"coincide": False, "similitud": 0.9})
+
+        self.assertEqual(registro.intento_id, activo.id_intento)
+        self.assertEqual(registro.tipo_evento, "IDENTIDAD_NO_COINCIDE")
+        self.assertEqual(registro.detalles["veces"], 2)
+        self.assertEqual(RegistroMonitoreo.objects.count(), 2)
+        self.assertFalse(Advertencia.objects.exists())
+
+    def test_sin_intento_activo_queda_solo_en_cache(self):
+        self.assertIsNone(identidad.registrar_no_coincidencia(8, {"coincide": False, "similitud": 0.9}))
+        self.assertFalse(RegistroMonitoreo.objects.exists())
+
+        revision = identidad.revisar_identidades([8, 9])
+        self.assertEqual(len(revision["no_coinciden"]), 1)
+        self.assertEqual(revision["no_coinciden"][0]["estudiante_id"], 8)
+        self.assertEqual(revision["no_coinciden"][0]["veces"], 1)
+        self.assertEqual(revision["no_coinciden"][0]["similitud"], 0.9)
+
+    def test_el_evento_reenviado_por_el_cliente_no_crea_advertencia(self):
+        intento = self._intento(7)
+        evento = RegistroMonitoreo.objects.create(
+            intento_id=intento.id_intento, estudiante_id=7, tipo_evento="IDENTIDAD_NO_COINCIDE",
+        )
+        resultado = procesar_evento_y_reglas(evento)
+        self.assertIsNone(resultado["advertencia_creada"])
+        self.assertFalse(Advertencia.objects.exists())
+
+
+@override_settings(MONITOREO_IDENTIDAD_MAX_DUPLICADOS=1)
+class DuplicadosIdentidadTests(TestCase):
+    def test_duplicados_usan_su_propio_umbral_y_tope(self):
+        base = np.zeros(identidad.DIM, dtype=np.float32)
+        base[0] = 1
+        cerca = base.copy()
+        cerca[1] = 0.1  # similitud ~0.995: pasa el umbral 1:1, no el de duplicados
+        cerca /= np.linalg.norm(cerca)
+        vectores = [base, base, base, cerca]
+        ids = []
+        for i, vec in enumerate(vectores):
+            u = Usuario.objects.create_user(
+                correo_electronico=f"d{i}@test.com", cedula=f"09100000{i:02d}", password="x",
+                nombres="D", apellidos=str(i), rol="ESTUDIANTE",
+            )
+            FotoPerfil.objects.filter(pk=FotoPerfil.objects.create(usuario=u).pk).update(
+                embedding=identidad.embedding_bytes(vec)
+            )
+            ids.append(u.id_usuario)
+
+        revision = identidad.revisar_identidades(ids, umbral=0.985, umbral_duplicados=0.998)
+        # 3 pares idénticos entre los tres primeros; el cuarto no es duplicado
+        self.assertEqual(revision["duplicados_total"], 3)
+        self.assertEqual(len(revision["duplicados"]), 1)
+        self.assertNotIn(ids[3], {revision["duplicados"][0]["estudiante_a"], revision["duplicados"][0]["estudiante_b"]})
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ConfiguracionCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        configuracion._lru.clear()
+        self.addCleanup(configuracion._lru.clear)
+
+    def test_sin_configuracion_tambien_se_cachea(self):
+        with self.assertNumQueries(1):
+            self.assertIsNone(obtener_configuracion(5))
+            self.assertIsNone(obtener_configuracion(5))
+
+        configuracion._lru.clear()  # otro proceso: solo comparte el cache de Django
+        with self.assertNumQueries(0):
+            self.assertIsNone(obtener_configuracion("5"))
+
+    def test_guardar_o_borrar_invalida(self):
+        self.assertIsNone(obtener_configuracion(5))
+        config = ConfiguracionMonitoreo.objects.create(examen_id=5, max_advertencias=4)
+        self.assertEqual(obtener_configuracion(5).max_advertencias, 4)
+
+        config.max_advertencias = 6
+        config.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(obtener_configuracion(5).max_advertencias, 6)
+            self.assertEqual(obtener_configuracion(5).max_advertencias, 6)
+
+        config.delete()
+        self.assertIsNone(obtener_configuracion(5))
+
+    def test_devuelve_copias_independientes(self):
+        ConfiguracionMonitoreo.objects.create(examen_id=5)
+        copia = obtener_configuracion(5)
+        copia.max_advertencias = 9
+        self.assertEqual(obtener_configuracion(5).max_advertencias, 2)
+
+    @override_settings(MONITOREO_CONFIG_LRU_MAX=2)
+    def test_lru_descarta_el_menos_usado(self):
+        for examen_id in (1, 2):
+            obtener_configuracion(examen_id)
+        obtener_configuracion(1)
+        obtener_configuracion(3)
+        self.assertEqual(list(configuracion._lru), [1, 3])
+
+    @override_settings(MONITOREO_CONFIG_LRU_TTL=-1)
+    def test_copia_local_caducada_vuelve_al_cache_compartido(self):
+        obtener_configuracion(5)
+        self.assertIsNone(configuracion._leer_local(5))
+        self.assertNotIn(5, configuracion._lru)
+        with self.assertNumQueries(0):
+            self.assertIsNone(obtener_configuracion(5))
@@ -6,6 +6,7 @@ from .views import (
     CrearListarEventosView,
     CrearListarAdvertenciasView,
     ResumenIntentoMonitoreoView,
+    IdentidadExamenView,
     ConfiguracionMonitoreoView,
     DetalleConfiguracionMonitoreoView,
     analizar_frame,          # ← NUEVO
@@ -19,6 +20,7 @@ urlpatterns = [
     path("eventos/",CrearListarEventosView.as_view(),            name="eventos"),
     path("advertencias/",                               CrearListarAdvertenciasView.as_view(),       name="advertencias"),
     path("intentos/<int:intento_id>/resumen/",          ResumenIntentoMonitoreoView.as_view(),       name="resumen_intento"),
+    path("examenes/<int:examen_id>/identidad/",         IdentidadExamenView.as_view(),               name="identidad_examen"),
     path("config/",                                     ConfiguracionMonitoreoView.as_view(),        name="config_list_create"),
     path("config/<int:id>/",                            DetalleConfiguracionMonitoreoView.as_view(), name="config_detail"),
 
@@ -8,7 +8,13 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.decorators import (
+    api_view,
+    authentication_classes,
+    permission_classes,
+    parser_classes,
+    throttle_classes,
+)
 from rest_framework.parsers import MultiPartParser
 from django.shortcuts import get_object_or_404
 from django.db.models import Count
@@ -21,8 +27,14 @@ from .serializers import (
     ConfiguracionMonitoreoSerializer,
 )
 from .services import procesar_evento_y_reglas
+from .configuracion import obtener_configuracion
 from . import detection_service as ds  # ✅ usar ds para health y estado global
+from . import identidad
 from Aplicaciones.analisis.models import IntentoExamen
+from Aplicaciones.usuarios.autenticacion import JWTSinConsultaAuthentication
+from Aplicaciones.usuarios.permissions import IsAdminOrDocente
+from backend.paginacion import PaginacionCursor
+from backend.throttling import EventosThrottle, FramesThrottle
 
 logger = logging.getLogger("django")
 
@@ -32,7 +44,10 @@ logger = logging.getLogger("django")
 # ============================================================
 
 class CrearListarEventosView(APIView):
+    # alta frecuencia: usuario desde el token, sin consulta por petición
+    authentication_classes = [JWTSinConsultaAuthentication]
     permission_classes = [IsAuthenticated]
+    throttle_classes = [EventosThrottle]
 
     def post(self, request):
         ser = RegistroMonitoreoSerializer(data=request.data)
@@ -76,7 +91,7 @@ class CrearListarEventosView(APIView):
                 max_adv = 3
                 try:
                     if examen_id:
-                        cfg = ConfiguracionMonitoreo.objects.filter(examen_id=examen_id).first()
+                        cfg = obtener_configuracion(examen_id)
                         if cfg and cfg.max_advertencias:
                             max_adv = int(cfg.max_advertencias)
                 except Exception:
@@ -141,8 +156,9 @@ class CrearListarAdvertenciasView(APIView):
         if resuelta in ("true", "false"):
             qs = qs.filter(resuelta=(resuelta == "true"))
 
-        ser = AdvertenciaSerializer(qs, many=True)
-        return Response({"total": qs.count(), "advertencias": ser.data})
+        return PaginacionCursor(("-fecha", "-id_advertencia")).responder(
+            request, qs, AdvertenciaSerializer, "advertencias"
+        )
 
 
 # ============================================================
@@ -186,6 +202,33 @@ class ResumenIntentoMonitoreoView(APIView):
         return Response(payload)
 
 
+class IdentidadExamenView(APIView):
+    permission_classes = [IsAuthenticated, IsAdminOrDocente]
+
+    def get(self, request, examen_id):
+        """
+        Cruce 1:N de rostros entre los estudiantes del examen (?activos=1:
+        solo intentos en curso; ?umbral= / ?umbral_duplicados=). Ver
+        identidad.revisar_identidades.
+        """
+        intentos = IntentoExamen.objects.filter(examen_id=examen_id)
+        if request.query_params.get("activos") in ("1", "true"):
+            intentos = intentos.filter(estado__in=["INICIADO", "EN_PROGRESO"])
+        estudiantes = intentos.values_list("estudiante_id", flat=True).distinct()
+
+        umbrales = {}
+        for param in ("umbral", "umbral_duplicados"):
+            valor = request.query_params.get(param)
+            try:
+                umbrales[param] = float(valor) if valor else None
+            except ValueError:
+                return Response({"error": f"{param} inválido"}, status=status.HTTP_400_BAD_REQUEST)
+
+        payload = identidad.revisar_identidades(estudiantes, **umbrales)
+        payload["examen_id"] = int(examen_id)
+        return Response(payload)
+
+
 # ============================================================
 # CONFIGURACIÓN DE MONITOREO
 # ============================================================
@@ -238,7 +281,9 @@ class DetalleConfiguracionMonitoreoView(APIView):
 # ============================================================
 
 @api_view(["POST"])
+@authentication_classes([JWTSinConsultaAuthentication])
 @permission_classes([IsAuthenticated])
+@throttle_classes([FramesThrottle])
 @parser_classes([MultiPartParser])
 def analizar_frame(request):
     """
@@ -259,16 +304,29 @@ def analizar_frame(request):
     try:
         jpeg_bytes = uploaded.read()
         t0 = time.perf_counter()
+        usuario_id = getattr(request.user, "id_usuario", request.user.id)
 
         # ✅ usar ds.analyze_frame (una sola fuente)
-        result = ds.analyze_frame(jpeg_bytes)
+        # cada MONITOREO_IDENTIDAD_INTERVALO s además se verifica la identidad
+        verificar = identidad.toca_verificar(usuario_id)
+        result = ds.analyze_frame(jpeg_bytes, con_embedding=verificar)
+
+        if verificar:
+            embedding = result.pop("embedding", None)
+            if embedding is None:
+                identidad.liberar_turno(usuario_id)
+            else:
+                result["identidad"] = identidad.verificar_identidad(usuario_id, embedding)
+                if result["identidad"]["coincide"] is False:
+                    identidad.registrar_no_coincidencia(usuario_id, result["identidad"])
+                    result["events"].append("IDENTIDAD_NO_COINCIDE")
 
         ms = round((time.perf_counter() - t0) * 1000, 1)
         result["processing_ms"] = ms
 
         logger.info(
             "[analizar-frame] user=%s faces=%d events=%s latency=%sms",
-            getattr(request.user, "id_usuario", request.user.id),
+            usuario_id,
             result.get("num_faces", 0),
             result.get("events", []),
             ms,
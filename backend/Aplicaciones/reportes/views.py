@@ -11,6 +11,7 @@ from .serializers import (
     PlantillaReporteSerializer
 )
 from .services import generar_reporte
+from backend.paginacion import PaginacionCursor
 
 
 class ListaCrearReportesView(APIView):
@@ -39,8 +40,9 @@ class ListaCrearReportesView(APIView):
         if intento_id:
             qs = qs.filter(intento_id=intento_id)
 
-        serializer = ReporteSerializer(qs, many=True)
-        return Response({"total": qs.count(), "reportes": serializer.data})
+        return PaginacionCursor(('-fecha_generacion', '-id_reporte')).responder(
+            request, qs, ReporteSerializer, "reportes"
+        )
 
     def post(self, request):
         serializer = CrearReporteSerializer(data=request.data)
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class UsuariosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Aplicaciones.usuarios'
-    
\ No newline at end of file
+
+    def ready(self):
+        # versiones de cache del perfil
+        from . import signals  # noqa: F401
@@ -0,0 +1,233 @@
+# ============================================
+# Aplicaciones/usuarios/aprovisionamiento.py
+# ============================================
+# Alta masiva de usuarios desde CSV (endpoint y comando
+# aprovisionar_usuarios).
+#
+# Columnas: cedula, nombres, apellidos, correo_electronico, password
+# [, rol]. Separador "," o ";" (Excel en español), UTF-8 con o sin BOM.
+#
+#   1) validación en memoria por fila (formato, password, duplicados en el
+#      archivo) + UNA consulta por lote contra la BD por cédula/correo
+#   2) hash de contraseñas en un pool de procesos (hashing.py), el mismo
+#      para todos los lotes
+#   3) bulk_create de Usuario y FotoPerfil por lotes
+#
+# Nunca aborta todo el archivo por una fila: cada error se reporta con su
+# número de fila (la 2 es la primera después del encabezado).
+# ============================================
+import csv
+import io
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hasher
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .hashing import crear_pool, hashear_passwords
+from .models import FotoPerfil, Usuario
+
+COLUMNAS = ["cedula", "nombres", "apellidos", "correo_electronico", "password"]
+ALIAS_COLUMNAS = {"correo": "correo_electronico", "email": "correo_electronico", "contrasena": "password"}
+ROLES_VALIDOS = {r for r, _ in Usuario.ROLES}
+
+
+def leer_csv(archivo) -> List[dict]:
+    """Filas del CSV (archivo binario o de texto) con encabezados normalizados."""
+    if isinstance(archivo, (bytes, bytearray)):
+        texto = archivo.decode("utf-8-sig")
+    else:
+        texto = archivo.read()
+        if isinstance(texto, bytes):
+            texto = texto.decode("utf-8-sig")
+    texto = texto.lstrip("\ufeff")
+
+    try:
+        dialecto = csv.Sniffer().sniff(texto[:4096], delimiters=",;")
+    except csv.Error:
+        dialecto = csv.excel
+
+    lector = csv.DictReader(io.StringIO(texto), dialect=dialecto)
+    encabezados = {}
+    for h in lector.fieldnames or []:
+        nombre = (h or "").strip().lower()
+        encabezados[h] = ALIAS_COLUMNAS.get(nombre, nombre)
+
+    faltan = [c for c in COLUMNAS if c not in encabezados.values()]
+    if faltan:
+        raise ValueError(f"Faltan columnas en el CSV: {', '.join(faltan)}")
+
+    return [
+        {encabezados[k]: (v or "").strip() for k, v in fila.items() if k in encabezados}
+        for fila in lector
+    ]
+
+
+def _validar_fila(fila: dict, rol_default: str) -> dict:
+    errores = {}
+    cedula = fila.get("cedula", "")
+    try:
+        Usuario.cedula_validator(cedula)
+    except ValidationError as e:
+        errores["cedula"] = e.messages[0]
+
+    for campo in ("nombres", "apellidos"):
+        if not fila.get(campo):
+            errores[campo] = "Obligatorio."
+
+    correo = Usuario.objects.normalize_email(fila.get("correo_electronico", ""))
+    fila["correo_electronico"] = correo
+    try:
+        validate_email(correo)
+    except ValidationError:
+        errores["correo_electronico"] = "Correo inválido."
+
+    fila["rol"] = (fila.get("rol") or rol_default).upper()
+    if fila["rol"] not in ROLES_VALIDOS:
+        errores["rol"] = f"Rol inválido: {fila['rol']}."
+
+    if not fila.get("password"):
+        errores["password"] = "Obligatorio."
+    elif "password" not in errores:
+        usuario = Usuario(cedula=cedula, nombres=fila.get("nombres", ""), apellidos=fila.get("apellidos", ""),
+                          correo_electronico=correo)
+        try:
+            validate_password(fila["password"], usuario)
+        except ValidationError as e:
+            errores["password"] = " ".join(e.messages)
+    return errores
+
+
+def _crear_lote(usuarios: List[Usuario]) -> List[Usuario]:
+    with transaction.atomic():
+        creados = Usuario.objects.bulk_create(usuarios)
+        if any(u.pk is None for u in creados):  # motores sin RETURNING
+            ids = dict(
+                Usuario.objects.filter(correo_electronico__in=[u.correo_electronico for u in creados])
+                .values_list("correo_electronico", "id_usuario")
+            )
+            for u in creados:
+                u.pk = ids[u.correo_electronico]
+        FotoPerfil.objects.bulk_create([FotoPerfil(usuario=u) for u in creados])
+    return creados
+
+
+def aprovisionar_usuarios(
+    filas: Iterable[dict],
+    rol_default: str = "ESTUDIANTE",
+    roles_permitidos: Optional[set] = None,
+    batch_size: int = 500,
+    procesos: Optional[int] = None,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Crea los usuarios válidos y devuelve
+    {"total", "validos", "creados", "errores": [{"fila", "cedula", "correo_electronico", "errores"}], "dry_run"}.
+    roles_permitidos limita qué roles puede traer el CSV (p.ej. solo ESTUDIANTE).
+    """
+    filas = list(filas)
+    errores, validas = [], []
+    cedulas_vistas, correos_vistos = set(), set()
+
+    def _error(n, fila, detalle):
+        errores.append({
+            "fila": n,
+            "cedula": fila.get("cedula", ""),
+            "correo_electronico": fila.get("correo_electronico", ""),
+            "errores": detalle,
+        })
+
+    # 1) validación en memoria
+    for n, fila in enumerate(filas, start=2):
+        detalle = _validar_fila(fila, rol_default)
+        if roles_permitidos is not None and fila["rol"] not in roles_permitidos and "rol" not in detalle:
+            detalle["rol"] = f"No puedes crear usuarios con rol {fila['rol']}."
+        if fila["cedula"] in cedulas_vistas:
+            detalle["cedula"] = "Repetida en el archivo."
+        if fila["correo_electronico"].lower() in correos_vistos:
+            detalle["correo_electronico"] = "Repetido en el archivo."
+        cedulas_vistas.add(fila["cedula"])
+        correos_vistos.add(fila["correo_electronico"].lower())
+        if detalle:
+            _error(n, fila, detalle)
+        else:
+            validas.append((n, fila))
+
+    creados, listos = 0, 0
+    ruta_hasher = f"{type(get_hasher()).__module__}.{type(get_hasher()).__name__}"
+    procesos = procesos or int(getattr(settings, "USUARIOS_HASH_PROCESOS", 0)) or None
+    tam_lote_hash = 50
+    pool = None  # un solo pool de procesos para todos los lotes (se crea al primer hash)
+
+    try:
+        for i in range(0, len(validas), batch_size):
+            lote = validas[i:i + batch_size]
+
+            # 2) duplicados contra la BD: 2 consultas por lote
+            existentes_ced = set(Usuario.objects.filter(cedula__in=[f["cedula"] for _, f in lote])
+                                 .values_list("cedula", flat=True))
+            existentes_mail = {c.lower() for c in Usuario.objects.filter(
+                correo_electronico__in=[f["correo_electronico"] for _, f in lote]
+            ).values_list("correo_electronico", flat=True)}
+
+            pendientes = []
+            for n, fila in lote:
+                detalle = {}
+                if fila["cedula"] in existentes_ced:
+                    detalle["cedula"] = "Ya existe un usuario con esta cédula."
+                if fila["correo_electronico"].lower() in existentes_mail:
+                    detalle["correo_electronico"] = "Ya existe un usuario con este correo."
+                if detalle:
+                    _error(n, fila, detalle)
+                else:
+                    pendientes.append((n, fila))
+
+            listos += len(pendientes)
+            if dry_run or not pendientes:
+                continue
+
+            # 3) hash en paralelo
+            if pool is None and len(validas) > tam_lote_hash:
+                pool = crear_pool(procesos)
+            hashes = hashear_passwords([f["password"] for _, f in pendientes], ruta_hasher,
+                                       procesos=procesos, tam_lote=tam_lote_hash, pool=pool)
+
+            usuarios, origen = [], []
+            for (n, fila), (hash_pw, error) in zip(pendientes, hashes):
+                if hash_pw is None:
+                    _error(n, fila, {"password": error or "No se pudo procesar la contraseña."})
+                    continue
+                usuarios.append(Usuario(
+                    cedula=fila["cedula"],
+                    nombres=fila["nombres"],
+                    apellidos=fila["apellidos"],
+                    correo_electronico=fila["correo_electronico"],
+                    rol=fila["rol"],
+                    password=hash_pw,
+                ))
+                origen.append((n, fila))
+
+            # 4) inserción; si el lote choca (alta concurrente), fila por fila
+            try:
+                creados += len(_crear_lote(usuarios))
+            except IntegrityError:
+                for usuario, (n, fila) in zip(usuarios, origen):
+                    try:
+                        creados += len(_crear_lote([usuario]))
+                    except IntegrityError:
+                        _error(n, fila, {"cedula": "Cédula o correo ya registrados."})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    errores.sort(key=lambda e: e["fila"])
+    return {
+        "total": len(filas),
+        "validos": listos,  # en dry_run: los que se crearían
+        "creados": creados,
+        "errores": errores,
+        "dry_run": dry_run,
+    }
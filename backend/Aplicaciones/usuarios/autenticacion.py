@@ -0,0 +1,137 @@
+# ============================================
+# Aplicaciones/usuarios/autenticacion.py
+# ============================================
+# Autenticación JWT sin consulta a Usuario por petición, para endpoints de
+# alta frecuencia (analizar-frame, eventos de monitoreo).
+#
+# - Los tokens llevan los claims "rol" y "nombre" además de user_id
+#   (tokens_para / TokenConClaimsSerializer); el access heredado de un
+#   refresh los copia.
+# - JWTSinConsultaAuthentication arma request.user desde el token
+#   (UsuarioToken) y solo verifica que el usuario siga activo y su rol
+#   vigente contra un cache en memoria del proceso con TTL corto
+#   (AUTH_ESTADO_CACHE_TTL): una consulta por usuario por ventana, no una
+#   por petición. Un rol cambiado en BD gana sobre el del token.
+# - Solo JWT: sin SessionAuthentication (ni sesión ni CSRF).
+# ============================================
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Usuario
+
+
+# =========================================================
+# Emisión de tokens
+# =========================================================
+def _agregar_claims(token, usuario):
+    token["rol"] = usuario.rol
+    token["nombre"] = usuario.nombre_completo
+    return token
+
+
+def tokens_para(usuario) -> RefreshToken:
+    """RefreshToken con claims de rol/nombre (el access los hereda)."""
+    return _agregar_claims(RefreshToken.for_user(usuario), usuario)
+
+
+class TokenConClaimsSerializer(TokenObtainPairSerializer):
+    """Para /api/token/: mismos claims que el login."""
+
+    @classmethod
+    def get_token(cls, user):
+        return _agregar_claims(super().get_token(user), user)
+
+
+# =========================================================
+# Estado del usuario (cache en memoria con TTL)
+# =========================================================
+_estado: dict = {}  # id_usuario -> (expira, is_active, rol)
+_lock = threading.Lock()
+
+
+def _ttl() -> float:
+    return float(getattr(settings, "AUTH_ESTADO_CACHE_TTL", 60))
+
+
+def estado_usuario(usuario_id: int) -> Optional[tuple]:
+    """(is_active, rol) del usuario o None si no existe."""
+    ahora = time.monotonic()
+    with _lock:
+        entrada = _estado.get(usuario_id)
+    if entrada is not None and entrada[0] > ahora:
+        return entrada[1:]
+
+    fila = Usuario.objects.filter(id_usuario=usuario_id).values_list("is_active", "rol").first()
+    with _lock:
+        if fila is None:
+            _estado.pop(usuario_id, None)
+        else:
+            _estado[usuario_id] = (ahora + _ttl(), *fila)
+            if len(_estado) > 50000:
+                # limpieza simple de expirados; el cache no debe crecer sin límite
+                for k in [k for k, v in _estado.items() if v[0] <= ahora]:
+                    _estado.pop(k, None)
+    return fila
+
+
+def olvidar_estado(usuario_id) -> None:
+    with _lock:
+        _estado.pop(usuario_id, None)
+
+
+# =========================================================
+# Usuario y backend de autenticación
+# =========================================================
+class UsuarioToken(TokenUser):
+    """
+    Usuario respaldado por el token (sin fila de BD). Expone lo que usan
+    las vistas de monitoreo: id_usuario, rol, nombre_completo.
+    """
+
+    def __init__(self, token, rol: str):
+        super().__init__(token)
+        self._rol = rol
+
+    @cached_property
+    def id(self):
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @property
+    def id_usuario(self):
+        return self.id
+
+    @property
+    def rol(self):
+        return self._rol
+
+    @property
+    def nombre_completo(self):
+        return self.token.get("nombre", "")
+
+
+class JWTSinConsultaAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            usuario_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken("El token no identifica a un usuario.")
+
+        estado = estado_usuario(usuario_id)
+        if estado is None:
+            raise AuthenticationFailed("Usuario no encontrado.", code="user_not_found")
+        activo, rol = estado
+        if not activo:
+            raise AuthenticationFailed("Usuario inactivo.", code="user_inactive")
+
+        return UsuarioToken(validated_token, rol)
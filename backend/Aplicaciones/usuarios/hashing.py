@@ -0,0 +1,62 @@
+# ============================================
+# Aplicaciones/usuarios/hashing.py
+# ============================================
+# Hash de contraseñas en paralelo (procesos) para altas masivas: bcrypt es
+# CPU puro y con hilos no escala por el GIL.
+#
+# Este módulo NO importa modelos: los procesos hijos (spawn) solo
+# necesitan la clase del hasher, no Django inicializado.
+#
+# Los procesos se crean con "spawn", no con fork: quien llama puede ser un
+# worker de gunicorn o el hilo de jobs.py, y hacer fork de un proceso con
+# hilos copia candados tomados. Crear el pool una vez (crear_pool) y pasarlo
+# a cada lote evita arrancar procesos por lote.
+# ============================================
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from django.utils.module_loading import import_string
+
+
+def _hashear_lote(args: Tuple[str, List[str]]) -> List[Tuple[Optional[str], str]]:
+    ruta_hasher, passwords = args
+    hasher = import_string(ruta_hasher)()
+    resultado = []
+    for password in passwords:
+        try:
+            resultado.append((hasher.encode(password, hasher.salt()), ""))
+        except Exception as e:  # p.ej. bcrypt con más de 72 bytes
+            resultado.append((None, str(e)))
+    return resultado
+
+
+def crear_pool(procesos: Optional[int] = None) -> Optional[ProcessPoolExecutor]:
+    """Pool para reutilizar entre llamadas a hashear_passwords; None si procesos <= 1."""
+    procesos = procesos or os.cpu_count() or 1
+    if procesos <= 1:
+        return None
+    return ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn"))
+
+
+def hashear_passwords(
+    passwords: List[str],
+    ruta_hasher: str,
+    procesos: Optional[int] = None,
+    tam_lote: int = 50,
+    pool: Optional[ProcessPoolExecutor] = None,
+) -> List[Tuple[Optional[str], str]]:
+    """
+    [(hash | None, error)] en el mismo orden que `passwords`. Con `pool`
+    lo usa (quien lo creó lo cierra); sin él crea uno para esta llamada.
+    procesos=1 (o pocas contraseñas) hashea en el proceso actual.
+    """
+    lotes = [(ruta_hasher, passwords[i:i + tam_lote]) for i in range(0, len(passwords), tam_lote)]
+    if len(lotes) <= 1 or (pool is None and (procesos or os.cpu_count() or 1) <= 1):
+        return [r for lote in lotes for r in _hashear_lote(lote)]
+    if pool is not None:
+        return [r for parcial in pool.map(_hashear_lote, lotes) for r in parcial]
+
+    with crear_pool(min(procesos or os.cpu_count() or 1, len(lotes))) as propio:
+        return [r for parcial in propio.map(_hashear_lote, lotes) for r in parcial]
@@ -0,0 +1,82 @@
+# ============================================
+# Aplicaciones/usuarios/jobs.py
+# ============================================
+# Worker en proceso para la carga masiva desde el endpoint (mismo esquema
+# que examenes/jobs.py): la vista crea la CargaMasivaUsuarios en
+# PROCESANDO, encola y responde 202; el hilo corre aprovisionar_usuarios
+# (hash en procesos spawn, ver hashing.py) y deja COMPLETADA o ERROR.
+#
+# Las filas (con contraseñas) solo viven en memoria: si el proceso muere la
+# carga no se puede reanudar; pasado USUARIOS_CARGA_TIMEOUT la consulta de
+# estado la marca ERROR para que se vuelva a subir el archivo.
+# ============================================
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .aprovisionamiento import aprovisionar_usuarios
+from .models import CargaMasivaUsuarios
+
+logger = logging.getLogger("django")
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # una carga a la vez por proceso: cada una ya usa todos los núcleos para el hash
+            _executor = ThreadPoolExecutor(
+                max_workers=int(getattr(settings, "USUARIOS_CARGA_WORKERS", 1)),
+                thread_name_prefix="carga-usuarios",
+            )
+    return _executor
+
+
+def encolar_carga(carga_id: int, filas: List[dict], roles_permitidos: Optional[set] = None) -> None:
+    """Encola la carga cuando la transacción actual confirma (el worker ya ve la fila)."""
+    transaction.on_commit(lambda: _get_executor().submit(_ejecutar_en_hilo, carga_id, filas, roles_permitidos))
+
+
+def _ejecutar_en_hilo(carga_id: int, filas: List[dict], roles_permitidos: Optional[set]) -> None:
+    close_old_connections()
+    try:
+        ejecutar_carga(carga_id, filas, roles_permitidos)
+    finally:
+        close_old_connections()
+
+
+def ejecutar_carga(carga_id: int, filas: List[dict], roles_permitidos: Optional[set] = None) -> None:
+    try:
+        resultado = aprovisionar_usuarios(filas, roles_permitidos=roles_permitidos)
+    except Exception as e:
+        logger.warning("[carga-usuarios] carga=%s falló: %s", carga_id, e, exc_info=True)
+        CargaMasivaUsuarios.objects.filter(id_carga=carga_id, estado="PROCESANDO").update(
+            estado="ERROR", error=str(e)[:2000], fecha_fin=timezone.now()
+        )
+        return
+    CargaMasivaUsuarios.objects.filter(id_carga=carga_id, estado="PROCESANDO").update(
+        estado="COMPLETADA", resultado=resultado, fecha_fin=timezone.now()
+    )
+
+
+def liberar_carga_atascada(carga: CargaMasivaUsuarios) -> bool:
+    """PROCESANDO más allá de USUARIOS_CARGA_TIMEOUT (worker reiniciado) -> ERROR."""
+    timeout = timedelta(seconds=int(getattr(settings, "USUARIOS_CARGA_TIMEOUT", 3600)))
+    if carga.estado != "PROCESANDO" or carga.fecha_creacion >= timezone.now() - timeout:
+        return False
+    return bool(
+        CargaMasivaUsuarios.objects.filter(id_carga=carga.id_carga, estado="PROCESANDO").update(
+            estado="ERROR",
+            error="La carga no terminó (worker reiniciado o caído). Vuelve a subir el archivo.",
+            fecha_fin=timezone.now(),
+        )
+    )
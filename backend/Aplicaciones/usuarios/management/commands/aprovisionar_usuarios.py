@@ -0,0 +1,58 @@
+# ============================================
+# Aplicaciones/usuarios/management/commands/aprovisionar_usuarios.py
+# ============================================
+# Alta masiva de usuarios desde CSV (ver aprovisionamiento.py).
+#
+#   python manage.py aprovisionar_usuarios estudiantes.csv
+#   python manage.py aprovisionar_usuarios docentes.csv --rol DOCENTE --procesos 8
+#   python manage.py aprovisionar_usuarios estudiantes.csv --dry-run --errores errores.json
+# ============================================
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Aplicaciones.usuarios.aprovisionamiento import aprovisionar_usuarios, leer_csv
+
+
+class Command(BaseCommand):
+    help = "Crea usuarios (y su FotoPerfil) desde un CSV, con errores por fila."
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo", help="CSV: cedula, nombres, apellidos, correo_electronico, password [, rol]")
+        parser.add_argument("--rol", default="ESTUDIANTE", help="Rol para filas sin columna rol.")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--procesos", type=int, default=None, help="Procesos para el hash (default USUARIOS_HASH_PROCESOS).")
+        parser.add_argument("--dry-run", action="store_true", help="Solo validar.")
+        parser.add_argument("--errores", default=None, help="Guardar el detalle de errores en este JSON.")
+
+    def handle(self, *args, **opts):
+        try:
+            with open(opts["archivo"], "rb") as f:
+                filas = leer_csv(f)
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+
+        t0 = time.perf_counter()
+        resultado = aprovisionar_usuarios(
+            filas,
+            rol_default=opts["rol"].upper(),
+            batch_size=opts["batch_size"],
+            procesos=opts["procesos"],
+            dry_run=opts["dry_run"],
+        )
+        segundos = time.perf_counter() - t0
+
+        for e in resultado["errores"][:20]:
+            self.stderr.write(f"fila {e['fila']} ({e['cedula']}): {e['errores']}")
+        if len(resultado["errores"]) > 20:
+            self.stderr.write(f"... y {len(resultado['errores']) - 20} errores más")
+
+        if opts["errores"]:
+            with open(opts["errores"], "w", encoding="utf-8") as f:
+                json.dump(resultado["errores"], f, ensure_ascii=False, indent=2)
+
+        self.stdout.write(
+            f"total={resultado['total']} validos={resultado['validos']} creados={resultado['creados']} "
+            f"errores={len(resultado['errores'])} dry_run={resultado['dry_run']} segundos={segundos:.1f}"
+        )
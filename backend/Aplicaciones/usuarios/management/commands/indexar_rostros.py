@@ -0,0 +1,54 @@
+# ============================================
+# Aplicaciones/usuarios/management/commands/indexar_rostros.py
+# ============================================
+# Calcula FotoPerfil.embedding de las fotos que aún no lo tienen (fotos
+# anteriores a la verificación de identidad). Idempotente.
+#
+#   python manage.py indexar_rostros
+#   python manage.py indexar_rostros --todas   (recalcula todas)
+# ============================================
+from django.core.management.base import BaseCommand
+
+from backend.cache import invalidar
+from Aplicaciones.monitoreo.identidad import embedding_bytes, embedding_de_archivo
+from Aplicaciones.usuarios.models import FotoPerfil
+
+
+class Command(BaseCommand):
+    help = "Completa FotoPerfil.embedding para la verificación de identidad."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--todas", action="store_true", help="Recalcular también las que ya tienen embedding.")
+
+    def handle(self, *args, **opts):
+        # sin ninguna de las dos fotos no hay de dónde sacar el rostro
+        qs = FotoPerfil.objects.exclude(foto="", foto_validacion="").exclude(foto="", foto_validacion__isnull=True)
+        if not opts["todas"]:
+            qs = qs.filter(embedding__isnull=True)
+        qs = qs.order_by("id_foto")
+
+        total, sin_rostro, ultimo = 0, 0, 0
+        while True:
+            lote = list(qs.filter(id_foto__gt=ultimo)[:opts["batch_size"]])
+            if not lote:
+                break
+            listos = []
+            for f in lote:
+                try:
+                    vec = embedding_de_archivo(f.foto or f.foto_validacion)
+                except (OSError, ValueError):
+                    vec = None
+                if vec is None:
+                    sin_rostro += 1
+                    continue
+                f.embedding = embedding_bytes(vec)
+                listos.append(f)
+            FotoPerfil.objects.bulk_update(listos, ["embedding"])
+            # bulk_update no emite señales: invalidar la referencia cacheada
+            for f in listos:
+                invalidar("usuarios.Usuario", f.usuario_id)
+            total += len(listos)
+            ultimo = lote[-1].id_foto
+
+        self.stdout.write(f"rostros_indexados={total} sin_rostro={sin_rostro}")
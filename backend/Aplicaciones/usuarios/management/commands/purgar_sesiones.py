@@ -0,0 +1,45 @@
+# ============================================
+# Aplicaciones/usuarios/management/commands/purgar_sesiones.py
+# ============================================
+# Borra (y opcionalmente archiva) las SesionUsuario expiradas hace más de
+# SESIONES_RETENCION_DIAS. Idempotente; pensado para cron diario.
+#
+#   python manage.py purgar_sesiones
+#   python manage.py purgar_sesiones --archivo /backups/sesiones.jsonl.gz
+#   python manage.py purgar_sesiones --dry-run
+#   Worker permanente:  python manage.py purgar_sesiones --intervalo 3600
+# ============================================
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from Aplicaciones.usuarios.services import purgar_sesiones
+
+
+class Command(BaseCommand):
+    help = "Purga por lotes las sesiones de usuario expiradas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, default=None, help="Retención tras expirar (default SESIONES_RETENCION_DIAS).")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Sesiones por lote/transacción.")
+        parser.add_argument("--archivo", default=None, help="Archivar las filas en este .jsonl.gz antes de borrarlas.")
+        parser.add_argument("--dry-run", action="store_true", help="Solo contar, sin borrar.")
+        parser.add_argument("--intervalo", type=int, default=0, help="Segundos entre barridos (0 = una sola vez).")
+
+    def handle(self, *args, **opts):
+        while True:
+            close_old_connections()
+            resumen = purgar_sesiones(
+                retencion_dias=opts["dias"],
+                batch_size=opts["batch_size"],
+                archivo=opts["archivo"],
+                aplicar=not opts["dry_run"],
+            )
+            self.stdout.write(
+                f"sesiones_borradas={resumen['sesiones_borradas']} "
+                f"candidatas={resumen['candidatas']} lotes={resumen['lotes']}"
+            )
+            if opts["intervalo"] <= 0:
+                break
+            time.sleep(opts["intervalo"])
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.10 on 2026-10-19 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0003_alter_sesionusuario_token_hash'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sesionusuario',
+            index=models.Index(fields=['usuario', 'activo', 'expira_en'], name='sesiones_us_usuario_2267c0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sesionusuario',
+            index=models.Index(fields=['expira_en'], name='sesiones_us_expira__b382bf_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.10 on 2026-10-19 11:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0004_indices_sesionusuario'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='fotoperfil',
+            name='embeddings',
+        ),
+        migrations.AddField(
+            model_name='fotoperfil',
+            name='embedding',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.10 on 2026-10-19 11:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0005_fotoperfil_embedding_binario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CargaMasivaUsuarios',
+            fields=[
+                ('id_carga', models.AutoField(primary_key=True, serialize=False)),
+                ('estado', models.CharField(choices=[('PROCESANDO', 'Procesando'), ('COMPLETADA', 'Completada'), ('ERROR', 'Error')], default='PROCESANDO', max_length=15)),
+                ('archivo_nombre', models.CharField(blank=True, max_length=255)),
+                ('total_filas', models.IntegerField(default=0)),
+                ('resultado', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('creado_por', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='cargas_masivas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'cargas_masivas_usuarios',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.10 on 2026-10-19 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('usuarios', '0006_cargamasivausuarios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fotoperfil',
+            name='similitud_validacion',
+            field=models.FloatField(blank=True, editable=False, null=True),
+        ),
+    ]
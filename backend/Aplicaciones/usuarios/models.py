@@ -105,6 +105,12 @@ class SesionUsuario(models.Model):
     class Meta:
         db_table = 'sesiones_usuario'
         ordering = ['-creado_en']
+        indexes = [
+            # sesiones activas de un usuario (MisSesiones, cerrar todas, logout)
+            models.Index(fields=['usuario', 'activo', 'expira_en']),
+            # barrido de purgar_sesiones
+            models.Index(fields=['expira_en']),
+        ]
 
     def is_expired(self):
         return timezone.now() > self.expira_en
@@ -121,11 +127,44 @@ class FotoPerfil(models.Model):
     foto = models.ImageField(upload_to=ruta_foto_usuario)
     foto_validacion = models.ImageField(upload_to='fotos_validacion/', null=True, blank=True)
 
-    embeddings = models.JSONField(null=True, blank=True)
+    # embedding facial de referencia (float32[DIM_EMBEDDING], ver monitoreo/identidad.py)
+    embedding = models.BinaryField(null=True, blank=True, editable=False)
     validada = models.BooleanField(default=False)
+    # similitud de la última foto_validacion con la referencia (para el docente)
+    similitud_validacion = models.FloatField(null=True, blank=True, editable=False)
 
     fecha_subida = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'fotos_perfil'
+
+
+class CargaMasivaUsuarios(models.Model):
+    """
+    Alta masiva encolada desde el endpoint (ver aprovisionamiento.py y
+    jobs.py). Las contraseñas del CSV nunca se guardan: solo viven en la
+    memoria del worker; aquí queda el estado y el resumen con errores por fila.
+    """
+    ESTADOS = [
+        ('PROCESANDO', 'Procesando'),
+        ('COMPLETADA', 'Completada'),
+        ('ERROR', 'Error'),
+    ]
+
+    id_carga = models.AutoField(primary_key=True)
+    creado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True,
+                                   related_name='cargas_masivas')
+
+    estado = models.CharField(max_length=15, choices=ESTADOS, default='PROCESANDO')
+    archivo_nombre = models.CharField(max_length=255, blank=True)
+    total_filas = models.IntegerField(default=0)
+    resultado = models.JSONField(default=dict, blank=True)  # salida de aprovisionar_usuarios
+    error = models.TextField(blank=True)
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'cargas_masivas_usuarios'
+        ordering = ['-fecha_creacion']
@@ -9,7 +9,11 @@ from .models import Usuario, FotoPerfil, SesionUsuario
 class FotoPerfilSerializer(serializers.ModelSerializer):
     class Meta:
         model = FotoPerfil
-        fields = ['id_foto', 'foto', 'foto_validacion', 'validada', 'fecha_subida', 'fecha_actualizacion']
+        fields = [
+            'id_foto', 'foto', 'foto_validacion', 'validada', 'similitud_validacion',
+            'fecha_subida', 'fecha_actualizacion',
+        ]
+        read_only_fields = ['similitud_validacion']
 
 
 class FotoValidacionSerializer(serializers.ModelSerializer):
@@ -0,0 +1,64 @@
+# ============================================
+# Aplicaciones/usuarios/services.py
+# ============================================
+import gzip
+import json
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import SesionUsuario
+
+
+# =========================================================
+# Mantenimiento de SesionUsuario
+# =========================================================
+CAMPOS_ARCHIVO_SESION = ["id_sesion", "usuario_id", "ip_address", "user_agent", "expira_en", "creado_en", "activo"]
+
+
+def purgar_sesiones(
+    retencion_dias: Optional[int] = None,
+    batch_size: int = 5000,
+    archivo: Optional[str] = None,
+    aplicar: bool = True,
+) -> dict:
+    """
+    Borra por lotes las sesiones expiradas hace más de retencion_dias
+    (SESIONES_RETENCION_DIAS). Las cerradas por logout también tienen
+    expira_en, así que caen por el mismo criterio.
+
+    archivo: ruta .jsonl.gz donde se agregan las filas antes de borrarlas.
+    Cada lote es su propia transacción (no bloquea la tabla entera) y usa
+    el índice de expira_en.
+    """
+    dias = int(getattr(settings, "SESIONES_RETENCION_DIAS", 30) if retencion_dias is None else retencion_dias)
+    limite = timezone.now() - timedelta(days=dias)
+    candidatas = SesionUsuario.objects.filter(expira_en__lt=limite).order_by("id_sesion")
+
+    if not aplicar:
+        return {"sesiones_borradas": 0, "candidatas": candidatas.count(), "lotes": 0}
+
+    salida = gzip.open(archivo, "at", encoding="utf-8") if archivo else None
+    borradas, lotes, ultimo = 0, 0, 0
+    try:
+        while True:
+            filas = list(candidatas.filter(id_sesion__gt=ultimo).values(*CAMPOS_ARCHIVO_SESION)[:batch_size])
+            if not filas:
+                break
+            if salida is not None:
+                for f in filas:
+                    salida.write(json.dumps(f, default=str, ensure_ascii=False) + "\n")
+                salida.flush()
+            ids = [f["id_sesion"] for f in filas]
+            with transaction.atomic():
+                borradas += SesionUsuario.objects.filter(id_sesion__in=ids).delete()[0]
+            ultimo = ids[-1]
+            lotes += 1
+    finally:
+        if salida is not None:
+            salida.close()
+
+    return {"sesiones_borradas": borradas, "candidatas": borradas, "lotes": lotes}
@@ -0,0 +1,51 @@
+# ============================================
+# Aplicaciones/usuarios/signals.py
+# ============================================
+# Versiones de cache (backend/cache.py) del perfil de usuario: cambia con
+# el usuario o con su foto. También limpia el estado cacheado por
+# JWTSinConsultaAuthentication y recalcula el embedding facial cuando
+# cambia la foto de perfil.
+# ============================================
+import logging
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from backend.cache import versionar_modelo
+from Aplicaciones.monitoreo import identidad
+
+from .autenticacion import olvidar_estado
+from .models import FotoPerfil, Usuario
+
+versionar_modelo(Usuario)
+versionar_modelo(FotoPerfil, alcances=lambda f: [("usuarios.Usuario", f.usuario_id)])
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def _olvidar_estado_auth(sender, instance, **kwargs):
+    # en este proceso el cambio de rol/activo aplica de inmediato;
+    # en los demás, al vencer AUTH_ESTADO_CACHE_TTL
+    olvidar_estado(instance.pk)
+
+
+@receiver(pre_save, sender=FotoPerfil)
+def _embedding_foto_perfil(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and "foto" not in update_fields:
+        return
+    anterior = None
+    if instance.pk:
+        anterior = FotoPerfil.objects.filter(pk=instance.pk).values_list("foto", flat=True).first()
+    if (instance.foto.name or "") == (anterior or ""):
+        return
+
+    # foto nueva: la referencia anterior ya no vale
+    instance.embedding = None
+    if instance.foto:
+        try:
+            vec = identidad.embedding_de_archivo(instance.foto)
+        except Exception:
+            logging.getLogger("django").exception("[foto-perfil] no se pudo calcular el embedding")
+            vec = None
+        if vec is not None:
+            instance.embedding = identidad.embedding_bytes(vec)
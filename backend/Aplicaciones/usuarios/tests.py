@@ -1,3 +1,237 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from PIL import Image
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from Aplicaciones.monitoreo import identidad
+
+from .management.commands import purgar_sesiones as comando_purgar
+from .models import CargaMasivaUsuarios, FotoPerfil, SesionUsuario, Usuario
+from .services import purgar_sesiones
+
+URL_CARGA = "/api/usuarios/usuarios/carga-masiva/"
+
+
+def csv_usuarios(n, inicio=0):
+    filas = [
+        f"09{i:08d},Nombre{i},Apellido,u{i}@test.com,Clave.Segura.2024"
+        for i in range(inicio, inicio + n)
+    ]
+    return ("cedula,nombres,apellidos,correo_electronico,password\n" + "\n".join(filas)).encode("utf-8")
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"], USUARIOS_CARGA_MAX_FILAS=10)
+class CargaMasivaTests(TransactionTestCase):
+    def setUp(self):
+        self.admin = Usuario.objects.create_user(
+            correo_electronico="admin@test.com", cedula="0000000001", password="x",
+            nombres="Ad", apellidos="Min", rol="ADMIN",
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.admin)
+
+    def _subir(self, contenido, query=""):
+        return self.api.post(URL_CARGA + query, {"archivo": SimpleUploadedFile("u.csv", contenido)}, format="multipart")
+
+    def _esperar(self, url, timeout=10.0):
+        fin = time.monotonic() + timeout
+        while time.monotonic() < fin:
+            data = self.api.get(url).data
+            if data["terminado"]:
+                return data
+            time.sleep(0.05)
+        self.fail("La carga no terminó a tiempo.")
+
+    def test_encola_y_responde_202_con_url_de_estado(self):
+        r = self._subir(csv_usuarios(3) + b"\n0900000000,Otro,Apellido,otro@test.com,Clave.Segura.2024")
+        self.assertEqual(r.status_code, 202)
+        self.assertEqual(r.data["estado"], "PROCESANDO")
+
+        estado = self._esperar(r.data["estado_url"])
+        self.assertEqual(estado["estado"], "COMPLETADA")
+        self.assertEqual(estado["resultado"]["creados"], 3)
+        self.assertEqual(estado["resultado"]["errores"][0]["fila"], 5)
+        self.assertTrue(Usuario.objects.get(cedula="0900000002").check_password("Clave.Segura.2024"))
+
+    def test_dry_run_es_sincrono_y_no_crea(self):
+        r = self._subir(csv_usuarios(3), "?dry_run=1")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r.data["validos"], 3)
+        self.assertEqual(Usuario.objects.count(), 1)
+        self.assertFalse(CargaMasivaUsuarios.objects.exists())
+
+    def test_rechaza_archivos_sobre_el_maximo(self):
+        r = self._subir(csv_usuarios(11))
+        self.assertEqual(r.status_code, 400)
+        self.assertIn("aprovisionar_usuarios", r.data["error"])
+        self.assertFalse(CargaMasivaUsuarios.objects.exists())
+
+    def test_carga_huerfana_termina_en_error(self):
+        carga = CargaMasivaUsuarios.objects.create(creado_por=self.admin, total_filas=5)
+        CargaMasivaUsuarios.objects.filter(pk=carga.pk).update(fecha_creacion=timezone.now() - timedelta(hours=2))
+        with self.settings(USUARIOS_CARGA_TIMEOUT=60):
+            estado = self.api.get(f"{URL_CARGA}{carga.pk}/").data
+        self.assertEqual(estado["estado"], "ERROR")
+        self.assertTrue(estado["terminado"])
+
+
+@override_settings(SESIONES_LIMITE_DEFAULT=2, SESIONES_LIMITE_MAXIMO=3)
+class MisSesionesTests(TestCase):
+    def setUp(self):
+        self.usuario = Usuario.objects.create_user(
+            correo_electronico="est@test.com", cedula="0000000002", password="x",
+            nombres="Est", apellidos="Udiante", rol="ESTUDIANTE",
+        )
+        SesionUsuario.objects.bulk_create([
+            SesionUsuario(usuario=self.usuario, token_hash=f"{i:064d}", expira_en=timezone.now() + timedelta(days=1))
+            for i in range(5)
+        ])
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+
+    def test_sin_limite_devuelve_una_pagina_acotada(self):
+        r = self.api.get("/api/usuarios/sesiones/mis/")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(len(r.data["sesiones"]), 2)
+        self.assertEqual(r.data["limite"], 2)
+        self.assertIsNotNone(r.data["siguiente"])
+
+    def test_limite_del_cliente_no_pasa_del_maximo(self):
+        r = self.api.get("/api/usuarios/sesiones/mis/?limite=1000")
+        self.assertEqual(len(r.data["sesiones"]), 3)
+
+        vistas = [s["id_sesion"] for s in r.data["sesiones"]]
+        r = self.api.get(f"/api/usuarios/sesiones/mis/?cursor={r.data['siguiente']}")
+        vistas += [s["id_sesion"] for s in r.data["sesiones"]]
+        self.assertEqual(len(set(vistas)), 5)
+        self.assertIsNone(r.data["siguiente"])
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    THROTTLE_RAFAGA={"login": 2},
+)
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_login_por_ip_responde_429_al_agotar_la_rafaga(self):
+        api = APIClient(REMOTE_ADDR="10.1.1.1")
+        credenciales = {"correo_electronico": "nadie@test.com", "password": "mala"}
+        codigos = [api.post("/api/token/", credenciales, format="json").status_code for _ in range(2)]
+        self.assertNotIn(429, codigos)
+
+        r = api.post("/api/token/", credenciales, format="json")
+        self.assertEqual(r.status_code, 429)
+        self.assertIn("Retry-After", r.headers)
+
+        # otra IP tiene su propio bucket
+        otra = APIClient(REMOTE_ADDR="10.1.1.2")
+        self.assertNotEqual(otra.post("/api/token/", credenciales, format="json").status_code, 429)
+
+
+class FotoValidacionTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media, ignore_errors=True)
+        self.usuario = Usuario.objects.create_user(
+            correo_electronico="est@test.com", cedula="0000000003", password="x",
+            nombres="Est", apellidos="Udiante", rol="ESTUDIANTE",
+        )
+        self.api = APIClient()
+        self.api.force_authenticate(self.usuario)
+
+    def _subir(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (8, 8)).save(buffer, format="PNG")
+        archivo = SimpleUploadedFile("v.png", buffer.getvalue(), content_type="image/png")
+        # rostro detectado pero distinto de la referencia (vectores ortogonales)
+        vivo, ref = np.eye(identidad.DIM, dtype=np.float32)[:2]
+        with self.settings(MEDIA_ROOT=self.media), \
+                mock.patch.object(identidad, "embedding_de_archivo", return_value=vivo), \
+                mock.patch.object(identidad, "referencia_de_foto", return_value=ref):
+            return self.api.post("/api/usuarios/foto-perfil/validacion/", {"foto_validacion": archivo}, format="multipart")
+
+    def test_no_coincidir_no_bloquea_y_queda_la_similitud(self):
+        r = self._subir()
+        self.assertEqual(r.status_code, 200, r.data)
+        self.assertTrue(r.data["validada"])
+        self.assertIs(r.data["coincide"], False)
+        foto = FotoPerfil.objects.get(usuario=self.usuario)
+        self.assertTrue(foto.validada)
+        self.assertEqual(foto.similitud_validacion, 0.0)
+
+    @override_settings(MONITOREO_IDENTIDAD_VALIDACION_ESTRICTA=True)
+    def test_modo_estricto_rechaza(self):
+        r = self._subir()
+        self.assertFalse(r.data["validada"])
+        self.assertEqual(r.data["mensaje"], "El rostro no coincide con el registrado")
+
+
+@override_settings(SESIONES_RETENCION_DIAS=30)
+class PurgarSesionesTests(TestCase):
+    def setUp(self):
+        usuario = Usuario.objects.create_user(
+            correo_electronico="est@test.com", cedula="0000000004", password="x",
+            nombres="Est", apellidos="Udiante", rol="ESTUDIANTE",
+        )
+        ahora = timezone.now()
+        vencimientos = [-40, -40, -31, -10, 1]  # días respecto de hoy
+        SesionUsuario.objects.bulk_create([
+            SesionUsuario(usuario=usuario, token_hash=f"{i:064d}", expira_en=ahora + timedelta(days=d), activo=d > 0)
+            for i, d in enumerate(vencimientos)
+        ])
+        self.viejas = list(
+            SesionUsuario.objects.filter(expira_en__lt=ahora - timedelta(days=30)).values_list("id_sesion", flat=True)
+        )
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp, ignore_errors=True)
+        # dentro de la transacción del TestCase cerraría la conexión de prueba
+        parche = mock.patch.object(comando_purgar, "close_old_connections")
+        parche.start()
+        self.addCleanup(parche.stop)
+
+    def test_borra_por_lotes_y_archiva_antes(self):
+        archivo = os.path.join(self.tmp, "sesiones.jsonl.gz")
+        resumen = purgar_sesiones(batch_size=2, archivo=archivo)
+
+        self.assertEqual(resumen, {"sesiones_borradas": 3, "candidatas": 3, "lotes": 2})
+        self.assertEqual(SesionUsuario.objects.count(), 2)
+        with gzip.open(archivo, "rt", encoding="utf-8") as f:
+            archivadas = [json.loads(linea) for linea in f]
+        self.assertEqual(sorted(a["id_sesion"] for a in archivadas), sorted(self.viejas))
+        self.assertNotIn("token_hash", archivadas[0])
+
+        # idempotente: una segunda pasada no encuentra nada
+        self.assertEqual(purgar_sesiones()["sesiones_borradas"], 0)
+
+    def test_comando_dry_run_solo_cuenta(self):
+        salida = io.StringIO()
+        call_command("purgar_sesiones", "--dry-run", stdout=salida)
+        self.assertIn("sesiones_borradas=0 candidatas=3", salida.getvalue())
+        self.assertEqual(SesionUsuario.objects.count(), 5)
+
+    def test_comando_con_dias_y_intervalo(self):
+        salida = io.StringIO()
+        # el worker duerme entre barridos; cortamos el bucle en la primera espera
+        with mock.patch.object(comando_purgar.time, "sleep", side_effect=InterruptedError) as dormir:
+            with self.assertRaises(InterruptedError):
+                call_command("purgar_sesiones", "--dias", "5", "--intervalo", "3600", stdout=salida)
+        dormir.assert_called_once_with(3600)
+        self.assertIn("sesiones_borradas=4", salida.getvalue())
+        self.assertEqual(SesionUsuario.objects.count(), 1)
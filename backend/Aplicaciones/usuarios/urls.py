@@ -8,6 +8,8 @@ from .views import (
     LoginUsuarioView,
     LogoutUsuarioView,
     ListaUsuariosView,
+    CargaMasivaUsuariosView,
+    EstadoCargaMasivaView,
     ObtenerUsuarioView,
     ActualizarUsuarioView,
     EliminarUsuarioView,
@@ -27,6 +29,8 @@ urlpatterns = [
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
     path('usuarios/', ListaUsuariosView.as_view(), name='lista'),
+    path('usuarios/carga-masiva/', CargaMasivaUsuariosView.as_view(), name='carga_masiva'),
+    path('usuarios/carga-masiva/<int:id>/', EstadoCargaMasivaView.as_view(), name='carga_masiva_estado'),
     path('usuarios/<int:id>/', ObtenerUsuarioView.as_view(), name='obtener'),
     path('usuarios/<int:id>/actualizar/', ActualizarUsuarioView.as_view(), name='actualizar'),
     path('usuarios/<int:id>/eliminar/', EliminarUsuarioView.as_view(), name='eliminar'),
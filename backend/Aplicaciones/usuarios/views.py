@@ -1,21 +1,26 @@
 # ============================================
 # Aplicaciones/usuarios/views.py
 # ============================================
+import logging
 from datetime import timedelta
 
+from django.conf import settings
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import authenticate
 
 from rest_framework import status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.parsers import MultiPartParser
 
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
 
-from .models import Usuario, FotoPerfil, SesionUsuario
+from .models import Usuario, FotoPerfil, SesionUsuario, CargaMasivaUsuarios
 from .serializers import (
     UsuarioSerializer,
     RegistroUsuarioSerializer,
@@ -25,6 +30,15 @@ from .serializers import (
     SesionUsuarioSerializer,
 )
 from .permissions import IsAdmin, IsAdminOrDocente
+from .autenticacion import tokens_para
+from .aprovisionamiento import aprovisionar_usuarios, leer_csv
+from .jobs import encolar_carga, liberar_carga_atascada
+from backend.cache import cache_vista
+from backend.paginacion import PaginacionCursor
+from backend.throttling import LoginThrottle
+from Aplicaciones.monitoreo import identidad
+
+logger = logging.getLogger("django")
 
 
 class RegistroUsuarioView(APIView):
@@ -43,6 +57,7 @@ class RegistroUsuarioView(APIView):
 
 class LoginUsuarioView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [LoginThrottle]
 
     def post(self, request):
         correo_electronico = request.data.get('correo_electronico')
@@ -52,7 +67,7 @@ class LoginUsuarioView(APIView):
         if not usuario:
             return Response({'error': 'Credenciales incorrectas'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        refresh = RefreshToken.for_user(usuario)
+        refresh = tokens_para(usuario)
         access = refresh.access_token
 
         # Registrar sesión activa con hash del refresh token
@@ -107,22 +122,105 @@ class LogoutUsuarioView(APIView):
         return Response({'mensaje': 'Sesión cerrada exitosamente'}, status=status.HTTP_200_OK)
 
 
+class CargaMasivaUsuariosView(APIView):
+    """
+    POST /api/usuarios/usuarios/carga-masiva/  (multipart, campo 'archivo')
+    CSV: cedula, nombres, apellidos, correo_electronico, password [, rol]
+
+    - ?dry_run=1 solo valida (sin hash): responde 200 con los errores por fila.
+    - Si no, la carga se encola (jobs.py) y responde 202 con "estado_url";
+      el resultado (creados + errores por fila) se consulta ahí.
+    Hasta USUARIOS_CARGA_MAX_FILAS filas por archivo; cargas mayores con
+    el comando aprovisionar_usuarios.
+    """
+    permission_classes = [IsAuthenticated, IsAdminOrDocente]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        archivo = request.FILES.get('archivo')
+        if not archivo:
+            return Response({'error': "Se requiere el campo 'archivo' (CSV)."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            filas = leer_csv(archivo)
+        except (ValueError, UnicodeDecodeError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        maximo = int(getattr(settings, 'USUARIOS_CARGA_MAX_FILAS', 2000))
+        if len(filas) > maximo:
+            return Response(
+                {'error': f"El archivo tiene {len(filas)} filas; el máximo por carga es {maximo}. "
+                          "Divídelo o usa el comando aprovisionar_usuarios."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # el docente solo da de alta estudiantes
+        roles = None if request.user.rol == 'ADMIN' else {'ESTUDIANTE'}
+
+        if str(request.query_params.get('dry_run', '')).lower() in ('1', 'true'):
+            return Response(aprovisionar_usuarios(filas, roles_permitidos=roles, dry_run=True))
+
+        carga = CargaMasivaUsuarios.objects.create(
+            creado_por=request.user, archivo_nombre=archivo.name[:255], total_filas=len(filas)
+        )
+        encolar_carga(carga.id_carga, filas, roles)
+        return Response(
+            {
+                'id_carga': carga.id_carga,
+                'estado': carga.estado,
+                'total_filas': carga.total_filas,
+                'estado_url': reverse('usuarios:carga_masiva_estado', args=[carga.id_carga]),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+class EstadoCargaMasivaView(APIView):
+    """GET /api/usuarios/usuarios/carga-masiva/<id>/ : estado y resultado de una carga encolada."""
+    permission_classes = [IsAuthenticated, IsAdminOrDocente]
+
+    def get(self, request, id):
+        carga = get_object_or_404(CargaMasivaUsuarios, id_carga=id)
+        if request.user.rol != 'ADMIN' and carga.creado_por_id != request.user.id_usuario:
+            raise PermissionDenied("No tienes permiso para ver esta carga.")
+
+        # si el worker murió, la consulta termina en ERROR en vez de esperar para siempre
+        if liberar_carga_atascada(carga):
+            carga.refresh_from_db()
+
+        return Response({
+            'id_carga': carga.id_carga,
+            'estado': carga.estado,
+            'terminado': carga.estado != 'PROCESANDO',
+            'archivo_nombre': carga.archivo_nombre,
+            'total_filas': carga.total_filas,
+            'resultado': carga.resultado or None,
+            'error': carga.error or None,
+            'fecha_creacion': carga.fecha_creacion,
+            'fecha_fin': carga.fecha_fin,
+        })
+
+
 class ListaUsuariosView(APIView):
     # Cambia aquí si quieres que SOLO admin liste usuarios
     permission_classes = [IsAuthenticated, IsAdminOrDocente]
 
     def get(self, request):
         rol = request.query_params.get('rol')
-        usuarios = Usuario.objects.all().order_by('id_usuario')
+        usuarios = Usuario.objects.all()
         if rol:
             usuarios = usuarios.filter(rol=rol)
-        serializer = UsuarioSerializer(usuarios, many=True)
-        return Response({'total': usuarios.count(), 'usuarios': serializer.data}, status=status.HTTP_200_OK)
+        return PaginacionCursor(('id_usuario',)).responder(request, usuarios, UsuarioSerializer, 'usuarios')
 
 
 class PerfilUsuarioView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @cache_vista(
+        "usuarios:perfil",
+        modelos=[lambda request: ("usuarios.Usuario", request.user.pk)],
+        variar_por=("usuario",),
+    )
     def get(self, request):
         serializer = UsuarioSerializer(request.user)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -183,9 +281,12 @@ class SubirFotoValidacionView(APIView):
 
     def post(self, request):
         """
-        Subida de foto de validación:
-        - Para tu flujo actual: con solo subir la foto ya se habilita el intento.
-        - Por eso marcamos validada=True al guardar la foto_validacion.
+        Subida de foto de validación: con solo subirla se habilita el intento
+        (validada=True). El rostro se compara con la referencia del
+        estudiante (embedding de la foto de perfil; sin foto de perfil, la
+        primera validación queda como referencia) y la similitud se guarda
+        para el docente. Solo con MONITOREO_IDENTIDAD_VALIDACION_ESTRICTA
+        validada exige rostro detectado y similitud >= MONITOREO_IDENTIDAD_UMBRAL.
         """
         foto_perfil, _ = FotoPerfil.objects.get_or_create(usuario=request.user)
 
@@ -197,15 +298,42 @@ class SubirFotoValidacionView(APIView):
 
         obj = serializer.save()
 
-        # ✅ REGLA NUEVA: si existe foto_validacion, entonces "validada" = True
-        if obj.foto_validacion and not obj.validada:
-            obj.validada = True
-            obj.save(update_fields=["validada"])
+        similitud = None
+        rostro_detectado = None
+        coincide = None
+        try:
+            vivo = identidad.embedding_de_archivo(obj.foto_validacion)
+            rostro_detectado = vivo is not None
+            if vivo is not None:
+                resultado = identidad.comparar(identidad.referencia_de_foto(obj, respaldo=vivo), vivo)
+                # coincide=None: la foto de perfil no tiene un rostro utilizable, no hay con qué comparar
+                similitud, coincide = resultado["similitud"], resultado["coincide"]
+        except Exception:
+            # sin modelo de detección queda solo la regla base (subir = validar)
+            logger.exception("[foto-validacion] no se pudo verificar el rostro")
+
+        validada = bool(obj.foto_validacion)
+        if getattr(settings, "MONITOREO_IDENTIDAD_VALIDACION_ESTRICTA", False) and rostro_detectado is not None:
+            validada = rostro_detectado and coincide is not False
+
+        obj.validada = validada
+        obj.similitud_validacion = similitud
+        obj.save(update_fields=["validada", "similitud_validacion"])
+
+        if validada:
+            mensaje = "Foto de validación subida correctamente"
+        elif rostro_detectado:
+            mensaje = "El rostro no coincide con el registrado"
+        else:
+            mensaje = "No se detectó un rostro de frente en la foto"
 
         return Response(
             {
-                "mensaje": "Foto de validación subida correctamente",
+                "mensaje": mensaje,
                 "validada": obj.validada,
+                "rostro_detectado": rostro_detectado,
+                "similitud": similitud,
+                "coincide": coincide,
                 "foto_validacion": obj.foto_validacion.url if obj.foto_validacion else None,
             },
             status=status.HTTP_200_OK,
@@ -216,8 +344,14 @@ class MisSesionesView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        sesiones = SesionUsuario.objects.filter(usuario=request.user).order_by("-creado_en")
-        return Response(SesionUsuarioSerializer(sesiones, many=True).data, status=status.HTTP_200_OK)
+        """Sesiones activas y vigentes, siempre paginadas por cursor (?limite, ?cursor)."""
+        sesiones = SesionUsuario.objects.filter(usuario=request.user, activo=True, expira_en__gt=timezone.now())
+        paginacion = PaginacionCursor(
+            ('-creado_en', '-id_sesion'),
+            limite_default=getattr(settings, 'SESIONES_LIMITE_DEFAULT', 20),
+            limite_maximo=getattr(settings, 'SESIONES_LIMITE_MAXIMO', 100),
+        )
+        return paginacion.responder(request, sesiones, SesionUsuarioSerializer, 'sesiones')
 
 
 class CerrarTodasMisSesionesView(APIView):
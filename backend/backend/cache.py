@@ -0,0 +1,270 @@
+# ============================================
+# backend/cache.py
+# ============================================
+# Utilidades de cache (cache-aside) sobre el cache de Django (Redis en
+# producción, LocMem en desarrollo).
+#
+# 1) Claves versionadas por modelo: cada modelo (y opcionalmente cada fila)
+#    tiene un contador de versión en el cache. La clave de un resultado
+#    incluye las versiones de los modelos de los que depende; al escribir
+#    el modelo se sube la versión y las claves viejas quedan huérfanas
+#    (caducan por TTL). Sin barridos ni delete por patrón.
+#
+#        clave("examen:snapshot", 12, modelos=[("examenes.Examen", 12)])
+#        invalidar("examenes.Examen", 12)
+#        versionar_modelo(Pregunta, alcances=lambda p: [("examenes.Examen", p.examen_id)])
+#
+# 2) Decoradores: @cacheado para funciones de servicio y @cache_vista para
+#    métodos GET de APIView (cachean response.data, no la Response).
+#
+# 3) Single-flight: en un miss solo un proceso calcula (candado con
+#    cache.add, atómico en Redis); el resto espera el valor unos segundos
+#    en vez de golpear la BD a la vez. Con LocMem el candado es por proceso.
+#
+# Fail open (como backend/throttling.py): si el backend de cache falla
+# (Redis caído, timeout) se calcula directo contra la BD y se registra un
+# warning; la petición nunca responde 500 por el cache.
+# ============================================
+import hashlib
+import logging
+import time
+from functools import wraps
+from typing import Callable, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from rest_framework.response import Response
+
+logger = logging.getLogger("django")
+
+_FALTA = object()
+
+
+def cache_activo() -> bool:
+    return bool(getattr(settings, "CACHE_APLICACION_ACTIVO", True))
+
+
+def _ttl(ttl: Optional[int]) -> int:
+    return int(getattr(settings, "CACHE_TTL_DEFAULT", 300) if ttl is None else ttl)
+
+
+def _fallo(operacion: str, e: Exception) -> None:
+    logger.warning("[cache] %s falló, se sigue sin cache: %s", operacion, e)
+
+
+# =========================================================
+# 1) Versiones por modelo
+# =========================================================
+def _clave_version(modelo: str, alcance=None) -> str:
+    return f"v:{modelo}" if alcance is None else f"v:{modelo}:{alcance}"
+
+
+def _version_nueva() -> int:
+    # si el contador se pierde (eviction/reinicio) el nuevo valor nunca
+    # coincide con uno anterior: no resucitan entradas viejas
+    return time.time_ns() // 1000
+
+
+def _dependencia(dep) -> tuple:
+    return (dep, None) if isinstance(dep, str) else (dep[0], dep[1])
+
+
+def versiones(modelos: Iterable) -> list:
+    """Versión actual de cada dependencia ("label" o ("label", alcance))."""
+    claves = [_clave_version(*_dependencia(d)) for d in modelos]
+    if not claves:
+        return []
+    try:
+        actuales = cache.get_many(claves)
+        faltantes = {c: _version_nueva() for c in claves if c not in actuales}
+        for c, v in faltantes.items():
+            # add: si otro proceso la creó primero, gana la suya
+            if not cache.add(c, v, timeout=None):
+                faltantes[c] = cache.get(c, v)
+    except Exception as e:
+        # versiones nuevas: la clave no coincide con nada guardado (no se leen valores viejos)
+        _fallo("versiones", e)
+        return [_version_nueva() for _ in claves]
+    return [actuales.get(c, faltantes.get(c)) for c in claves]
+
+
+def invalidar(modelo: str, alcance=None) -> None:
+    """Sube la versión: todo lo cacheado que dependía de ella deja de leerse."""
+    c = _clave_version(modelo, alcance)
+    try:
+        try:
+            cache.incr(c)
+        except ValueError:
+            cache.set(c, _version_nueva(), timeout=None)
+    except Exception as e:
+        # no tumbar la escritura que disparó la señal; lo cacheado caduca por TTL
+        _fallo(f"invalidar {c}", e)
+
+
+def clave(prefijo: str, *partes, modelos: Iterable = ()) -> str:
+    """prefijo:<partes>:<versiones>; las partes largas se resumen con sha1."""
+    modelos = list(modelos)
+    cuerpo = ":".join(str(p) for p in partes)
+    if len(cuerpo) > 150:
+        cuerpo = hashlib.sha1(cuerpo.encode("utf-8")).hexdigest()
+    vers = ".".join(str(v) for v in versiones(modelos))
+    return f"{prefijo}:{cuerpo}:{vers}" if vers else f"{prefijo}:{cuerpo}"
+
+
+def versionar_modelo(modelo, alcances: Optional[Callable] = None) -> None:
+    """
+    Conecta post_save/post_delete de `modelo` para subir la versión de su
+    label, la de la fila (label, pk) y las que devuelva alcances(instance)
+    (p.ej. el examen dueño de una pregunta). Se repite al confirmar la
+    transacción: una lectura concurrente pudo cachear el valor viejo.
+    """
+    label = modelo._meta.label
+
+    def _receptor(sender, instance, **kwargs):
+        deps = [(label, None), (label, instance.pk)]
+        if alcances is not None:
+            deps += [_dependencia(d) for d in alcances(instance) if d]
+
+        def _subir():
+            for m, a in deps:
+                invalidar(m, a)
+
+        _subir()
+        transaction.on_commit(_subir)
+
+    post_save.connect(_receptor, sender=modelo, weak=False, dispatch_uid=f"cache:{label}:save")
+    post_delete.connect(_receptor, sender=modelo, weak=False, dispatch_uid=f"cache:{label}:delete")
+
+
+# =========================================================
+# 2) Single-flight
+# =========================================================
+def obtener_o_calcular(clave_cache: str, calcular: Callable, ttl: Optional[int] = None):
+    """
+    Valor cacheado o calcular() con candado: solo un proceso calcula el
+    miss, los demás esperan hasta CACHE_LOCK_ESPERA segundos y, si el valor
+    no llega, calculan ellos mismos (nunca se bloquea la petición).
+    None también se cachea. Si el cache falla se calcula directo.
+    """
+    candado = f"lock:{clave_cache}"
+    try:
+        valor = cache.get(clave_cache, _FALTA)
+        if valor is not _FALTA:
+            return valor
+        tengo_candado = cache.add(candado, 1, timeout=int(getattr(settings, "CACHE_LOCK_TTL", 30)))
+    except Exception as e:
+        _fallo(f"lectura de {clave_cache}", e)
+        return calcular()
+
+    if tengo_candado:
+        try:
+            valor = calcular()
+            try:
+                cache.set(clave_cache, valor, _ttl(ttl))
+            except Exception as e:
+                _fallo(f"escritura de {clave_cache}", e)
+            return valor
+        finally:
+            try:
+                cache.delete(candado)
+            except Exception as e:
+                _fallo(f"liberar {candado}", e)
+
+    limite = time.monotonic() + float(getattr(settings, "CACHE_LOCK_ESPERA", 5))
+    while time.monotonic() < limite:
+        time.sleep(0.05)
+        try:
+            valor = cache.get(clave_cache, _FALTA)
+        except Exception as e:
+            _fallo(f"lectura de {clave_cache}", e)
+            break
+        if valor is not _FALTA:
+            return valor
+
+    logger.warning("[cache] espera agotada para %s, se calcula sin candado", clave_cache)
+    return calcular()
+
+
+# =========================================================
+# 3) Decoradores
+# =========================================================
+def _resolver(modelos, *args, **kwargs) -> list:
+    # cada dependencia puede ser fija o un callable con los argumentos de la llamada
+    return [m(*args, **kwargs) if callable(m) else m for m in modelos]
+
+
+def cacheado(prefijo: str, ttl: Optional[int] = None, modelos: Iterable = ()):
+    """
+    Cachea el resultado de una función de servicio. Los argumentos forman
+    la clave (deben tener un str() estable: ids, strings, bools).
+
+        @cacheado("examen:clave", modelos=[lambda examen_id: ("examenes.Examen", examen_id)])
+        def clave_respuestas(examen_id): ...
+
+    La función original queda en .sin_cache.
+    """
+    modelos = list(modelos)
+
+    def decorador(fn):
+        @wraps(fn)
+        def envoltura(*args, **kwargs):
+            if not cache_activo():
+                return fn(*args, **kwargs)
+            k = clave(
+                prefijo, *args, *(f"{n}={v}" for n, v in sorted(kwargs.items())),
+                modelos=_resolver(modelos, *args, **kwargs),
+            )
+            return obtener_o_calcular(k, lambda: fn(*args, **kwargs), ttl)
+
+        envoltura.sin_cache = fn
+        return envoltura
+
+    return decorador
+
+
+def cache_vista(prefijo: str, ttl: Optional[int] = None, modelos: Iterable = (), variar_por: Iterable = ("rol",)):
+    """
+    Para métodos GET de APIView: cachea response.data de las respuestas 200
+    por ruta + query string + variar_por ("rol" y/o "usuario").
+    Las dependencias callables reciben (request, *args, **kwargs).
+    """
+    modelos, variar_por = list(modelos), tuple(variar_por)
+
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, request, *args, **kwargs):
+            if not cache_activo():
+                return metodo(self, request, *args, **kwargs)
+
+            user = request.user
+            partes = [request.get_full_path()]
+            if "rol" in variar_por:
+                partes.append(getattr(user, "rol", None) or "-")
+            if "usuario" in variar_por:
+                partes.append(getattr(user, "pk", None) or "-")
+            k = clave(prefijo, *partes, modelos=_resolver(modelos, request, *args, **kwargs))
+
+            respuesta = None
+
+            def _calcular():
+                nonlocal respuesta
+                respuesta = metodo(self, request, *args, **kwargs)
+                if respuesta.status_code != 200:
+                    raise _NoCachear
+                return respuesta.data
+
+            try:
+                data = obtener_o_calcular(k, _calcular, ttl)
+            except _NoCachear:
+                return respuesta
+            return respuesta if respuesta is not None else Response(data)
+
+        return envoltura
+
+    return decorador
+
+
+class _NoCachear(Exception):
+    pass
@@ -0,0 +1,161 @@
+# ============================================
+# backend/paginacion.py
+# ============================================
+# Paginación por cursor (keyset) para los listados de las APIView.
+#
+# En vez de OFFSET, cada página filtra "después de la última fila vista"
+# sobre columnas indexadas (p.ej. -fecha, -id): el costo es O(página) sin
+# importar en qué página se esté. El cursor es opaco (base64 de los
+# valores de orden de la última fila).
+#
+# Sin ?limite ni ?cursor la respuesta es el listado completo, como antes de
+# paginar (los consumidores que no siguen "siguiente" no pierden filas),
+# salvo que la vista fije limite_default: entonces siempre pagina.
+#
+# Query params:
+#   ?limite=N        activa la paginación: tamaño de página (máx. API_LIMITE_MAXIMO)
+#   ?cursor=...      valor de "siguiente" de la respuesta anterior
+#                    (sin ?limite usa API_LIMITE_DEFAULT)
+#   ?total=estimado  (default) conteo estimado por el planner de PostgreSQL
+#   ?total=exacto    COUNT(*) real
+#   ?total=no        sin conteo
+#
+# Respuesta: {"total", "total_estimado", "siguiente", "<clave>": [...]}
+# ============================================
+import base64
+import json
+from typing import Optional, Sequence
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+def _limite(request, default: Optional[int] = None, maximo: Optional[int] = None) -> Optional[int]:
+    """
+    Tamaño de página; None si el cliente no pidió paginar (listado
+    completo). Con `default` la paginación es obligatoria.
+    """
+    forzado = default is not None
+    default = int(default if forzado else getattr(settings, "API_LIMITE_DEFAULT", 100))
+    maximo = int(maximo if maximo is not None else getattr(settings, "API_LIMITE_MAXIMO", 500))
+    valor = request.query_params.get("limite")
+    if valor in (None, ""):
+        return min(default, maximo) if forzado or request.query_params.get("cursor") else None
+    try:
+        return max(1, min(maximo, int(valor)))
+    except (TypeError, ValueError):
+        raise ValidationError({"limite": "Debe ser un entero."})
+
+
+def contar_estimado(qs) -> int:
+    """
+    Filas estimadas por el planner (EXPLAIN) en PostgreSQL: no recorre la
+    tabla. En otros motores hace el COUNT(*) normal.
+    """
+    qs = qs.order_by()
+    conexion = connections[qs.db]
+    if conexion.vendor != "postgresql":
+        return qs.count()
+
+    sql, params = qs.values("pk").query.sql_with_params()
+    with conexion.cursor() as c:
+        c.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = c.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class PaginacionCursor:
+    """
+    orden: columnas de ordenamiento; la última debe ser única (la PK) para
+    que el cursor no repita ni salte filas con valores iguales.
+
+        pag = PaginacionCursor(("-fecha", "-id_advertencia"))
+        return pag.responder(request, qs, AdvertenciaSerializer, "advertencias")
+
+    limite_default / limite_maximo: página obligatoria y su tope para
+    listados que nunca deben devolverse completos.
+    """
+
+    def __init__(self, orden: Sequence[str], limite_default: Optional[int] = None,
+                 limite_maximo: Optional[int] = None):
+        self.orden = tuple(orden)
+        self.campos = [o.lstrip("-") for o in self.orden]
+        self.limite_default = limite_default
+        self.limite_maximo = limite_maximo
+
+    # ---------------------------------------------------------
+    # Cursor
+    # ---------------------------------------------------------
+    def _codificar(self, obj) -> str:
+        valores = [getattr(obj, c) for c in self.campos]
+        raw = json.dumps([v.isoformat() if hasattr(v, "isoformat") else v for v in valores])
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def _decodificar(self, cursor: str, modelo) -> list:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            valores = json.loads(raw)
+            if not isinstance(valores, list) or len(valores) != len(self.campos):
+                raise ValueError
+            return [modelo._meta.get_field(c).to_python(v) for c, v in zip(self.campos, valores)]
+        except Exception:
+            raise ValidationError({"cursor": "Cursor inválido."})
+
+    def _despues_de(self, valores: list) -> Q:
+        """(a, b, c) "después de" (va, vb, vc) respetando asc/desc por columna."""
+        q = Q()
+        for i, orden in enumerate(self.orden):
+            op = "lt" if orden.startswith("-") else "gt"
+            paso = Q(**{f"{self.campos[i]}__{op}": valores[i]})
+            for j in range(i):
+                paso &= Q(**{self.campos[j]: valores[j]})
+            q |= paso
+        return q
+
+    # ---------------------------------------------------------
+    # API
+    # ---------------------------------------------------------
+    def paginar(self, request, qs):
+        """(filas de la página, metadatos de paginación)."""
+        limite = _limite(request, self.limite_default, self.limite_maximo)
+        base = qs.order_by(*self.orden)
+
+        if limite is None:
+            filas = list(base)
+            return filas, {"total": len(filas), "total_estimado": False, "siguiente": None, "limite": None}
+
+        pagina = base
+        cursor = request.query_params.get("cursor")
+        if cursor:
+            pagina = base.filter(self._despues_de(self._decodificar(cursor, qs.model)))
+
+        filas = list(pagina[:limite + 1])
+        hay_mas = len(filas) > limite
+        filas = filas[:limite]
+
+        modo = (request.query_params.get("total") or "estimado").lower()
+        total, estimado = None, False
+        if modo in ("exacto", "true", "1"):
+            total = base.count()
+        elif modo not in ("no", "false", "0"):
+            if not cursor and not hay_mas:
+                total = len(filas)  # la primera página ya es todo
+            else:
+                total, estimado = contar_estimado(base), True
+
+        return filas, {
+            "total": total,
+            "total_estimado": estimado,
+            "siguiente": self._codificar(filas[-1]) if hay_mas else None,
+            "limite": limite,
+        }
+
+    def responder(self, request, qs, serializer_class, clave: str, context: Optional[dict] = None):
+        filas, meta = self.paginar(request, qs)
+        data = serializer_class(filas, many=True, context={"request": request, **(context or {})}).data
+        return Response({**meta, clave: data})
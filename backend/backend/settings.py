@@ -20,6 +20,65 @@ LLM_FALLBACK_MODELS = os.getenv("LLM_FALLBACK_MODELS", "")
 OPENROUTER_REFERER = os.getenv("OPENROUTER_REFERER", "")
 OPENROUTER_TITLE = os.getenv("OPENROUTER_TITLE", "")
 
+# Cliente LLM: pool compartido, reintentos (429/5xx) y límite de concurrencia
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "True").lower() in ("1", "true", "yes")
+
+# Generación IA en segundo plano (worker en proceso)
+IA_GENERACION_WORKERS = int(os.getenv("IA_GENERACION_WORKERS", "2"))
+IA_GENERACION_SINCRONA = os.getenv("IA_GENERACION_SINCRONA", "False").lower() in ("1", "true", "yes")
+# Segundos tras los que un examen en GENERANDO se da por huérfano (reinicio/caída del worker)
+IA_GENERACION_TIMEOUT = int(os.getenv("IA_GENERACION_TIMEOUT", "900"))
+
+# Exámenes grandes: se generan en lotes paralelos de IA_PREGUNTAS_POR_LOTE
+IA_PREGUNTAS_POR_LOTE = int(os.getenv("IA_PREGUNTAS_POR_LOTE", "10"))
+IA_LOTES_CONCURRENCIA = int(os.getenv("IA_LOTES_CONCURRENCIA", "4"))
+IA_RONDAS_COMPLEMENTO = int(os.getenv("IA_RONDAS_COMPLEMENTO", "2"))
+
+# Streaming: valida cada pregunta al llegar y re-pide si el stream se sale del esquema
+IA_STREAMING = os.getenv("IA_STREAMING", "True").lower() in ("1", "true", "yes")
+IA_STREAM_REINTENTOS = int(os.getenv("IA_STREAM_REINTENTOS", "2"))
+
+# Rondas de reparación dirigida (solo las preguntas inválidas) antes de fallar
+IA_RONDAS_REPARACION = int(os.getenv("IA_RONDAS_REPARACION", "2"))
+
+# Cache persistente de respuestas del LLM (prompt + modelo + temperatura)
+IA_CACHE_ACTIVO = os.getenv("IA_CACHE_ACTIVO", "True").lower() in ("1", "true", "yes")
+IA_CACHE_TTL_HORAS = float(os.getenv("IA_CACHE_TTL_HORAS", "72"))
+IA_CACHE_MAX_ENTRADAS = int(os.getenv("IA_CACHE_MAX_ENTRADAS", "500"))
+
+# Métricas por llamada al LLM (tokens, latencia, modelo que respondió)
+IA_METRICAS_ACTIVO = os.getenv("IA_METRICAS_ACTIVO", "True").lower() in ("1", "true", "yes")
+IA_METRICAS_RETENCION_DIAS = int(os.getenv("IA_METRICAS_RETENCION_DIAS", "30"))
+
+# Banco de preguntas: similitud MinHash a partir de la cual dos enunciados son "el mismo"
+BANCO_UMBRAL_SIMILITUD = float(os.getenv("BANCO_UMBRAL_SIMILITUD", "0.7"))
+BANCO_RECHAZAR_DUPLICADAS = os.getenv("BANCO_RECHAZAR_DUPLICADAS", "True").lower() in ("1", "true", "yes")
+BANCO_INDICE_TTL = int(os.getenv("BANCO_INDICE_TTL", "300"))
+
+# Cache (segundos) del listado materias-con-examenes, por rol; 0 = sin cache
+EXAMENES_LISTADO_CACHE_TTL = int(os.getenv("EXAMENES_LISTADO_CACHE_TTL", "60"))
+
+# ConfiguracionMonitoreo: cache compartido (s) + LRU local por proceso (s / entradas)
+MONITOREO_CONFIG_CACHE_TTL = int(os.getenv("MONITOREO_CONFIG_CACHE_TTL", "300"))
+MONITOREO_CONFIG_LRU_TTL = float(os.getenv("MONITOREO_CONFIG_LRU_TTL", "5"))
+MONITOREO_CONFIG_LRU_MAX = int(os.getenv("MONITOREO_CONFIG_LRU_MAX", "1024"))
+
+# Identidad facial: similitud mínima con la referencia, segundos entre
+# verificaciones en analizar-frame (0 = desactivado) y vigencia del último
+# rostro en vivo para el cruce 1:N por examen
+MONITOREO_IDENTIDAD_UMBRAL = float(os.getenv("MONITOREO_IDENTIDAD_UMBRAL", "0.985"))
+MONITOREO_IDENTIDAD_INTERVALO = int(os.getenv("MONITOREO_IDENTIDAD_INTERVALO", "30"))
+MONITOREO_IDENTIDAD_VIVO_TTL = int(os.getenv("MONITOREO_IDENTIDAD_VIVO_TTL", "900"))
+# La foto de validación solo se rechaza por similitud si se activa (por
+# defecto subirla valida y la similitud queda para el docente). Cuentas
+# "duplicadas" solo por encima de un umbral más estricto, y como mucho N pares.
+MONITOREO_IDENTIDAD_VALIDACION_ESTRICTA = os.getenv("MONITOREO_IDENTIDAD_VALIDACION_ESTRICTA", "false").lower() in ("1", "true")
+MONITOREO_IDENTIDAD_UMBRAL_DUPLICADOS = float(os.getenv("MONITOREO_IDENTIDAD_UMBRAL_DUPLICADOS", "0.998"))
+MONITOREO_IDENTIDAD_MAX_DUPLICADOS = int(os.getenv("MONITOREO_IDENTIDAD_MAX_DUPLICADOS", "50"))
+
 # =========================================================
 # 1) CONFIDENCIALIDAD
 # =========================================================
@@ -104,8 +163,31 @@ SIMPLE_JWT = {
 
     'AUTH_HEADER_TYPES': ('Bearer',),
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
+
+    # /api/token/ agrega los claims rol y nombre (igual que el login)
+    'TOKEN_OBTAIN_SERIALIZER': 'Aplicaciones.usuarios.autenticacion.TokenConClaimsSerializer',
 }
 
+# Endpoints de monitoreo: segundos que se confía en el estado (activo/rol)
+# del usuario antes de volver a leerlo de la BD
+AUTH_ESTADO_CACHE_TTL = config('AUTH_ESTADO_CACHE_TTL', default=60, cast=float)
+
+# purgar_sesiones: días que se conserva una sesión después de expirar
+SESIONES_RETENCION_DIAS = config('SESIONES_RETENCION_DIAS', default=30, cast=int)
+
+# MisSesiones: siempre paginado (tamaño por defecto y máximo de ?limite)
+SESIONES_LIMITE_DEFAULT = config('SESIONES_LIMITE_DEFAULT', default=20, cast=int)
+SESIONES_LIMITE_MAXIMO = config('SESIONES_LIMITE_MAXIMO', default=100, cast=int)
+
+# Alta masiva de usuarios: procesos para hashear contraseñas (0 = núcleos de CPU)
+USUARIOS_HASH_PROCESOS = config('USUARIOS_HASH_PROCESOS', default=0, cast=int)
+# Endpoint de carga masiva: filas máximas por archivo (más grandes: comando
+# aprovisionar_usuarios), cargas simultáneas por proceso y segundos tras los
+# que una carga en PROCESANDO se da por perdida (worker reiniciado)
+USUARIOS_CARGA_MAX_FILAS = config('USUARIOS_CARGA_MAX_FILAS', default=2000, cast=int)
+USUARIOS_CARGA_WORKERS = config('USUARIOS_CARGA_WORKERS', default=1, cast=int)
+USUARIOS_CARGA_TIMEOUT = config('USUARIOS_CARGA_TIMEOUT', default=3600, cast=int)
+
 # Logging (base para SIEM: Wazuh puede leer archivos)
 LOGGING = {
     'version': 1,
@@ -185,20 +267,53 @@ REST_FRAMEWORK = {
         'rest_framework.throttling.AnonRateThrottle',
         'rest_framework.throttling.UserRateThrottle',
     ],
-    'DEFAULT_THROTTLE_RATES': {'anon': '100/hour', 'user': '1000/hour'},
+    'DEFAULT_THROTTLE_RATES': {
+        'anon': '100/hour',
+        'user': '1000/hour',
+        # token buckets por endpoint (backend/throttling.py)
+        'frames': config('THROTTLE_FRAMES', default='120/min'),
+        'eventos': config('THROTTLE_EVENTOS', default='120/min'),
+        'login': config('THROTTLE_LOGIN', default='5/min'),
+    },
+}
+
+# Ráfaga (capacidad del bucket) por scope de throttling
+THROTTLE_RAFAGA = {
+    'frames': config('THROTTLE_FRAMES_RAFAGA', default=20, cast=int),
+    'eventos': config('THROTTLE_EVENTOS_RAFAGA', default=60, cast=int),
+    'login': config('THROTTLE_LOGIN_RAFAGA', default=5, cast=int),
 }
 
-# Cache (opcional)
+# Listados paginados por cursor (backend/paginacion.py); sin ?limite ni ?cursor, listado completo
+# (salvo vistas con limite_default propio, p.ej. MisSesiones)
+API_LIMITE_DEFAULT = int(os.getenv("API_LIMITE_DEFAULT", "100"))
+API_LIMITE_MAXIMO = int(os.getenv("API_LIMITE_MAXIMO", "500"))
+
+# Cache: Redis si USE_REDIS_CACHE, si no LocMem (por proceso, solo desarrollo)
 USE_REDIS_CACHE = config('USE_REDIS_CACHE', default=False, cast=bool)
-if USE_REDIS_CACHE and not DEBUG:
+if USE_REDIS_CACHE:
     CACHES = {
         'default': {
             'BACKEND': 'django.core.cache.backends.redis.RedisCache',
             'LOCATION': config('REDIS_URL', default='redis://127.0.0.1:6379/1'),
+            'KEY_PREFIX': config('CACHE_KEY_PREFIX', default='examenes'),
+            'TIMEOUT': config('CACHE_TTL_DEFAULT', default=300, cast=int),
+            'OPTIONS': {
+                # si Redis no responde, fallar rápido en vez de colgar la petición
+                'socket_connect_timeout': config('REDIS_CONNECT_TIMEOUT', default=2, cast=float),
+                'socket_timeout': config('REDIS_SOCKET_TIMEOUT', default=2, cast=float),
+                'health_check_interval': 30,
+            },
         }
     }
 else:
     CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Cache-aside de la aplicación (backend/cache.py)
+CACHE_APLICACION_ACTIVO = config('CACHE_APLICACION_ACTIVO', default=True, cast=bool)
+CACHE_TTL_DEFAULT = config('CACHE_TTL_DEFAULT', default=300, cast=int)
+CACHE_LOCK_TTL = config('CACHE_LOCK_TTL', default=30, cast=int)        # vida máxima del candado single-flight
+CACHE_LOCK_ESPERA = config('CACHE_LOCK_ESPERA', default=5, cast=float)  # espera de los que no tienen el candado
     
 REPORTS_MODE = "internal"
 
@@ -0,0 +1,147 @@
+# ============================================
+# backend/throttling.py
+# ============================================
+# Throttles por endpoint con token bucket (ráfaga + recarga continua).
+#
+# Tasas en REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"][scope] ("120/min") y
+# tamaño de ráfaga en THROTTLE_RAFAGA[scope] (por defecto = la tasa).
+#
+# Con Redis el bucket vive en un hash y se actualiza con un script Lua
+# (EVALSHA): recarga + consumo atómicos en UN round trip, con el reloj de
+# Redis, así que el límite es el mismo con N workers de gunicorn. Sin Redis
+# (desarrollo, LocMem) el bucket vive en el cache de Django bajo un lock
+# del proceso. Si Redis falla se deja pasar la petición (fail-open).
+# ============================================
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle, SimpleRateThrottle
+
+logger = logging.getLogger("django")
+
+_LUA_TOKEN_BUCKET = """
+local capacidad = tonumber(ARGV[1])
+local tasa = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local ahora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+
+local estado = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(estado[1]) or capacidad
+local ts = tonumber(estado[2]) or ahora
+tokens = math.min(capacidad, tokens + math.max(0, ahora - ts) * tasa)
+
+local permitido = 0
+local espera = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    permitido = 1
+else
+    espera = (1 - tokens) / tasa
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(ahora))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacidad / tasa * 1000) + 1000)
+return {permitido, tostring(espera)}
+"""
+
+_scripts = {}
+_lock = threading.Lock()
+
+
+def _script_redis():
+    """Script registrado en el cliente Redis del cache, o None si no es Redis."""
+    # `cache` es un proxy: el isinstance tiene que ir contra el backend real
+    backend = caches["default"]
+    if not isinstance(backend, RedisCache):
+        return None
+    cliente = backend._cache.get_client(write=True)
+    script = _scripts.get(id(cliente))
+    if script is None:
+        script = _scripts[id(cliente)] = cliente.register_script(_LUA_TOKEN_BUCKET)
+    return script
+
+
+def _consumir_local(clave: str, capacidad: float, tasa: float) -> tuple:
+    with _lock:
+        ahora = time.time()
+        tokens, ts = cache.get(clave) or (capacidad, ahora)
+        tokens = min(capacidad, tokens + max(0.0, ahora - ts) * tasa)
+        if tokens >= 1:
+            permitido, espera, tokens = True, 0.0, tokens - 1
+        else:
+            permitido, espera = False, (1 - tokens) / tasa
+        cache.set(clave, (tokens, ahora), int(capacidad / tasa) + 1)
+    return permitido, espera
+
+
+def consumir(clave: str, capacidad: float, tasa: float) -> tuple:
+    """
+    Toma un token del bucket `clave` (capacidad tokens, recarga `tasa`
+    tokens/s). Devuelve (permitido, segundos hasta el próximo token).
+    """
+    script = _script_redis()
+    if script is None:
+        return _consumir_local(clave, capacidad, tasa)
+    try:
+        permitido, espera = script(keys=[cache.make_key(clave)], args=[capacidad, tasa])
+        return bool(int(permitido)), float(espera)
+    except Exception:
+        logger.warning("[throttle] Redis no disponible, se permite la petición", exc_info=True)
+        return True, 0.0
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Base: definir `scope`. La identidad es el usuario autenticado o, si no
+    hay, la IP. Sin tasa configurada para el scope no limita.
+    """
+    scope = None
+
+    def _config(self):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        if not rate:
+            return None, None
+        num, segundos = SimpleRateThrottle.parse_rate(None, rate)
+        capacidad = float(getattr(settings, "THROTTLE_RAFAGA", {}).get(self.scope, num))
+        return max(1.0, capacidad), num / segundos
+
+    def get_identidad(self, request) -> str:
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            return f"u{user.pk}"
+        return f"ip{self.get_ident(request)}"
+
+    def allow_request(self, request, view):
+        capacidad, tasa = self._config()
+        if tasa is None:
+            return True
+        permitido, self._espera = consumir(
+            f"throttle:{self.scope}:{self.get_identidad(request)}", capacidad, tasa
+        )
+        return permitido
+
+    def wait(self):
+        return getattr(self, "_espera", None)
+
+
+class FramesThrottle(TokenBucketThrottle):
+    """analizar-frame: cámara del estudiante durante el examen."""
+    scope = "frames"
+
+
+class EventosThrottle(TokenBucketThrottle):
+    """Eventos de monitoreo (advertencias, cambio de pestaña, etc.)."""
+    scope = "eventos"
+
+
+class LoginThrottle(TokenBucketThrottle):
+    """Login y obtención de tokens: por IP, siempre (aún no hay usuario)."""
+    scope = "login"
+
+    def get_identidad(self, request) -> str:
+        return f"ip{self.get_ident(request)}"
@@ -174,10 +174,25 @@ const examService = {
     return true;
   },
 
-  // POST /api/examenes/<id>/generar-ia/
-  generateExamIA: async (examId, params) => {
-    const { data } = await api.post(`/examenes/${examId}/generar-ia/`, params || {});
-    return data;
+  // POST /api/examenes/<id>/generar-ia/  (202: se genera en segundo plano)
+  // Espera consultando GET /api/examenes/<id>/generar-ia/estado/ hasta que termine.
+  generateExamIA: async (examId, params, { intervalMs = 2000, timeoutMs = 300000 } = {}) => {
+    await api.post(`/examenes/${examId}/generar-ia/`, params || {});
+
+    const inicio = Date.now();
+    while (Date.now() - inicio < timeoutMs) {
+      await new Promise((r) => setTimeout(r, intervalMs));
+      const { data } = await api.get(`/examenes/${examId}/generar-ia/estado/`);
+      if (data?.terminado) {
+        if (data.estado === "ERROR_GENERACION") {
+          const error = new Error(data.error || "No se pudo generar el examen con IA.");
+          error.response = { data: { detail: error.message } };
+          throw error;
+        }
+        return data;
+      }
+    }
+    throw new Error("La generación con IA está tardando demasiado.");
   },
 
   // ============================================================